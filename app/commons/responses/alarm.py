@@ -8,9 +8,10 @@ from aiogram.types import CallbackQuery
 
 from app.commons.responses.extensions import BaseHandlerExtensions, T
 from app.commons.services.task import TaskService
-from app.commons.utils.language_loader import load_language
+from app.schemas.typed_dict import LangType
 from app.enums.constants import BOX_TITLES, COEF_TITLES, PERIOD_MAP
 from app.enums.general import TaskMode, BoxType
+from app.keyboards.inline.callbacks import AlarmAll, AlarmSettings, AlarmToggle, AlarmWarehouses
 from app.keyboards.inline.general import InlineKeyboardHandler
 from app.routes.states.task_states import TaskStates
 from app.schemas.general import ResponseModel, ResponseBoxTypes, ResponseCoefs
@@ -26,36 +27,33 @@ class TaskAlarmResponse(BaseHandlerExtensions):
     async def setup_notifications(
             self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str]
+            lang: LangType,
+            cb: AlarmSettings
     ) -> ResponseModel:
         try:
             user_id: int = cq.from_user.id
             username: str = cq.from_user.username
-            self.lang = load_language(code_lang)
 
 
             return self.format_response(
-                text=self.lang['text_setup_notifications'],
+                text=lang['text_setup_notifications'],
                 keyboard=self.inline.alarm_setting
             )
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in handle_create_task: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
     async def view_all_warehouses(
             self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: AlarmWarehouses | AlarmToggle | AlarmAll,
             state: FSMContext
     ) -> ResponseModel:
         try:
             # ── 1. извлечение и валидация данных ─────────────────────────────
-            self.lang = load_language(code_lang)
             user_id: int = cq.from_user.id
-            page: int = self.get_or_default(self.safe_get(data, 2), int, 0)
             # мы предусматриваем, что стоит ограничение в 30 складов, поэтому пагинации не требуется
             # offset: int = page * self.limit_whs_per_page
             offset: int = 0 * self.limit_whs_per_page
@@ -65,47 +63,45 @@ class TaskAlarmResponse(BaseHandlerExtensions):
 
             # ── 3. Ответ пользователю  ─────────────────────────────
             return self.format_response(
-                text=self.lang['text_toggle_notifications'],
+                text=lang['text_toggle_notifications'],
                 keyboard=self.inline.create_alarm_list(task_list_with_names)
             )
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in view_all_warehouses: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
     async def toggle_alarm_for_wh(
             self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: AlarmToggle | AlarmAll,
             state: FSMContext
     ) -> Union[ResponseModel, Sequence[ResponseModel]]:
         try:
             # ── 1. извлечение и валидация данных ─────────────────────────────
-            self.lang = load_language(code_lang)
             user_id: int = cq.from_user.id
-            wh_id: int = self.get_or_default(self.safe_get(data, 2), int, 0)
             popup_text = None
 
             # ── 2. обрабатываем логику переключения ──────────────────────────
-            if wh_id == 0 and self.safe_get(data, 1) == 'all':
-                if self.safe_get(data, 2) == 'on':
+            if isinstance(cb, AlarmAll):
+                if cb.on:
                     toggle_on = await self.task_service.toggle_alarm_for_wh(user_id, 0, 1)
                     popup_text = self.format_alert(
-                        popup_text=str(self.lang['alarm_on']),
+                        popup_text=str(lang['alarm_on']),
                         popup_alert=True
                     )
                 else:
                     toggle_off = await self.task_service.toggle_alarm_for_wh(user_id, 0, 0)
                     popup_text = self.format_alert(
-                        popup_text=str(self.lang['alarm_off']),
+                        popup_text=str(lang['alarm_off']),
                         popup_alert=True
                     )
             else:
-                toggle_wh = await self.task_service.toggle_alarm_for_wh(user_id, wh_id)
+                toggle_wh = await self.task_service.toggle_alarm_for_wh(user_id, cb.warehouse_id)
 
             # ── 3. Ответ пользователю (ссылаясь на другую функцию) ──────────────────
-            resp_upgrade = await self.view_all_warehouses(cq, code_lang, data, state)
+            resp_upgrade = await self.view_all_warehouses(cq, lang, cb, state)
             if popup_text:
                 return [resp_upgrade, popup_text]
 
@@ -113,4 +109,4 @@ class TaskAlarmResponse(BaseHandlerExtensions):
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in view_all_warehouses: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
\ No newline at end of file
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
\ No newline at end of file
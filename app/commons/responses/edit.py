@@ -1,5 +1,6 @@
 import logging
 from datetime import datetime, date, timedelta
+from functools import partial
 from pprint import pprint
 from typing import AnyStr, Any, Optional, Sequence, Union, Literal
 
@@ -9,9 +10,9 @@ from aiogram.types import CallbackQuery
 from app.commons.responses.extensions import BaseHandlerExtensions, T
 from app.commons.services.task import TaskService
 from app.commons.services.validators import date_validators
-from app.commons.utils.language_loader import load_language
 from app.enums.constants import BOX_TITLES, COEF_TITLES, PERIOD_MAP, BOX_TITLES_RU, BOX_TYPE_MAP
-from app.enums.general import TaskMode, BoxType
+from app.enums.general import TaskMode, BoxType, DateAction, TaskFlow, UpdateAction
+from app.keyboards.inline.callbacks import BoxPick, CoefPick, DatePick, MyTasks, TaskSave, TaskUpdate
 from app.keyboards.inline.general import InlineKeyboardHandler
 from app.routes.states.task_states import TaskStates
 from app.schemas.general import ResponseModel, ResponseBoxTypes, ResponseCoefs
@@ -30,37 +31,38 @@ class TaskEditResponse(BaseHandlerExtensions):
             self,
             user_id: int,
             cq: CallbackQuery,
-            data: list[str],
             state: FSMContext,
             lang: LangType
     ) -> ResponseModel:
-        code_lang = cq.from_user.language_code or "ru"
-        wh_id: int = (await state.get_data()).get('update_task').get('list', [])[0]
-
-        # ── 1. Удаление задач по этому wh id
-        await self.task_service.delete_single_tasks(user_id, wh_id)
-
-        # ── 2. Создание новых задач с этим id
+        # ── 1. Перезапись задачи по этому wh id
+        # create_tasks_bulk делает upsert по (user_id, warehouse_id): прежняя строка заменяется
+        # одним запросом в одной транзакции — без отдельного удаления, после которого задача
+        # могла пропасть, если повторное создание не удалось
         from app.commons.responses.task import TaskResponse
         task = TaskResponse(inline_handler=self.inline)
-        await task.create_tasks_from_range(cq, code_lang, data, state, False, 'update_task')
+        saved = await task.create_tasks_from_range(cq, lang, TaskSave(), state, False, 'update_task')
 
-        # ── 3. Перемещаем пользователя на список задач
-        return await self.view_all_warehouses(cq, data, state, lang)
+        # ── 2. Перемещаем пользователя на список задач (+ предупреждение, если не сохранилось)
+        overview = await self.view_all_warehouses(cq, TaskUpdate(), state, lang)
+        if saved is None:
+            return overview
+        # не сохранилось — прежняя задача осталась без изменений: ошибка всплывающим окном поверх списка
+        popup_text = saved.popup_text if saved.status else str(lang['tasks_not_saved'])
+        return overview.model_copy(update={'popup_text': popup_text, 'popup_alert': True})
 
     # ───────────────────────────── end ──────────────────────────────────────
 
     async def view_all_warehouses(
             self,
             cq: CallbackQuery,
-            data: list[str],
+            cb: TaskUpdate,
             state: FSMContext,
             lang: LangType
     ) -> ResponseModel:
         try:
             # ── 1. извлечение и валидация данных ─────────────────────────────
             user_id: int = cq.from_user.id
-            page: int = self.get_or_default(self.safe_get(data, 2), int, 0)
+            page: int = cb.page
             # мы предусматриваем, что стоит ограничение в 30 складов, поэтому пагинации не требуется
             # offset: int = page * self.limit_whs_per_page
             offset: int = 0 * self.limit_whs_per_page
@@ -75,10 +77,10 @@ class TaskEditResponse(BaseHandlerExtensions):
                     text=lang['text_edit_task'],
                     keyboard=self.inline.create_alarm_list(
                         page_data=task_list_with_names,
-                        url=f'{self.prefix}_select',
+                        item=partial(TaskUpdate, UpdateAction.SELECT),
                         prefix_icon=('', ''),
                         alarm_helper_btn=False,
-                        back='my_tasks'
+                        back=MyTasks()
                     )
                 )
             else:
@@ -89,42 +91,41 @@ class TaskEditResponse(BaseHandlerExtensions):
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in view_all_warehouses: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
     async def view_select_warehouses(
             self,
             cq: CallbackQuery,
-            data: list[str],
+            cb: TaskUpdate,
             state: FSMContext,
             lang: LangType
     ) -> ResponseModel:
         try:
             # ── 1. извлечение и валидация данных ─────────────────────────────
             user_id: int = cq.from_user.id
-            wh_id: int = self.get_or_default(self.safe_get(data, 3), int, 0)
-            page: int = self.get_or_default(self.safe_get(data, 4), int, 0)
+            wh_id: int = cb.warehouse_id
+            page: int = cb.page
 
             # ── 2. получение данных ─────────────────────────────
             task_with_name = await self.task_service.get_wh_with_names(user_id,[wh_id])
             # self.debug.pretty_dump(task_with_name, style="rich", title="📦 task_with_name")
 
-            # ── 2.1 группировка данных ─────────────────────────────
-            single_task = self.extract_grouped_task_tuples(task_with_name.tasks)[0]
+            # ── 2.1 задача по складу (одна строка на склад) ─────────────────────────────
+            single_task = task_with_name.tasks[0]
 
             # ── 3. объявление переменных ─────────────────────────────
             wh_name = task_with_name.warehouses_names_list[0]['name']
-            box_ids, coef, time_start, time_end, active = single_task[1:]
-            box_types = sorted(BOX_TITLES_RU.get(box, "Неизвестный тип") for box in box_ids)
-            is_active = "🟢 АКТИВНО" if active else "🔴 НЕАКТИВНО"
+            box_types = sorted(BOX_TITLES_RU.get(box, "Неизвестный тип") for box in single_task.box_type_ids)
+            is_active = "🟢 АКТИВНО" if single_task.is_active else "🔴 НЕАКТИВНО"
 
             # ── 4. Ответ пользователю  ─────────────────────────────
             return self.format_response(
                 text=lang['edit_task'].format(
                     warehouse=wh_name,
                     box=', '.join(box_types),
-                    coef=coef,
-                    period_start=time_start,
-                    period_end=time_end,
+                    coef=single_task.coefficient,
+                    period_start=single_task.date_from,
+                    period_end=single_task.date_to,
                     status=is_active
                 ),
                 keyboard=self.inline.edit_task_warehouse(
@@ -135,13 +136,13 @@ class TaskEditResponse(BaseHandlerExtensions):
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in view_all_warehouses: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
     # async def update_bt_wh(
     async def update_params_wh(
             self,
             cq: CallbackQuery,
-            data: list[str],
+            cb: TaskUpdate,
             state: FSMContext,
             lang: LangType,
             lang_link: Literal['box_types', 'coef', 'period'] = "box_types"
@@ -149,15 +150,15 @@ class TaskEditResponse(BaseHandlerExtensions):
         try:
             # ── 1. извлечение и валидация данных ─────────────────────────────
             user_id: int = cq.from_user.id
-            wh_id: int = self.get_or_default(self.safe_get(data, 3), int, 0)
-            page: int = self.get_or_default(self.safe_get(data, 4), int, 0)
-            url_back = f"{self.prefix}_select_{wh_id}_{page}"
+            wh_id: int = cb.warehouse_id
+            page: int = cb.page
+            url_back = TaskUpdate(UpdateAction.SELECT, wh_id, page)
 
             # ── 2. получение данных ─────────────────────────────
             task_with_name = await self.task_service.get_wh_with_names(user_id,[wh_id])
 
-            # ── 2.1 группировка данных ─────────────────────────────
-            grouped = self.extract_grouped_task_tuples(task_with_name.tasks)[0]
+            # ── 2.1 задача по складу (одна строка на склад) ─────────────────────────────
+            single_task = task_with_name.tasks[0]
 
             # ── 3. state (update_task)  ────────────────────────────────────────────
             # Создание машины состояний: FSMContext и базового словаря
@@ -166,13 +167,14 @@ class TaskEditResponse(BaseHandlerExtensions):
 
             # ── 4. объявление переменных  ─────────────────────────────
             wh_name     = task_with_name.warehouses_names_list[0]['name']
-            box_ids, coef, time_start, time_end, active = grouped[1:]
+            box_ids = single_task.box_type_ids
+            coef, time_start, time_end = single_task.coefficient, single_task.date_from, single_task.date_to
             bt_labels = sorted(BOX_TITLES_RU.get(box, "Неизвестный тип") for box in box_ids)
             period_start = time_start.strftime("%Y-%m-%d")
             period_end   = time_end.strftime("%Y-%m-%d")
             # resolved box types
             rbt = [k for k, v in BOX_TYPE_MAP.items() if v in box_ids]
-            # rbt = [next(k for k, v in BOX_TYPE_MAP.items() if v == i) for i in grouped[1]]
+            # rbt = [next(k for k, v in BOX_TYPE_MAP.items() if v == i) for i in box_ids]
 
             # ── 5. Подготовка клавиатуры  ─────────────────────────────
             kb = default = None
@@ -186,7 +188,7 @@ class TaskEditResponse(BaseHandlerExtensions):
                         back=True
                     ),
                     BOX_TITLES,
-                    f'{self.prefix}_selbox',
+                    TaskFlow.EDIT,
                     url_back
                 )
             elif lang_link == 'coef':
@@ -198,16 +200,12 @@ class TaskEditResponse(BaseHandlerExtensions):
                         warehouse_id=wh_id,
                         back=True
                     ),
-                    f'{self.prefix}_selcoef',
+                    TaskFlow.EDIT,
                     url_back
                 )
             elif lang_link == 'period':
                 default = (time_start, time_end)
-                kb = self.inline.create_select_date(
-                    f'{self.prefix}_seldate',
-                    url_back,
-                    f'{self.prefix}_diapason'
-                )
+                kb = self.inline.create_select_date(TaskFlow.EDIT, url_back)
 
             # ── 6. Обновление словаря  ─────────────────────────────
             await state.update_data(
@@ -238,29 +236,27 @@ class TaskEditResponse(BaseHandlerExtensions):
         except Exception as e:
             # Логирование для отладки
             logging.exception(f"Error in view_all_warehouses: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
     async def picked_elem(
             self,
             user_id,
             cq: CallbackQuery,
-            data: list[str],
+            cb: BoxPick | CoefPick | DatePick,
             state: FSMContext,
             lang: LangType,
             lang_link: Literal['box_types', 'coef', 'period', 'diapason'] = "box_types"
     ) -> ResponseModel | None:
         try:
             # ── 1. извлечение и валидация данных ────────────────────────────────
-            page: int = self.get_or_default(self.safe_get(data, 5), int, 0)
-            is_confirm = "confirm" in self.safe_get(data, 3)
-            picked: str = self.get_or_default(self.safe_get(data, 3), str, '')
+            is_confirm = getattr(cb, 'confirm', False)
 
             # ── 2. state (update_task)  ──────────────────────────────────────────
             update_task: dict = (await state.get_data()).get('update_task')  # setup_task не может отсутствовать
 
-            if picked in PERIOD_MAP:
+            if isinstance(cb, DatePick) and cb.period is not None:
                 today = datetime.now().date()
-                start, end = PERIOD_MAP[picked](today)
+                start, end = PERIOD_MAP[cb.period](today)
 
                 is_confirm = True
 
@@ -272,54 +268,53 @@ class TaskEditResponse(BaseHandlerExtensions):
                 )
 
 
-            # ── 3. получение id склада ─────────────────────────────────
-            wh_id: int = self.get_or_default(self.safe_get(data, 4), int, update_task['list'][0])
-            url_back = f"{self.prefix}_select_{wh_id}_{page}"
+            # ── 3. склад и страница — из состояния (update_params_wh) ────────────
+            wh_id: int = update_task['list'][0]
+            page: int = update_task['current_page']
+            url_back = TaskUpdate(UpdateAction.SELECT, wh_id, page)
 
             # ── 4. Подготовка клавиатуры  ─────────────────────────────
             kb = None
             if lang_link == 'box_types':
-                if picked != 'confirm':
-                    update_task['box_type'] = self.toggle_selection(update_task.get("box_type", []), picked)
+                if cb.box is not None:
+                    update_task['box_type'] = self.toggle_selection(update_task.get("box_type", []), cb.box.value)
 
                 kb = self.inline.box_type(
                     ResponseBoxTypes(
                         selected=update_task['box_type'],
                         box_default=update_task['default'],
-                        warehouse_id=update_task['list'][0],
+                        warehouse_id=wh_id,
+                        page=page,
                         back=True
                     ),
                     BOX_TITLES,
-                    f'{self.prefix}_selbox',
+                    TaskFlow.EDIT,
                     url_back
                 )
             elif lang_link == 'coef':
-                if str(picked).isdigit():
-                    update_task['coefs'] = picked
+                if cb.coef is not None:
+                    update_task['coefs'] = cb.coef
 
                 kb = self.inline.coefs(
                     ResponseCoefs(
                         selected=update_task['coefs'],
                         coef_default=update_task['default'],
                         warehouse_id=wh_id,
+                        page=page,
                         back=True
                     ),
-                    f'{self.prefix}_selcoef',
+                    TaskFlow.EDIT,
                     url_back
                 )
             elif lang_link == 'period':
-                kb = self.inline.create_select_date(
-                    f'{self.prefix}_seldate',
-                    url_back,
-                    f'{self.prefix}_seldiap'
-                )
+                kb = self.inline.create_select_date(TaskFlow.EDIT, url_back)
 
             # ── 5. Обновление словаря  ────────────────────────────────────────────────
             await state.update_data(update_task=update_task)
 
             # ── 6. confirm-ветка  ────────────────────────────────────────────────
             if is_confirm:
-                return await self.commit(user_id, cq, data, state, lang)
+                return await self.commit(user_id, cq, state, lang)
 
             # ── 7. Подготовка labels  ─────────────────────────────
             bt_labels = (BOX_TITLES_RU.get(BOX_TYPE_MAP[bt], "Неизвестный тип") for bt in update_task['box_type'])
@@ -338,55 +333,40 @@ class TaskEditResponse(BaseHandlerExtensions):
         except Exception as e:
             # Логирование для отладки
             logging.exception(f"Error in view_all_warehouses: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
     async def diapason(
             self,
             user_id,
             cq: CallbackQuery,
-            data: list[str],
+            cb: DatePick,
             state: FSMContext,
-            lang: LangType,
-            action: Optional[str]
+            lang: LangType
     ) -> ResponseModel | None:
         try:
             # ── 1. state (update_task)  ──────────────────────────────────────────
             update_task: dict = (await state.get_data()).get('update_task')  # setup_task не может отсутствовать
-            print(update_task)
 
             # ── 2. извлечение и валидация данных ────────────────────────────────
             wh_id: int = update_task['list'][0]
             page: int = update_task['current_page']
-            url_back = f"{self.prefix}_select_{wh_id}_{page}"
-            picked_action = self.safe_get(data, 3)
-            is_confirm = "confirm" in picked_action if not picked_action is None else False
-            picked: str = self.get_or_default(self.safe_get(data, 3), str, '')
             url_list = {
-                'url': f'{self.prefix}_seldiap',
-                'url_confirm': f'{self.prefix}_seldiap_confirm',
-                'url_back': url_back,
-                'url_change': f'{self.prefix}_seldiap'
+                'flow': TaskFlow.EDIT,
+                'back': TaskUpdate(UpdateAction.SELECT, wh_id, page)
             }
 
-            # ── 2.1. подготовка переменных для учета даты
-            pick_y: Optional[int | str]  = self.safe_get(data, 3)
-            pick_m: Optional[int | str] = self.safe_get(data, 4)
-            pick_d: Optional[int | str] = self.safe_get(data, 5)
-
             # ── 3. импорт модуля, для переиспользования функций
             from app.commons.responses.task import TaskResponse
             task_resp = TaskResponse(inline_handler=self.inline)
 
-            if pick_y and pick_m and pick_d is None:
-                return await task_resp.commit_month_selection(
-                    pick_y, pick_m, url_list
-                )
-            elif action == 'seldiap' and not is_confirm:
+            if cb.action is DateAction.MONTH:
+                return await task_resp.commit_month_selection(cb.day, url_list)
+            elif cb.action is DateAction.DAY:
                 return await task_resp.commit_day_selection(
-                    update_task, self.lang, state, pick_y, pick_m, pick_d, url_list, "update_task"
+                    update_task, lang, state, cb.day, url_list, "update_task"
                 )
-            elif is_confirm:
-                return await self.commit(user_id, cq, data, state, lang)
+            elif cb.action is DateAction.CONFIRM:
+                return await self.commit(user_id, cq, state, lang)
 
             # ── 4. Убираем период
             update_task = self._merge_setup_task(update_task, period_start='', period_end='')
@@ -397,14 +377,6 @@ class TaskEditResponse(BaseHandlerExtensions):
                 **url_list
             )
 
-            # ── 5. Обновление словаря  ────────────────────────────────────────────────
-            # await state.update_data(update_task=update_task)
-
-            # ── 6. confirm-ветка  ────────────────────────────────────────────────
-            # if is_confirm:
-            #     print(update_task)
-            #     return await self.commit(user_id, cq, data, state, lang)
-
             # ── 7. Подготовка labels  ─────────────────────────────
             bt_labels = (BOX_TITLES_RU.get(BOX_TYPE_MAP[bt], "Неизвестный тип") for bt in update_task['box_type'])
 
@@ -422,58 +394,47 @@ class TaskEditResponse(BaseHandlerExtensions):
         except Exception as e:
             # Логирование для отладки
             logging.exception(f"Error in view_all_warehouses: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
 
     async def handle_task_update(
             self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: TaskUpdate | BoxPick | CoefPick | DatePick,
             state: FSMContext
     ) -> ResponseModel:
         try:
             # ── 1. извлечение и валидация данных
-            self.lang = load_language(code_lang)
             user_id: int = cq.from_user.id
-            action: Optional[str] = self.get_or_default(self.safe_get(data, 2), str, None)
-
-            # ── 2. извлечение и валидация данных
-            if action is None:
-                return await self.view_all_warehouses(cq, data, state, self.lang)
-            # ── 2.1. если выбран режим диапазона ──────────────────────────────
-            elif action == "page":
-                return await self.view_all_warehouses(cq, data, state, self.lang)
-            elif action == "select":
-                return await self.view_select_warehouses(cq, data, state, self.lang)
-
-            # ── 2.2. Редактирование типов короба
-            elif action == "box":
-                return await self.update_params_wh(cq, data, state, self.lang, 'box_types')
-            elif action == "selbox":
-                return await self.picked_elem(user_id, cq, data, state, self.lang, 'box_types')
-
-            # ── 2.3. Редактирование коэффициентов
-            elif action == "coef":
-                return await self.update_params_wh(cq, data, state, self.lang, 'coef')
-            elif action == "selcoef":
-                return await self.picked_elem(user_id, cq, data, state, self.lang, 'coef')
-
-            # ── 2.4. Редактирование даты
-            elif action == "date":
-                return await self.update_params_wh(cq, data, state, self.lang, 'period')
-            elif action == "seldate":
-                return await self.picked_elem(user_id, cq, data, state, self.lang, 'period')
-
-            # ── 2.5. Отрисовка и выбор диапазона
-            elif action == "diapason":
-                return await self.diapason(user_id, cq, data, state, self.lang, action)
-            elif action == "seldiap":
-                return await self.diapason(user_id, cq, data, state, self.lang, action)
 
-            # self.debug.pretty_dump(task_list_with_names, style="rich", title="📦 Product Dump")
+            # ── 2. выбор значения в редактировании (кнопки с flow=EDIT)
+            if isinstance(cb, BoxPick):
+                return await self.picked_elem(user_id, cq, cb, state, lang, 'box_types')
+            elif isinstance(cb, CoefPick):
+                return await self.picked_elem(user_id, cq, cb, state, lang, 'coef')
+            elif isinstance(cb, DatePick):
+                # ── 2.1. готовый период — сразу сохраняем, иначе календарь диапазона
+                if cb.action is DateAction.PERIOD:
+                    return await self.picked_elem(user_id, cq, cb, state, lang, 'period')
+                return await self.diapason(user_id, cq, cb, state, lang)
+
+            # ── 3. список складов и карточка задачи
+            action: UpdateAction = cb.action
+            if action is UpdateAction.LIST:
+                return await self.view_all_warehouses(cq, cb, state, lang)
+            elif action is UpdateAction.SELECT:
+                return await self.view_select_warehouses(cq, cb, state, lang)
+
+            # ── 3.1. Редактирование типов короба, коэффициентов, даты
+            elif action is UpdateAction.BOX:
+                return await self.update_params_wh(cq, cb, state, lang, 'box_types')
+            elif action is UpdateAction.COEF:
+                return await self.update_params_wh(cq, cb, state, lang, 'coef')
+            elif action is UpdateAction.DATE:
+                return await self.update_params_wh(cq, cb, state, lang, 'period')
 
         except Exception as e:
             # Логирование для отладки
             logging.exception(f"Error in view_all_warehouses: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
\ No newline at end of file
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
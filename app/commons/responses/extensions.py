@@ -2,13 +2,11 @@ import json
 import random
 import string
 import logging
-from collections import defaultdict
-from datetime import date, datetime
+from datetime import date
 
 # Импортируем типизацию
 from typing import TypeVar, Hashable, Sequence, Iterable, Union, Any, Optional, Tuple, get_args
 
-from ..services.task import TaskService
 # Импортируем класс для вывода системной информации и дампа данных
 from ..utils.dump import DebugTools
 
@@ -17,9 +15,8 @@ from ...enums.constants import BOX_TITLES_RU, BOX_TITLES
 from app.enums.general import TaskMode
 
 # Импортируем pydantic модели
-from ...schemas.task import TaskRead
+from ...schemas.task import TaskRangeRead
 from app.schemas.general import ResponseModel
-from ...schemas.typed_dict import LangType
 
 # T = TypeVar("T", bound=Hashable) - использовать значения в ключах словарей (dict), складывать в множества (set)
 T = TypeVar("T")
@@ -30,7 +27,6 @@ ResponseInput = Union[ResponseModel, str, dict[str, Any]]
 
 class BaseHandlerExtensions:
     def __init__(self):
-        self.lang: LangType = {}
         self.debug = DebugTools
         self.limit_whs_per_page: int = 30
         self.limit_whs_for_view: int = 10
@@ -50,7 +46,6 @@ class BaseHandlerExtensions:
 
         self.BULLET_HUBS = "\n\t 📍"  # единый разделитель для складов
         self.BULLET_BOXES = "\n\t ▫️"  # единый разделитель для типов упаковок
-        # text = self.lang.get("create_task_list", {}).get("space", "🔒 no text")
 
 
     @staticmethod
@@ -217,17 +212,6 @@ class BaseHandlerExtensions:
         return default
 
     # ───────────────────────────── helpers ──────────────────────────────────────
-    @staticmethod
-    def _parse_raw(raw: str | int) -> tuple[int, Optional[int], bool, bool]:
-        """raw → (page, warehouse_id | None, is_id, is_confirm)"""
-        if isinstance(raw, str):
-            if raw.startswith("id"):
-                return 0, int(raw[2:]), True, False
-            if raw.startswith("confirm"):
-                return 0, None, False, True
-            return int(raw), None, False, False
-        return int(raw), None, False, False
-
     @staticmethod
     def _merge_setup_task(old: dict, **patch) -> dict:
         """Иммутабельное обновление setup_task"""
@@ -281,53 +265,37 @@ class BaseHandlerExtensions:
 
     @staticmethod
     async def format_tasks_list(
-            tasks: list[TaskRead],
+            tasks: list[TaskRangeRead],
             box_titles: BOX_TITLES_RU,
-            task_service: TaskService,
+            warehouses_names: Sequence[dict[str, int | str]],
     ) -> dict[str, object]:
         """
-        Формирует текстовый список задач по складам с агрегацией параметров:
-        группировка по складу, коэффициенту, объединение типов коробок и периода дат.
+        Формирует текстовый список задач по складам.
+        Каждая задача уже хранит набор типов коробок, максимальный коэффициент и период.
 
-        :param tasks: Список задач модели TaskRead
+        :param tasks: Список задач модели TaskRangeRead
         :param box_titles: Словарь с отображением ID типа упаковки в его название (например: {5: "Монопаллеты"}).
-        :param task_service: Сервисный слой, предоставляющий методы для работы с задачами (например, получение складов по ID).
+        :param warehouses_names: Имена складов задач [{'id': …, 'name': …}] (ResponseTasks.warehouses_names_list).
         :return: Словарь с текстом и количеством складов
         """
         split_line = "----------------------"
-        today = datetime.now().date()
         result: list[str] = []
 
-        # ── группировка задач ─────────────────────────────────────────────
-        grouped = defaultdict(lambda: defaultdict(set))
-        for task in tasks:
-            grouped[task.warehouse_id][task.coefficient].add((task.box_type_id, task.date))
-
-        wh_ids = list(grouped.keys())
-        whs_by_ids = await task_service.get_whs_by_ids(wh_ids)
-        wh_names = {wh.warehouse_id: wh.warehouse_name for wh in whs_by_ids.warehouses}
-
-        for wh_id, coef_groups in grouped.items():
-            name = wh_names.get(wh_id, f"Неизвестный склад (ID: {wh_id})")
-
-            for coefficient, box_and_dates in coef_groups.items():
-                box_types = sorted({box_titles.get(box, "Неизвестный тип") for box, _ in box_and_dates})
-                dates = sorted({date for _, date in box_and_dates})
+        wh_ids = [task.warehouse_id for task in tasks]
+        wh_names = {wh["id"]: wh["name"] for wh in warehouses_names}
 
-                if not dates:
-                    continue
-
-                date_from = dates[0].date() if isinstance(dates[0], datetime) else dates[0]
-                date_to = dates[-1].date() if isinstance(dates[-1], datetime) else dates[-1]
-                is_active = "🟢 АКТИВНО" if date_from <= today <= date_to else "🔴 НЕАКТИВНО"
-
-                result.append(
-                    f"🚛 СКЛАД: {name}\n"
-                    f"🛠 СТАТУС: {is_active}\n"
-                    f"📦 УПАКОВКА: {', '.join(box_types)}\n"
-                    f"⚖️ КОЭФФИЦИЕНТ: до х{coefficient}\n"
-                    f"📅 ПЕРИОД ПОИСКА СЛОТОВ: с <u>{date_from}</u> по <u>{date_to}</u>"
-                )
+        for task in tasks:
+            name = wh_names.get(task.warehouse_id, f"Неизвестный склад (ID: {task.warehouse_id})")
+            box_types = sorted({box_titles.get(box, "Неизвестный тип") for box in task.box_type_ids})
+            is_active = "🟢 АКТИВНО" if task.is_active else "🔴 НЕАКТИВНО"
+
+            result.append(
+                f"🚛 СКЛАД: {name}\n"
+                f"🛠 СТАТУС: {is_active}\n"
+                f"📦 УПАКОВКА: {', '.join(box_types)}\n"
+                f"⚖️ КОЭФФИЦИЕНТ: до х{task.coefficient}\n"
+                f"📅 ПЕРИОД ПОИСКА СЛОТОВ: с <u>{task.date_from}</u> по <u>{task.date_to}</u>"
+            )
 
         return {
             "text": f"\n{split_line}\n".join(result),
@@ -391,39 +359,3 @@ class BaseHandlerExtensions:
             )
 
         return pieces
-
-    @staticmethod
-    def extract_grouped_task_tuples(tasks: Sequence[TaskRead]) -> list[tuple[int, list[int], int, date, date, bool]]:
-        """
-        Группирует задачи по складу (warehouse_id), определяя:
-        - список типов упаковки
-        - максимальный коэффициент
-        - начальную и конечную дату периода
-        - активность задачи на текущую дату
-
-        :return: список кортежей (warehouse_id, box_type_ids, max_coef, start_date, end_date, is_active)
-        """
-        grouped: dict[int, set[tuple[int, int, datetime]]] = defaultdict(set)
-
-        for task in tasks:
-            grouped[task.warehouse_id].add((task.box_type_id, task.coefficient, task.date))
-
-        today = datetime.now().date()
-        result: list[tuple[int, list[int], int, date, date, bool]] = []
-
-        for warehouse_id, entries in grouped.items():
-            box_types = sorted({box_id for box_id, _, _ in entries})
-            coefficients = [coef for _, coef, _ in entries]
-            dates = sorted({dt.date() if isinstance(dt, datetime) else dt for _, _, dt in entries})
-
-            if not dates:
-                continue
-
-            max_coef = max(coefficients)
-            period_start = dates[0]
-            period_end = dates[-1]
-            is_active = period_start <= today <= period_end
-
-            result.append((warehouse_id, box_types, max_coef, period_start, period_end, is_active))
-
-        return result
\ No newline at end of file
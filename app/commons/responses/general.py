@@ -2,7 +2,7 @@ import logging
 
 from .extensions import BaseHandlerExtensions
 from ..services.user import UserService
-from ..utils.language_loader import load_language
+from ...schemas.typed_dict import LangType
 from app.schemas.general import ResponseModel
 # from ...schemas.general import ResponseModel
 
@@ -16,47 +16,42 @@ class GeneralResponse(BaseHandlerExtensions):
             self,
             user_id: int,
             username: str,
-            code_lang: str,
+            lang: LangType,
     ) -> ResponseModel:
-        self.lang = load_language(code_lang)
         try:
             user = await self.user_service.get_or_create_user(user_id, username)
 
             return self.format_response(
-                text=self.lang['start'],
+                text=lang['start'],
                 keyboard='start_kb'
             )
         except Exception as e:
             logging.error(f"Error in start_command_response: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'])
+            return self.format_response(lang['error_occurred'])
 
 
 
-    async def invite_command_response(self, code_lang: str) -> ResponseModel:
-        self.lang = load_language(code_lang)
+    async def invite_command_response(self, lang: LangType) -> ResponseModel:
 
         return self.format_response(
-            text=self.lang['invite'].format(link='https://t.me/private_fastnet_bot')
+            text=lang['invite'].format(link='https://t.me/private_fastnet_bot')
         )
 
-    async def help_command_response(self, code_lang: str) -> ResponseModel:
-        self.lang = load_language(code_lang)
+    async def help_command_response(self, lang: LangType) -> ResponseModel:
 
         return self.format_response(
-            text=self.lang['help']
+            text=lang['help']
         )
 
-    async def lang_command_response(self, code_lang: str) -> ResponseModel:
-        self.lang = load_language(code_lang)
+    async def lang_command_response(self, lang: LangType) -> ResponseModel:
 
         return self.format_response(
-            text=self.lang['lang'],
+            text=lang['lang'],
             keyboard='lang_kb'
         )
 
-    def privacy_command_response(self, code_lang: str) -> ResponseModel:
-        self.lang = load_language(code_lang)
+    def privacy_command_response(self, lang: LangType) -> ResponseModel:
 
         return self.format_response(
-            text=self.lang['privacy']
+            text=lang['privacy']
         )
\ No newline at end of file
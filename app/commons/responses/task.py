@@ -1,6 +1,6 @@
 import logging
 from collections import defaultdict
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from http.client import responses
 from pprint import pprint
 from typing import AnyStr, Any, Optional, Sequence, Union
@@ -12,13 +12,12 @@ from app.commons.responses.edit import TaskEditResponse
 from app.commons.responses.extensions import BaseHandlerExtensions, T
 from app.commons.services.task import TaskService
 from app.commons.services.validators import date_validators
-from app.commons.utils.language_loader import load_language
 from app.enums.constants import BOX_TITLES, COEF_TITLES, PERIOD_MAP, BOX_TITLES_RU
-from app.enums.general import TaskMode, BoxType
+from app.enums.general import TaskMode, BoxType, DateAction, DeleteAction
+from app.keyboards.inline.callbacks import BoxPick, CoefPick, CreateTask, DatePick, MyTasks, TaskDelete, TaskSave, TaskUpdate, WarehousePick
 from app.keyboards.inline.general import InlineKeyboardHandler
 from app.routes.states.task_states import TaskStates
-from app.schemas.general import ResponseModel, ResponseBoxTypes, ResponseCoefs
-from app.schemas.task import TaskRead
+from app.schemas.general import ResponseModel, ResponseBoxTypes, ResponseCoefs, ResponseError
 from app.schemas.typed_dict import LangType
 
 
@@ -108,17 +107,13 @@ class TaskResponse(BaseHandlerExtensions):
 
     async def commit_month_selection(
             self,
-            year: str | int,
-            month: str | int,
+            month: date,
             kb_url_list: Optional[dict] = None,
     ) -> ResponseModel:
-        y, m, d = map(int, (year, month, 1))  # str → int
-        check_date = self.validate_ymd(y, m, d)  # либо дата, либо исключение
-
-        # ── 1.1. Создаем словарь с безопасной распаковкой
+        # ── 1.1. Создаем словарь с безопасной распаковкой (дата уже разобрана кодеком кнопок)
         calendar_kwargs = {
-            "year": check_date.year,
-            "month": check_date.month,
+            "year": month.year,
+            "month": month.month,
             **(kb_url_list or {})  # добавит только если словарь есть
         }
 
@@ -133,9 +128,7 @@ class TaskResponse(BaseHandlerExtensions):
             state_data: dict,
             lang: LangType,
             state: FSMContext,
-            year: str | int,
-            month: str | int,
-            day: str | int,
+            check_date: date,
             kb_url_list: Optional[dict] = None,
             task_key: str = "setup_task"
     ) -> ResponseModel:
@@ -145,8 +138,6 @@ class TaskResponse(BaseHandlerExtensions):
         period_start = state_data.get('period_start') or None
         period_end = state_data.get('period_end') or None
 
-        y, m, d = map(int, (year, month, day))  # str → int
-        check_date = self.validate_ymd(y, m, d)  # либо дата, либо исключение
         readable_date = check_date.isoformat()
 
         # ── 1.1. Создаем словарь с безопасной распаковкой
@@ -199,18 +190,12 @@ class TaskResponse(BaseHandlerExtensions):
     async def handle_create_task(
             self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str]
+            lang: LangType,
+            cb: CreateTask
     ) -> ResponseModel:
         try:
             user_id: int = cq.from_user.id
             username: str = cq.from_user.username
-            self.lang = load_language(code_lang)
-
-            raw_page = self.safe_get(data, 2)  # str | None
-            page: int | None = int(raw_page) if raw_page is not None else None
-
-            # page = int(data[2]) if len(data) > 2 else None  # int(data[2]) if len(data) > 2 else 0
 
             # check page, he can't be integer
             # offset = page * 10 if page else 0
@@ -222,53 +207,38 @@ class TaskResponse(BaseHandlerExtensions):
             #     text = self.lang_dict['existing_tasks_warning'].format(list_tasks=list_tasks['text'])
             #     return {**self.format_response(text, 'tasks_update_all'), "total": list_tasks['total']}
 
-            # self.lang['existing_tasks_warning'] - Если уже есть задачи
+            # lang['existing_tasks_warning'] - Если уже есть задачи
             return self.format_response(
-                text=self.lang['create_task_list']['space'],
+                text=lang['create_task_list']['space'],
                 keyboard='task_mode_keyboard'
             )
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in handle_create_task: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
 
     async def handle_task_mode(
             self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: WarehousePick,
             state: FSMContext
     ) -> ResponseModel | None:
         """
-        page           – номер страницы; 0, если клик был по складу ('id…'); page собирается из отсутствия is_id
-        -> int: (0 if is_id else int(raw))
-
-        selected_wid   – id выбранного склада, либо None; selected_wid собирается по срезу
-        -> Optional[int]: (int(raw[2:]) if is_id else None)
-
-        is_id          – флаг: клик по складу, проверка по id (raw начинается с 'id')
-        -> bool: (raw.startswith("id") if isinstance(raw, str) else False)
-
-        is_confirm     – флаг: клик по кнопке «Подтвердить», проверка по confirm (raw == 'confirm')
-        -> bool: (raw.startswith("confirm") if isinstance(raw, str) else False)
+        cb.page          – номер страницы; 0, если клик был по складу
+        cb.warehouse_id  – id выбранного склада, либо None
+        cb.confirm       – клик по кнопке «Подтвердить»
         """
         try:
             user_id: int = cq.from_user.id
             username: str = cq.from_user.username
-            self.lang = load_language(code_lang)
 
             # ── 1. mode (enum) ────────────────────────────────────────────────────
-            raw_mode = self.safe_get(data, 2)
-            mode: TaskMode = (
-                TaskMode(raw_mode)  # превращаем в Enum
-                if raw_mode in TaskMode._value2member_map_  # проверка «значение ∈ enum»
-                else TaskMode.MASS  # дефолт
-            )
+            mode: TaskMode = cb.mode
 
-            # ── 2. raw-параметры из callback ─────────────────────────────────────
-            raw = self.safe_get(data, 3) or 0
-            page, selected_wid, is_id, is_confirm = self._parse_raw(raw)
+            # ── 2. параметры кнопки ──────────────────────────────────────────────
+            page, selected_wid, is_confirm = cb.page, cb.warehouse_id, cb.confirm
 
             # ── 3. state (setup_task)  ────────────────────────────────────────────
             # Создание машины состояний: FSMContext и базового словаря
@@ -278,7 +248,7 @@ class TaskResponse(BaseHandlerExtensions):
 
             # ── 4. confirm-ветка  ────────────────────────────────────────────────
             if setup_task.get('list') and setup_task.get('selected_list') and is_confirm:
-                return await self.commit_hubs_selection(setup_task, self.lang)
+                return await self.commit_hubs_selection(setup_task, lang)
 
             # ── 5. пересчёт list / current_page / mode ───────────────────────────
             if (
@@ -341,7 +311,7 @@ class TaskResponse(BaseHandlerExtensions):
 
             # ── 7. Ответ пользователю  ───────────────────────────────────────────
             return self.format_response(
-                text=self.lang['create_task_list'][f'task_mode_{mode.value}'],
+                text=lang['create_task_list'][f'task_mode_{mode.value}'],
                 keyboard=self.inline.create_warehouse_list(
                     warehouses_page,
                     setup_task['list'],
@@ -352,21 +322,20 @@ class TaskResponse(BaseHandlerExtensions):
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in handle_task_mode: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
 
     async def handle_box_type(
             self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: BoxPick,
             state: FSMContext
     ) -> ResponseModel | None:
         try:
             user_id: int = cq.from_user.id
             username: str = cq.from_user.username
             msg_text: str = cq.message.text
-            self.lang = load_language(code_lang)
 
             # ── 1. state (setup_task)  ────────────────────────────────────────────
             state_data = await state.get_data()
@@ -376,18 +345,14 @@ class TaskResponse(BaseHandlerExtensions):
             # ── 1.1. Получаем mode, он не может отсутствовать
             mode: TaskMode = setup_task['mode']
 
-            # ── 2. Получение action и is_confirm из callback ─────────────────────
-            action: int | str = self.safe_get(data, 2)
-            is_confirm: bool = action.startswith("confirm")
-
             # ── 3. confirm-ветка  ────────────────────────────────────────────────
-            if setup_task_bxts and is_confirm:
-                return await self.commit_box_selection(setup_task, self.lang)
+            if setup_task_bxts and cb.confirm:
+                return await self.commit_box_selection(setup_task, lang)
 
             # ── 4. box_type (enum) ───────────────────────────────────────────────
-            if action not in BoxType._value2member_map_:
+            if cb.box is None:
                 raise ValueError("box_type не может быть пустым")
-            box_type: BoxType = BoxType(action)  # mono, safe, pan
+            box_type: BoxType = cb.box  # mono, safe, pan
 
             # ── 5. Обновление выбранных типов ─────────────────────────────────────
             selected_bt: list[int] = self.toggle_selection(
@@ -415,20 +380,19 @@ class TaskResponse(BaseHandlerExtensions):
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in handle_box_type: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
     async def handle_coefs(
             self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: CoefPick,
             state: FSMContext
     ) -> ResponseModel | None:
         try:
             user_id: int = cq.from_user.id
             username: str = cq.from_user.username
             msg_text: str = cq.message.text
-            self.lang = load_language(code_lang)
 
             # ── 1. state (setup_task)  ────────────────────────────────────────────
             state_data = await state.get_data()
@@ -437,19 +401,14 @@ class TaskResponse(BaseHandlerExtensions):
             # ── 1.1. Получаем mode, он не может отсутствовать
             mode: TaskMode = setup_task['mode']
 
-            # ── 2. Получение action и is_confirm из callback ─────────────────────
-            # action - это и коэффициент и его подтверждение (а также может быть любое действие)
-            action: int | str = self.safe_get(data, 1)
-            is_confirm: bool = action.startswith("confirm")
-
             # ── 3. confirm-ветка  ────────────────────────────────────────────────
-            if str(setup_task.get('coefs')).isdigit() and is_confirm:
-                return await self.commit_coefs_selection(setup_task, self.lang)
+            if str(setup_task.get('coefs')).isdigit() and cb.confirm:
+                return await self.commit_coefs_selection(setup_task, lang)
 
             # ── 4. coefs (constants) ───────────────────────────────────────────────
-            if not str(action).isdigit():
-                raise ValueError(f"{action!r} не является целым числом")
-            action = int(action)
+            action = cb.coef
+            if action is None:
+                raise ValueError("Коэффициент не выбран")
 
             if action not in COEF_TITLES:
                 raise ValueError(f"Коэффициент {action!r} неизвестен")
@@ -480,23 +439,22 @@ class TaskResponse(BaseHandlerExtensions):
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in handle_box_type: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
     async def handle_date(
             self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: DatePick,
             state: FSMContext
     ) -> ResponseModel | None:
         try:
             user_id: int = cq.from_user.id
             username: str = cq.from_user.username
             msg_text: str = cq.message.text
-            self.lang = load_language(code_lang)
 
             # ── 1. state (setup_task)  ────────────────────────────────────────────
-            # Создание машины состояний: FSMContext и базового словаря
+            # Создание машины состояний: FSMContext и базового словаря
             state_data = await state.get_data()
             setup_task: dict = state_data['setup_task'] # setup_task не может отсутствовать
             logging.warning(f"setup_task (start): {setup_task}")  # REMOVE
@@ -504,24 +462,18 @@ class TaskResponse(BaseHandlerExtensions):
             # ── 1.1. Получаем mode, он не может отсутствовать
             mode: TaskMode = setup_task['mode']
 
-            # ── 2. Получение action и type из callback ─────────────────────
-            # type_act - date or diapason; action - это переданная временной период
-            process: str = self.safe_get(data, 0)
-            type_act: str = self.safe_get(data, 1)
-            action: int | str = self.safe_get(data, 2)
-            sel_year: int | str = self.safe_get(data, 2)
-            sel_month: int | str = self.safe_get(data, 3)
-            sel_day: int | str = self.safe_get(data, 4)
+            # ── 2. action кнопки: период / календарь / месяц / день / подтверждение ──
+            action: DateAction = cb.action
 
             # ── 3. вычисляем период ─────────────────────────────────────────
-            if action not in PERIOD_MAP and type_act == "date":
+            if action is DateAction.PERIOD and cb.period is None:
                 return self.format_response(
                     text=msg_text,
                     popup_text="Неизвестная дата",
                     popup_alert=True
                 )
             # ── 3.1 если выбран режим диапазона ──────────────────────────────
-            elif type_act == "diapason":
+            elif action is DateAction.CALENDAR:
                 setup_task = self._merge_setup_task(
                     setup_task,
                     period_start='',
@@ -531,23 +483,20 @@ class TaskResponse(BaseHandlerExtensions):
                 logging.warning(f"setup_task: {setup_task}")  # REMOVE
 
                 return self.format_response(
-                    text=self.lang['diapason_start'],
-                    keyboard=self.inline.generate_calendar(
-                        year=sel_year,
-                        month=sel_month,
-                    )
+                    text=lang['diapason_start'],
+                    keyboard=self.inline.generate_calendar()
                 )
             # ── 3.2 смена месяца в диапазоне  ──────────────────────────────
-            elif process == "change" and type_act == "month":
-                return await self.commit_month_selection(sel_year, sel_month)
+            elif action is DateAction.MONTH:
+                return await self.commit_month_selection(cb.day)
             # ── 3.3 выбор дня в диапазоне дат ──────────────────────────────
-            elif process == "select" and type_act == "day":
-                return await self.commit_day_selection(setup_task, self.lang, state, sel_year, sel_month, sel_day)
+            elif action is DateAction.DAY:
+                return await self.commit_day_selection(setup_task, lang, state, cb.day)
 
             # ── 4. если это не подтверждение диапазона ──────────────────────────────
-            if type_act != 'confirm':
+            if action is not DateAction.CONFIRM:
                 today = datetime.now().date()
-                start, end = PERIOD_MAP[action](today)
+                start, end = PERIOD_MAP[cb.period](today)
 
                 # ── 4.1 Обновление словаря, с подставленным новым значением ────────
                 setup_task = self._merge_setup_task(
@@ -559,17 +508,17 @@ class TaskResponse(BaseHandlerExtensions):
                 logging.warning(f"setup_task: {setup_task}") # REMOVE
 
             # ── 5. Ответ пользователю ─────────────────────────────────
-            return await self.commit_date_selection(setup_task, self.lang)
+            return await self.commit_date_selection(setup_task, lang)
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in handle_box_type: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
 
     async def create_tasks_from_range(self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: TaskSave,
             state: FSMContext,
             next_view: bool = True,
             state_key: str = 'setup_task'
@@ -580,6 +529,9 @@ class TaskResponse(BaseHandlerExtensions):
         • типы коробок
         • максимальный коэффициент
         • диапазон дат (start → end)
+
+        Если сохранить не удалось — возвращает ответ с ошибкой (и при `next_view=False`),
+        если сохранились не все склады — всплывающее предупреждение.
         """
 
         # ── 1. state (setup_task)  ────────────────────────────────────────────
@@ -607,100 +559,112 @@ class TaskResponse(BaseHandlerExtensions):
         if period_start > period_end:
             raise ValueError("Дата начала не может быть позже даты окончания.")
 
-        # ── 4. генерация списка дат ──────────────────────────────────────
-        days_range: list[datetime] = []
-        current = period_start
-        while current <= period_end:
-            days_range.append(current)
-            current += timedelta(days=1)
+        # ── 4. создание задач: по одной строке-диапазону на склад ───────────
+        saved = await self.task_service.create_bulk_tasks(user_id, warehouse_ids, box_types, max_coef, period_start, period_end)
+        if isinstance(saved, ResponseError):
+            return self.format_response(
+                text=lang['tasks_not_saved'],
+                keyboard=self.inline.my_tasks_empty,
+                status=False,
+                popup_text=str(lang['tasks_not_saved']),
+                popup_alert=True
+            )
 
-        # ── 5. генерация задач по комбинациям ────────────────────────────
-        await self.task_service.create_bulk_tasks(user_id, warehouse_ids, box_types, max_coef, days_range)
-        from app.routes.callbacks.task_view import my_tasks
-        if next_view:
-            return await self.overview_task(cq, code_lang, data, state)
+        # ── 5. Ответ пользователю: обзор задач (+ предупреждение, если сохранились не все) ──
+        total = len(set(warehouse_ids))
+        partial = None
+        if saved < total:
+            partial = self.format_alert(
+                popup_text=str(lang['tasks_saved_partially']).format(saved=saved, total=total),
+                popup_alert=True
+            )
+        if not next_view:
+            return partial
+        overview = await self.overview_task(cq, lang, MyTasks(), state)
+        if partial:
+            # всплывающее окно — на том же ответе: отдельный ResponseModel template_callback отправил бы пустым сообщением
+            return overview.model_copy(update={'popup_text': partial.popup_text, 'popup_alert': True})
+        return overview
 
     # ───────────────────────────── task_view ──────────────────────────────────────
     async def overview_task(self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: MyTasks,
             state: FSMContext
     ) -> ResponseModel | None:
         try:
             # ── 1. извлечение и валидация данных ─────────────────────────────
             user_id: int = cq.from_user.id
             msg_text: str = cq.message.text
-            page: int = self.get_or_default(self.safe_get(data, 2), int, 0)
+            page: int = cb.page
             offset: int = page * self.limit_whs_for_view
-            self.lang = load_language(code_lang)
 
             # ── 2. Получение задач юзера ─────────────────────────────────
             all_tasks = await self.task_service.get_all_unique_tasks(user_id, self.limit_whs_for_view, offset)
-            response_text = await self.format_tasks_list(all_tasks.tasks, BOX_TITLES_RU, self.task_service)
+            response_text = await self.format_tasks_list(all_tasks.tasks, BOX_TITLES_RU, all_tasks.warehouses_names_list or [])
 
             # ── 3. Ответ пользователю, если задач нет ─────────────────────────────────
             if not all_tasks.tasks and all_tasks.total == 0:
                 return self.format_response(
-                    text=self.lang['no_task'],
+                    text=lang['no_task'],
                     keyboard=self.inline.my_tasks_empty
                 )
 
             # ── 4. Ответ пользователю, если задачи есть ─────────────────────────────────
             return self.format_response(
-                text=f"{self.lang['have_task']} {response_text['text']}\n\n{self.lang['task_status']}",
+                text=f"{lang['have_task']} {response_text['text']}\n\n{lang['task_status']}",
                 keyboard=self.inline.generate_pagination_keyboard(
-                    current_page=page, total_tasks=all_tasks.total, page_size=self.limit_whs_for_view, callback_data='my_tasks_',
+                    current_page=page, total_tasks=all_tasks.total, page_size=self.limit_whs_for_view,
                     base_keyboard=self.inline.my_tasks
                 )
             )
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in overview_task: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
 
     # ───────────────────────────── task_delete ──────────────────────────────────────
     async def delete_task(self,
             cq: CallbackQuery,
-            code_lang: str,
-            data: list[str],
+            lang: LangType,
+            cb: TaskDelete,
             state: FSMContext
     ) -> Union[ResponseModel, list[ResponseModel]] | None:
         try:
             # ── 1. извлечение и валидация данных ─────────────────────────────
             user_id: int = cq.from_user.id
-            action = self.safe_get(data, 2)
-            self.lang = load_language(code_lang)
+            action: DeleteAction = cb.action
 
             # ── 2. Получение задач юзера ─────────────────────────────────
-            if action == 'confirm':
+            if action is DeleteAction.ASK:
                 return self.format_response(
-                    text=self.lang['confirm_delete_tasks'],
+                    text=lang['confirm_delete_tasks'],
                     keyboard=self.inline.delete_confirm,
-                    popup_text=str(self.lang['confirm_delete_tasks']),
+                    popup_text=str(lang['confirm_delete_tasks']),
                     popup_alert=True
                 )
-            elif action == 'all':
+            elif action is DeleteAction.ALL:
                 await self.task_service.delete_all_tasks(user_id)
                 return self.format_response(
-                    text=self.lang['tasks_deleted'],
+                    text=lang['tasks_deleted'],
                     keyboard=self.inline.tasks_delete_all,
                 )
-            elif action.startswith("id"):
-                trash = await self.task_service.delete_single_tasks(user_id, action[2:])
+            elif action is DeleteAction.ONE:
+                trash = await self.task_service.delete_single_tasks(user_id, cb.warehouse_id)
                 popup_text = self.format_alert(
-                    popup_text=str(self.lang['single_task_deleted']),
+                    popup_text=str(lang['single_task_deleted']),
                     popup_alert=True
                 )
                 from app.commons.responses.edit import TaskEditResponse
                 edit_response = TaskEditResponse(inline_handler=self.inline)
                 return [
                     popup_text,
-                    await edit_response.view_all_warehouses(cq, data, state, self.lang)
+                    await edit_response.view_all_warehouses(cq, TaskUpdate(page=cb.page), state, lang)
                 ]
 
 
         except Exception as e:
             # Логирование для отладки
             logging.error(f"Error in delete_task: {e}", exc_info=True)
-            return self.format_response(self.lang['error_occurred'], self.inline.my_tasks_empty)
\ No newline at end of file
+            return self.format_response(lang['error_occurred'], self.inline.my_tasks_empty)
\ No newline at end of file
@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from statistics import quantiles
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import (
+    TelegramRetryAfter,
+    TelegramForbiddenError,
+    TelegramBadRequest,
+    TelegramNetworkError,
+    TelegramServerError,
+)
+
+# Импортируем enums модели и константы
+from ...enums.constants import BOX_TITLES_RU
+
+# Импортируем Хэлпер для алхимии, предоставляет доступ к базе
+from ...models.alchemy_helper import db_helper
+
+# Импортируем crud модели целиком
+from ...models.crud import agents
+
+from ..utils.language_loader import load_language
+from .matcher import TaskMatcher, CoefficientLike
+from .warehouses import warehouse_directory
+from config.config import settings, AlertSettings
+
+
+def make_bot_session() -> Optional[AiohttpSession]:
+    """
+    Сессия Bot API с учётом BOT__API_SERVER (локальный или фейковый сервер для тестов).
+    None — стандартный api.telegram.org.
+    """
+    if not settings.bot.api_server:
+        return None
+    return AiohttpSession(api=TelegramAPIServer.from_base(settings.bot.api_server))
+
+
+#----------------------------------------#----------------------------------------#
+class TokenBucket:
+    """Классический token bucket: `rate` токенов в секунду, не больше `capacity` в запасе."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Забирает токен и возвращает 0, либо возвращает, сколько секунд ждать до токена."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while (wait := self.try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+
+@dataclass(slots=True)
+class _ChatQueue:
+    """Накопленные совпадения для одного чата: {warehouse_id: {(box_type_id, date): coefficient}}."""
+    chat_id: int
+    token: str
+    bucket: TokenBucket
+    hits: dict[int, dict[tuple[int, date], int]] = field(default_factory=dict)
+    enqueued_at: float = 0.0
+    scheduled: bool = False
+    attempts: int = 0
+
+
+@dataclass(slots=True)
+class _TokenLane:
+    """Очередь готовых к отправке чатов одного бота и его глобальный лимит."""
+    bot: Bot
+    bucket: TokenBucket
+    ready: asyncio.Queue = field(default_factory=asyncio.Queue)
+    worker: Optional[asyncio.Task] = None
+
+
+#----------------------------------------#----------------------------------------#
+class AlertDispatcher:
+    """
+    Рассылка оповещений о слотах.
+
+    • у каждого токена бота (основной или бот уведомлений пользователя из `bots`) своя
+      очередь и свой воркер с глобальным token bucket (`global_rate` сообщений/с);
+    • у каждого чата — свой bucket (`per_chat_interval`), чтобы не ловить 429 на чат;
+    • совпадения по одному пользователю копятся `coalesce_delay` секунд и, пока чат ждёт
+      своей очереди, — всё это уходит одним сообщением;
+    • stats() — глубина очередей, отправлено/ошибки, задержка от постановки до отправки.
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            matcher: Optional[TaskMatcher] = None,
+            config: AlertSettings = settings.alerts,
+            lang_code: str = 'ru',
+    ) -> None:
+        self.bot = bot
+        self.matcher = matcher
+        self.config = config
+        self.lang = load_language(lang_code)
+
+        self._session: Optional[AiohttpSession] = None  # общая сессия для ботов пользователей
+        self._lanes: dict[str, _TokenLane] = {}
+        self._chats: dict[tuple[str, int], _ChatQueue] = {}
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._latencies: deque[float] = deque(maxlen=1000)
+
+    # ── вход ─────────────────────────────────────────────────────────────────
+    async def on_coefficients(self, changed: list[CoefficientLike]) -> None:
+        """Подписчик CoefficientService: изменения → TaskMatcher → очередь оповещений."""
+        if self.matcher is None:
+            return
+        alerts = self.matcher.match(changed)
+        if alerts:
+            await self.submit(alerts)
+
+    async def submit(self, alerts: dict[tuple[int, int], list[CoefficientLike]]) -> None:
+        """Ставит в очередь совпадения {(user_id, warehouse_id): [коэффициенты, …]}."""
+        user_ids = list({user_id for user_id, _ in alerts})
+
+        # ── 1. токены ботов — одним запросом на всю пачку; имена складов — из справочника
+        async with db_helper.read_session_getter() as session:
+            tokens = await agents.get_active_bot_tokens(session, user_ids)
+            await warehouse_directory.ensure_loaded(session)
+
+        # ── 2. раскладываем по чатам; повтор той же ячейки просто перезаписывает её
+        loop = asyncio.get_running_loop()
+        default_token = self.bot.token
+        for (user_id, wh_id), coefs in alerts.items():
+            token = tokens.get(user_id, default_token)
+            chat = self._chat(token, user_id)
+            cells = chat.hits.setdefault(wh_id, {})
+            for coef in coefs:
+                day = coef.date.date() if isinstance(coef.date, datetime) else coef.date
+                cells[(coef.box_type_id, day)] = coef.coefficient
+
+            if not chat.scheduled:
+                chat.scheduled = True
+                chat.enqueued_at = time.monotonic()
+                loop.call_later(self.config.coalesce_delay, self._lane(token).ready.put_nowait, user_id)
+
+    # ── воркер ───────────────────────────────────────────────────────────────
+    async def _run_lane(self, token: str, lane: _TokenLane) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            chat_id = await lane.ready.get()
+            chat = self._chats.get((token, chat_id))
+            if chat is None or not chat.hits:
+                continue
+
+            # лимит на чат: если рано — вернём чат в очередь, не блокируя остальные
+            if (wait := chat.bucket.try_acquire()) > 0:
+                loop.call_later(wait, lane.ready.put_nowait, chat_id)
+                continue
+            await lane.bucket.acquire()
+
+            hits, chat.hits = chat.hits, {}
+            try:
+                await lane.bot.send_message(chat_id, self.render(hits))
+            except TelegramRetryAfter as e:
+                # flood control действует на весь токен — останавливаем очередь бота
+                logging.warning(f"Оповещения: retry_after={e.retry_after}с (bot {lane.bot.id})")
+                self._merge_back(chat, hits)
+                self.retried += 1
+                loop.call_later(e.retry_after, lane.ready.put_nowait, chat_id)
+                await asyncio.sleep(e.retry_after)
+                continue
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # бот заблокирован / чат не найден — повтор не поможет
+                logging.warning(f"Оповещение для {chat_id} отброшено: {e}")
+                self.failed += 1
+            except (TelegramNetworkError, TelegramServerError) as e:
+                chat.attempts += 1
+                if chat.attempts <= self.config.max_retries:
+                    self._merge_back(chat, hits)
+                    self.retried += 1
+                    loop.call_later(2 ** chat.attempts, lane.ready.put_nowait, chat_id)
+                    continue
+                logging.error(f"Оповещение для {chat_id} не отправлено после {chat.attempts} попыток: {e}")
+                self.failed += 1
+            except Exception as e:
+                logging.error(f"Ошибка отправки оповещения {chat_id}: {e}", exc_info=True)
+                self.failed += 1
+            else:
+                self.sent += 1
+                self._latencies.append(time.monotonic() - chat.enqueued_at)
+
+            # пока шла отправка, могли прийти новые совпадения
+            chat.attempts = 0
+            if chat.hits:
+                chat.enqueued_at = time.monotonic()
+                loop.call_later(self.config.per_chat_interval, lane.ready.put_nowait, chat_id)
+            else:
+                # bucket чата нужен ещё `per_chat_interval`: иначе новое совпадение уйдёт без паузы
+                chat.scheduled = False
+                loop.call_later(self.config.per_chat_interval, self._forget, token, chat_id)
+
+    # ── текст ────────────────────────────────────────────────────────────────
+    def render(self, hits: dict[int, dict[tuple[int, date], int]]) -> str:
+        """Одно сообщение на все склады из `hits`."""
+        blocks = []
+        for wh_id, cells in hits.items():
+            lines = [
+                self.lang['slot_alert_line'].format(
+                    date=day.strftime('%d.%m.%Y'),
+                    box=BOX_TITLES_RU.get(box_type_id, box_type_id),
+                    coefficient=coefficient,
+                )
+                for (box_type_id, day), coefficient in sorted(cells.items(), key=lambda c: (c[0][1], c[0][0]))
+            ]
+            blocks.append(self.lang['slot_alert_warehouse'].format(
+                name=warehouse_directory.name(wh_id, wh_id), slots="\n".join(lines)
+            ))
+        return self.lang['slot_alert'].format(warehouses="\n".join(blocks))
+
+    # ── статистика ───────────────────────────────────────────────────────────
+    def stats(self) -> dict[str, float | int | dict[str, int]]:
+        latencies = list(self._latencies)
+        return {
+            "queued_chats": sum(1 for chat in self._chats.values() if chat.hits),
+            "queued_hits": sum(len(c) for chat in self._chats.values() for c in chat.hits.values()),
+            "ready_depth": {token.split(":", 1)[0]: lane.ready.qsize() for token, lane in self._lanes.items()},
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p95": quantiles(latencies, n=20)[-1] if len(latencies) > 1 else (latencies[0] if latencies else 0.0),
+            "latency_max": max(latencies, default=0.0),
+        }
+
+    async def close(self) -> None:
+        """Останавливает воркеры и закрывает сессию ботов пользователей."""
+        for lane in self._lanes.values():
+            if lane.worker:
+                lane.worker.cancel()
+        await asyncio.gather(*(lane.worker for lane in self._lanes.values() if lane.worker), return_exceptions=True)
+        self._lanes.clear()
+        if self._session:
+            await self._session.close()
+
+    # ── служебное ────────────────────────────────────────────────────────────
+    def _chat(self, token: str, chat_id: int) -> _ChatQueue:
+        chat = self._chats.get((token, chat_id))
+        if chat is None:
+            chat = _ChatQueue(chat_id, token, TokenBucket(1 / self.config.per_chat_interval, 1))
+            self._chats[(token, chat_id)] = chat
+        return chat
+
+    def _forget(self, token: str, chat_id: int) -> None:
+        chat = self._chats.get((token, chat_id))
+        if chat is not None and not chat.scheduled:
+            del self._chats[(token, chat_id)]
+
+    def _lane(self, token: str) -> _TokenLane:
+        lane = self._lanes.get(token)
+        if lane is None:
+            lane = _TokenLane(bot=self._bot_for(token), bucket=TokenBucket(self.config.global_rate))
+            lane.worker = asyncio.create_task(self._run_lane(token, lane), name=f"alerts:{token.split(':', 1)[0]}")
+            self._lanes[token] = lane
+        return lane
+
+    def _bot_for(self, token: str) -> Bot:
+        if token == self.bot.token:
+            return self.bot
+        if self._session is None:
+            self._session = make_bot_session() or AiohttpSession()
+        return Bot(token=token, session=self._session, default=DefaultBotProperties(parse_mode=settings.bot.parse_mode))
+
+    @staticmethod
+    def _merge_back(chat: _ChatQueue, hits: dict[int, dict[tuple[int, date], int]]) -> None:
+        """Возвращает неотправленные совпадения; более свежие значения из chat.hits важнее."""
+        for wh_id, cells in hits.items():
+            chat.hits[wh_id] = {**cells, **chat.hits.get(wh_id, {})}
@@ -0,0 +1,69 @@
+import logging
+
+# Импортируем типизацию
+from typing import Awaitable, Callable, Iterable
+
+# Импортируем родительский класс, расширяя его
+from .extensions import BaseHandlerExtensions
+
+# Импортируем pydantic модели
+from ...schemas.coefficient import CoefficientCreate, CoefficientRead
+from app.schemas.general import ResponseError
+
+# Импортируем crud модели целиком
+from ...models.crud import coefficients
+
+CoefficientConsumer = Callable[[list[CoefficientRead]], Awaitable[None]]
+
+
+#----------------------------------------#----------------------------------------#
+class CoefficientService(BaseHandlerExtensions):
+    """
+    Загрузка коэффициентов: снимок → upsert → рассылка изменений подписчикам.
+
+    Подписчики (сопоставление с задачами, оповещения) получают только реальные
+    изменения — если полный снимок ничего не поменял, их никто не будит.
+    """
+    _consumers: list[CoefficientConsumer] = []
+
+    def __init__(self):
+        super().__init__()
+
+    @classmethod
+    def subscribe(cls, consumer: CoefficientConsumer) -> None:
+        """Регистрирует получателя изменений коэффициентов."""
+        cls._consumers.append(consumer)
+
+    @classmethod
+    async def publish(cls, changed: list[CoefficientRead]) -> None:
+        """Передаёт изменения всем подписчикам; ошибка одного не мешает остальным."""
+        for consumer in cls._consumers:
+            try:
+                await consumer(changed)
+            except Exception as e:
+                logging.error(f"Ошибка в подписчике коэффициентов {consumer!r}: {e}", exc_info=True)
+
+    @staticmethod
+    @BaseHandlerExtensions.with_session_and_error_handling
+    async def ingest_snapshot(
+            rows: Iterable[CoefficientCreate],
+            session=None
+    ) -> list[CoefficientRead] | ResponseError:
+        """
+        Загружает снимок коэффициентов (ключ — склад, тип упаковки, дата).
+
+        :param rows: Строки снимка; неполные строки отбрасываются схемой CoefficientCreate
+        :param session: Для декоратора (он автоматически заполняет этот параметр)
+        :return: Список вставленных/изменённых строк, иначе — ResponseError
+        """
+        changed = await coefficients.upsert_coefficients(session, rows)
+        if changed is None:
+            return ResponseError(
+                message="Ошибка при загрузке снимка коэффициентов",
+                code="COEFFICIENTS_INGEST_ERROR"
+            )
+
+        logging.info(f"Коэффициенты: изменилось строк — {len(changed)}")
+        if changed:
+            await CoefficientService.publish(changed)
+        return changed
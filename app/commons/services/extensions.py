@@ -6,6 +6,7 @@ from functools import wraps
 from typing import TypeVar, Callable, Coroutine, Any
 
 from app.models.alchemy_helper import db_helper
+from app.models.write_queue import write_queue
 from app.schemas.general import ResponseModel, ResponseError
 
 F = TypeVar("F", bound=Callable[..., Coroutine[Any, Any, Any]])
@@ -31,3 +32,43 @@ class BaseHandlerExtensions:
                 )
 
         return wrapper  # type: ignore
+
+    @staticmethod
+    def with_read_session_and_error_handling(func: F) -> F:
+        """Для методов, которые только читают: сессия читателей (db_helper.read_session_getter)."""
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                async with db_helper.read_session_getter() as session:
+                    return await func(*args, session=session, **kwargs)
+            except Exception as e:
+                logging.error(f"Error in {func.__name__}: {e}", exc_info=True)
+                return ResponseError(
+                    message=f"Произошла ошибка в функции {func.__name__}",
+                    code="INTERNAL_ERROR",
+                    errors=[str(e)]
+                )
+
+        return wrapper  # type: ignore
+
+    @staticmethod
+    def with_write_queue_and_error_handling(func: F) -> F:
+        """
+        Метод записи выполняется целиком как задание очереди записи (write_queue.submit):
+        вне апдейта записи уходят групповым коммитом, внутри — в транзакции апдейта.
+        Внутри метода — только база и структуры в памяти, без запросов к Bot API:
+        пока он работает, ждёт вся пачка.
+        """
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await write_queue.submit(lambda session: func(*args, session=session, **kwargs))
+            except Exception as e:
+                logging.error(f"Error in {func.__name__}: {e}", exc_info=True)
+                return ResponseError(
+                    message=f"Произошла ошибка в функции {func.__name__}",
+                    code="INTERNAL_ERROR",
+                    errors=[str(e)]
+                )
+
+        return wrapper  # type: ignore
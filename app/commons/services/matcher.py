@@ -0,0 +1,244 @@
+import asyncio
+import logging
+from bisect import bisect_right, insort
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Iterable, Optional, Protocol
+
+# Импортируем Хэлпер для алхимии, предоставляет доступ к базе
+from ...models.alchemy_helper import db_helper
+
+# Импортируем crud модели целиком
+from ...models.crud import slots
+
+from config.config import settings, MatcherSettings
+
+
+class TaskLike(Protocol):
+    """Всё, что похоже на задачу-диапазон: TaskRange, TaskRangeCreate, TaskRangeRead."""
+    user_id: int
+    warehouse_id: int
+    box_type_ids: list[int]
+    coefficient: int
+    date_from: date
+    date_to: date
+    alarm: Optional[int]
+
+
+class CoefficientLike(Protocol):
+    """Строка коэффициента: Coefficient (ORM) или CoefficientRead."""
+    warehouse_id: Optional[int]
+    box_type_id: Optional[int]
+    coefficient: int
+    date: Optional[date | datetime]
+
+
+@dataclass(slots=True, frozen=True)
+class TaskWindow:
+    """Одна задача в индексе: период поиска и порог коэффициента."""
+    date_from: date
+    date_to: date
+    coefficient: int
+    user_id: int
+    warehouse_id: int
+    box_type_ids: tuple[int, ...]
+    alarm: int
+
+
+_by_date_from = attrgetter("date_from")
+
+
+#----------------------------------------#----------------------------------------#
+class TaskMatcher:
+    """
+    Сопоставляет новые коэффициенты с задачами пользователей.
+
+    Индекс: (warehouse_id, box_type_id) → список TaskWindow, отсортированный по date_from.
+    Для строки коэффициента достаточно одного обращения к словарю и bisect по дате —
+    задачи других складов и типов упаковки не просматриваются вовсе.
+
+    В индексе лежат только задачи с включёнными уведомлениями; все задачи (в т.ч. с
+    выключенным alarm) хранятся в `_tasks`, чтобы переключение alarm не требовало
+    похода в базу.
+
+    Изменения приходят из сервисов через db_helper.on_commit — только после COMMIT;
+    каждое задаёт итоговое состояние (а не «переключить»), поэтому повтор безопасен.
+
+    Индекс свой у каждого процесса: задачи, записанные другими процессами (webhook с
+    несколькими воркерами), он увидит при перечитывании раз в `reload_interval` сек.
+    Перечитывание убирает и задачи с закончившимся периодом; между перечитываниями
+    их убирает `match`, как только на них наткнётся.
+    """
+
+    def __init__(self, config: MatcherSettings = settings.matcher) -> None:
+        self.config = config
+        self._index: dict[tuple[int, int], list[TaskWindow]] = defaultdict(list)
+        self._tasks: dict[tuple[int, int], TaskWindow] = {}
+        # изменения, пришедшие, пока load() читает базу: применяются и к новому снимку
+        self._journal: Optional[list[tuple[str, tuple[Any, ...]]]] = None
+        self._load_lock = asyncio.Lock()
+        self._reloader: Optional[asyncio.Task] = None
+        self.loaded: bool = False
+
+    # ── загрузка ─────────────────────────────────────────────────────────────
+    async def load(self) -> int:
+        """
+        Полностью перестраивает индекс по актуальным задачам из базы.
+
+        Пока идёт чтение, текущий индекс продолжает работать и меняться; эти изменения
+        записываются в журнал и повторяются на новом снимке перед подменой.
+        """
+        async with self._load_lock:
+            self._journal = []
+            try:
+                async with db_helper.read_session_getter() as session:
+                    tasks = await slots.get_actual_tasks(session, date.today())
+            finally:
+                journal, self._journal = self._journal, None
+
+            fresh = TaskMatcher(self.config)
+            for task in tasks:
+                fresh.add(task)
+            for method, args in journal:
+                getattr(fresh, method)(*args)
+            self._index, self._tasks = fresh._index, fresh._tasks
+            self.loaded = True
+
+        logging.info(f"TaskMatcher: загружено задач — {len(self._tasks)}, ключей индекса — {len(self._index)}")
+        return len(self._tasks)
+
+    def start_reload(self) -> None:
+        """Запускает перечитывание индекса по таймеру (если `reload_interval` > 0)."""
+        if self.config.reload_interval > 0 and self._reloader is None:
+            self._reloader = asyncio.create_task(self._reload_loop(), name="task-matcher")
+
+    async def stop_reload(self) -> None:
+        if self._reloader:
+            self._reloader.cancel()
+            await asyncio.gather(self._reloader, return_exceptions=True)
+            self._reloader = None
+
+    async def _reload_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.reload_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                # остаёмся на прежнем индексе — инкрементальные изменения в нём уже есть
+                logging.error(f"Ошибка перечитывания индекса задач: {e}", exc_info=True)
+
+    # ── инкрементальные изменения ────────────────────────────────────────────
+    def add(self, task: TaskLike) -> None:
+        """Добавляет (или заменяет) задачу пользователя по складу."""
+        self._record("add", task)
+        window = TaskWindow(
+            date_from=task.date_from,
+            date_to=task.date_to,
+            coefficient=task.coefficient,
+            user_id=int(task.user_id),
+            warehouse_id=int(task.warehouse_id),
+            box_type_ids=tuple(task.box_type_ids),
+            alarm=1 if task.alarm is None else int(task.alarm),
+        )
+        self._remove(window.user_id, window.warehouse_id)
+        self._tasks[(window.user_id, window.warehouse_id)] = window
+        if window.alarm:
+            self._link(window)
+
+    def discard(self, user_id: int, warehouse_id: int | str) -> None:
+        """Убирает задачу пользователя по складу (если она была)."""
+        self._record("discard", user_id, warehouse_id)
+        self._remove(int(user_id), int(warehouse_id))
+
+    def discard_user(self, user_id: int) -> None:
+        """Убирает все задачи пользователя."""
+        self._record("discard_user", user_id)
+        for key in [key for key in self._tasks if key[0] == user_id]:
+            self._remove(*key)
+
+    def set_alarm(self, user_id: int, warehouse_id: int | str, alarm: int) -> None:
+        """Зеркалит slots.toggle_alarm_state: alarm задачи = новое значение из базы."""
+        self._record("set_alarm", user_id, warehouse_id, alarm)
+        window = self._tasks.get((int(user_id), int(warehouse_id)))
+        if window is not None:
+            self._set_alarm(window, alarm)
+
+    def set_alarm_all(self, user_id: int, state: int) -> None:
+        """Зеркалит slots.set_alarm_state_all: alarm = state для всех задач пользователя."""
+        self._record("set_alarm_all", user_id, state)
+        for window in [w for key, w in self._tasks.items() if key[0] == user_id]:
+            self._set_alarm(window, state)
+
+    # ── сопоставление ────────────────────────────────────────────────────────
+    def match(self, coefficients: Iterable[CoefficientLike]) -> dict[tuple[int, int], list[CoefficientLike]]:
+        """
+        Возвращает оповещения для пачки коэффициентов:
+        {(user_id, warehouse_id): [подходящие строки коэффициентов, …]}
+
+        Строка подходит задаче, если склад и тип упаковки совпадают, дата попадает
+        в [date_from, date_to], а коэффициент не выше порога (отрицательный = приёмки нет).
+        Задачи с закончившимся периодом попутно убираются из индекса.
+        """
+        today = date.today()
+        expired: set[tuple[int, int]] = set()
+        alerts: dict[tuple[int, int], list[CoefficientLike]] = defaultdict(list)
+        for coef in coefficients:
+            if coef.warehouse_id is None or coef.box_type_id is None or coef.date is None or coef.coefficient < 0:
+                continue
+
+            windows = self._index.get((coef.warehouse_id, coef.box_type_id))
+            if not windows:
+                continue
+
+            day = coef.date.date() if isinstance(coef.date, datetime) else coef.date
+            # все окна, начавшиеся не позже `day`, лежат левее hi — без копирования среза
+            hi = bisect_right(windows, day, key=_by_date_from)
+            for window in islice(windows, hi):
+                if window.date_to < today:
+                    expired.add((window.user_id, window.warehouse_id))
+                elif window.date_to >= day and coef.coefficient <= window.coefficient:
+                    alerts[(window.user_id, window.warehouse_id)].append(coef)
+
+        for user_id, warehouse_id in expired:
+            self._remove(user_id, warehouse_id)
+        return dict(alerts)
+
+    # ── служебное ────────────────────────────────────────────────────────────
+    def _record(self, method: str, *args: Any) -> None:
+        if self._journal is not None:
+            self._journal.append((method, args))
+
+    def _remove(self, user_id: int, warehouse_id: int) -> None:
+        window = self._tasks.pop((user_id, warehouse_id), None)
+        if window is not None and window.alarm:
+            self._unlink(window)
+
+    def _link(self, window: TaskWindow) -> None:
+        for box_type_id in window.box_type_ids:
+            insort(self._index[(window.warehouse_id, box_type_id)], window, key=_by_date_from)
+
+    def _unlink(self, window: TaskWindow) -> None:
+        for box_type_id in window.box_type_ids:
+            key = (window.warehouse_id, box_type_id)
+            windows = self._index.get(key)
+            if not windows:
+                continue
+            windows.remove(window)
+            if not windows:
+                del self._index[key]
+
+    def _set_alarm(self, window: TaskWindow, alarm: int) -> None:
+        if bool(window.alarm) == bool(alarm):
+            return
+        if window.alarm:
+            self._unlink(window)
+        updated = replace(window, alarm=alarm)
+        self._tasks[(window.user_id, window.warehouse_id)] = updated
+        if updated.alarm:
+            self._link(updated)
+
+
+task_matcher = TaskMatcher()
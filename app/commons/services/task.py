@@ -1,5 +1,6 @@
 import logging
-from datetime import datetime, date
+from datetime import date
+from functools import partial
 from pprint import pprint
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -9,6 +10,12 @@ from typing import Any, Coroutine, Sequence, Union, Literal, Optional
 # Импортируем родительский класс, расширяя его
 from .extensions import BaseHandlerExtensions
 
+# Индекс задач для сопоставления с коэффициентами — держим его в актуальном состоянии
+from .matcher import task_matcher
+
+# Справочник складов в памяти: страницы и имена без запросов к базе
+from .warehouses import warehouse_directory
+
 # Импортируем класс для вывода системной информации и дампа данных
 from ..utils.dump import DebugTools
 
@@ -19,7 +26,7 @@ from ...enums.constants import BOX_TYPE_MAP
 from ...models.alchemy_helper import db_helper
 
 # Импортируем pydantic модели
-from ...schemas.task import TaskCreate, TaskRead
+from ...schemas.task import TaskRangeCreate
 from ...schemas.user import UserRead, UserCreate
 from ...schemas.warehouse import WarehouseRead
 from app.schemas.general import ResponseModel, ResponseWarehouses, ResponseError, ResponseTasks
@@ -55,7 +62,7 @@ class TaskService(BaseHandlerExtensions):
         return [ref[w_id] for w_id in selected_ids if w_id in ref]
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_read_session_and_error_handling
     async def handle_create_task(
             user_id: int,
             page: int = None,
@@ -75,57 +82,43 @@ class TaskService(BaseHandlerExtensions):
         return {'text': 'success'}
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_read_session_and_error_handling
     async def get_warehouses_page(
             limit: int = 30,
             offset: int = 0,
             mode: str = None,
             session=None
     ) -> ResponseWarehouses | ResponseError:
-        rows = await hubs.get_all_warehouses(session, offset, limit)
-        total_whs = await hubs.count_warehouses(session)
-
-        warehouses = [{"id": w.warehouse_id, "name": w.warehouse_name} for w in rows]
+        await warehouse_directory.ensure_loaded(session)
 
         return ResponseWarehouses(
-            warehouses=warehouses,
+            warehouses=warehouse_directory.page(offset, limit),
             mode=mode,
             offset=offset,
             limit=limit,
-            total=total_whs
+            total=warehouse_directory.total
         )
 
-
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_read_session_and_error_handling
     async def get_user_uniq_task_with_names(
             user_id: int,
             limit: Optional[int] = None,
             offset: Optional[int] = 0,
             session=None
     ) -> ResponseTasks | ResponseError:
-        # ── 1. Получаем все уникальные задачи пользователя (по складам)
-        uniq_task: Sequence[TaskRead] = await slots.get_tasks_unique_by_warehouse(session, user_id)
-
-        # ── 1.1. Вытягиваем id складов и статус уведомлений в uniq_task_alarm;
-        uniq_task_alarm = [{"id": task.warehouse_id, "alarm": task.alarm} for task in uniq_task if task.warehouse_id is not None]
+        # ── 1. Задачи пользователя (по одной на склад), имена складов и их количество — одним запросом
+        tasks, whs_names, total = await slots.get_task_overview(session, user_id)
 
-        # ── 2. Получаем количество уникальных задач
-        total = await slots.count_uniq_tasks_by_whs(session, user_id)
-
-        # ── 3. Образуем список складов (whs_list) и получаем их имена (whs_names)
-        whs_list = [w["id"] for w in uniq_task_alarm]
-        whs_names = await hubs.get_warehouses_name_map(session, whs_list)
-
-        # ── 4. Передаем в модель ResponseTasks
-        return ResponseTasks(tasks=list(uniq_task), offset=offset, limit=limit, total=total,
-                                  warehouses_names_list=whs_names)
+        # ── 2. Передаем в модель ResponseTasks
+        return ResponseTasks(tasks=tasks, offset=offset, limit=limit, total=total,
+                             warehouses_names_list=whs_names)
 
         # DebugTools.pretty_dump(uniq_task, style="rich", title="📦 Product Dump")
         # DebugTools.pretty_dump(uniq_task_alarm, style="rich", title="📦 Product Dump")
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_read_session_and_error_handling
     async def get_user_uniq_task_warehouse_ids(
             user_id: int,
             session=None
@@ -134,52 +127,62 @@ class TaskService(BaseHandlerExtensions):
         return ResponseTasks(tasks=list(warehouses_ids), offset=0, limit=1, total=0)
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_write_queue_and_error_handling
     async def create_bulk_tasks(
             user_id: int,
             warehouse_ids: list[int],
             box_types: list[str],
             max_coef: int,
-            days_range: list[datetime],
+            date_from: date,
+            date_to: date,
             session=None
-    ):
-        """Создаёт задачи на каждый день, склад, тип упаковки и коэффициент."""
-        for warehouse_id in warehouse_ids:
-            for box_type_id in box_types:
-                for coef in range(max_coef + 1):
-                    for task_date in days_range:
-                        task_data = TaskCreate(
-                            user_id=user_id,
-                            warehouse_id=warehouse_id,
-                            box_type_id=BOX_TYPE_MAP[box_type_id],
-                            coefficient=coef,
-                            state="new",
-                            alarm=1,
-                            date=task_date
-                        )
-                        transaction = await slots.create_task(session,  task_data)
+    ) -> int | ResponseError:
+        """
+        Создаёт по одной задаче-диапазону на каждый склад: типы упаковки,
+        максимальный коэффициент и период хранятся в одной строке `task_ranges`.
+        Склад, по которому задача уже есть, перезаписывается новыми параметрами.
 
+        :return: Количество сохранённых задач, иначе — ResponseError
+        """
+        box_type_ids = [BOX_TYPE_MAP[box_type] for box_type in box_types]
+        tasks = [
+            TaskRangeCreate(
+                user_id=user_id,
+                warehouse_id=warehouse_id,
+                box_type_ids=box_type_ids,
+                coefficient=max_coef,
+                date_from=date_from,
+                date_to=date_to,
+            )
+            for warehouse_id in warehouse_ids
+        ]
+        inserted = await slots.create_tasks_bulk(session, tasks)
+        if inserted > 0:
+            # индекс — только после настоящего COMMIT: здесь фиксируется лишь SAVEPOINT
+            for task in tasks:
+                db_helper.on_commit(partial(task_matcher.add, task))
+            logging.info(f"Сохранено задач: {inserted} (user_id={user_id})")
+            return inserted
 
+        return ResponseError(
+            message=f"Ошибка при массовом создании задач: user_id={user_id}",
+            code="BULK_CREATE_ERROR"
+        )
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_read_session_and_error_handling
     async def get_all_unique_tasks(
             user_id: int,
             limit: int,
             offset: int = 0,
             session=None
     ) -> ResponseTasks | ResponseError:
-        tasks = await slots.get_tasks_by_user_with_limit(session, user_id, limit, offset)
-        tasks_serialized = [
-            TaskRead.model_validate(task)
-            for task in tasks
-        ]
-        total_whs_in_tasks = await slots.count_uniq_tasks_by_whs(session, user_id)
-
-        return ResponseTasks(tasks=tasks_serialized, offset=offset, limit=limit, total=total_whs_in_tasks)
+        tasks, whs_names, total = await slots.get_task_overview(session, user_id, limit, offset)
+        return ResponseTasks(tasks=tasks, offset=offset, limit=limit, total=total,
+                             warehouses_names_list=whs_names)
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_read_session_and_error_handling
     async def get_whs_by_ids(
             warehouses_ids: Sequence[int],
             session=None
@@ -191,30 +194,21 @@ class TaskService(BaseHandlerExtensions):
         return ResponseWarehouses(warehouses=warehouses, offset=0, limit=1, total=0)
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_read_session_and_error_handling
     async def get_wh_with_names(
             user_id: int,
             warehouses_ids: Sequence[int],
             session=None
     ) -> ResponseTasks | ResponseError:
-        # ── 1. Получаем все уникальные задачи пользователя (по складам)
-        uniq_task: Sequence[TaskRead] = await slots.get_tasks_by_user_and_wh(session, user_id, list(warehouses_ids))
-        # single_task = ()
-
-        # ── 1.1. Вытягиваем id складов и статус уведомлений в uniq_task_alarm;
-        uniq_task_alarm = [{"id": task.warehouse_id, "alarm": task.alarm} for task in uniq_task if
-                           task.warehouse_id is not None]
-
-        # ── 2. Образуем список складов (whs_list) и получаем их имена (whs_names)
-        whs_list = [w["id"] for w in uniq_task_alarm]
-        whs_names = await hubs.get_warehouses_name_map(session, whs_list)
+        # ── 1. Задачи пользователя по складам вместе с именами складов — одним запросом
+        tasks, whs_names, _ = await slots.get_task_overview(session, user_id, warehouse_ids=list(warehouses_ids))
 
-        # ── 3. Передаем в модель ResponseTasks
-        return ResponseTasks(tasks=list(uniq_task), offset=0, limit=1, total=0,
+        # ── 2. Передаем в модель ResponseTasks
+        return ResponseTasks(tasks=tasks, offset=0, limit=1, total=0,
                              warehouses_names_list=whs_names)
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_write_queue_and_error_handling
     async def toggle_alarm_for_wh(
             user_id: int,
             warehouse_id: int,
@@ -234,8 +228,9 @@ class TaskService(BaseHandlerExtensions):
         """
         if state is None:
             # ── одиночное переключение ─────────────────────────────
-            toggle = await slots.toggle_alarm_state(session, user_id, warehouse_id)
-            if toggle > 0:
+            alarm = await slots.toggle_alarm_state(session, user_id, warehouse_id)
+            if alarm is not None:
+                db_helper.on_commit(partial(task_matcher.set_alarm, user_id, warehouse_id, alarm))
                 return True
 
             return ResponseError(
@@ -246,6 +241,7 @@ class TaskService(BaseHandlerExtensions):
         # ── массовое изменение ─────────────────────────────────────
         toggle = await slots.set_alarm_state_all(session, user_id, state)
         if toggle > 0:
+            db_helper.on_commit(partial(task_matcher.set_alarm_all, user_id, state))
             return True
 
         return ResponseError(
@@ -254,7 +250,7 @@ class TaskService(BaseHandlerExtensions):
         )
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_write_queue_and_error_handling
     async def delete_all_tasks(
             user_id: int,
             session=None
@@ -268,6 +264,7 @@ class TaskService(BaseHandlerExtensions):
         """
         trash = await slots.delete_tasks_by_user(session, user_id)
         if trash > 0:
+            db_helper.on_commit(partial(task_matcher.discard_user, user_id))
             return True
 
         return ResponseError(
@@ -276,7 +273,7 @@ class TaskService(BaseHandlerExtensions):
         )
 
     @staticmethod
-    @BaseHandlerExtensions.with_session_and_error_handling
+    @BaseHandlerExtensions.with_write_queue_and_error_handling
     async def delete_single_tasks(
             user_id: int,
             wh_id: int,
@@ -292,6 +289,7 @@ class TaskService(BaseHandlerExtensions):
         """
         trash = await slots.delete_tasks_by_user_and_warehouse(session, user_id, wh_id)
         if trash > 0:
+            db_helper.on_commit(partial(task_matcher.discard, user_id, wh_id))
             return True
 
         return ResponseError(
@@ -1,4 +1,6 @@
 import logging
+from collections import OrderedDict
+from functools import partial
 from sqlalchemy.exc import SQLAlchemyError
 
 # Импортируем типизацию
@@ -12,6 +14,7 @@ from ...enums.constants import BOX_TYPE_MAP
 
 # Импортируем Хэлпер для алхимии, предоставляет доступ к базе
 from ...models.alchemy_helper import db_helper
+from ...models.write_queue import write_queue
 
 # Импортируем pydantic модели
 from ...schemas.user import UserRead, UserCreate
@@ -20,6 +23,43 @@ from app.schemas.general import ResponseModel, ResponseWarehouses, ResponseError
 # Импортируем crud модели целиком
 from ...models.crud import clients
 
+# Сколько user_id помнить как «точно есть в базе»
+KNOWN_USERS_CACHE_SIZE = 50_000
+
+
+class KnownUsers:
+    """
+    Ограниченный LRU-набор user_id, которые уже есть в таблице users.
+
+    Пользователи из базы не удаляются, поэтому запись здесь не устаревает: повторный /start
+    обходится без запросов. При переполнении вытесняются давно не заходившие.
+    """
+
+    def __init__(self, maxsize: int = KNOWN_USERS_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._ids: OrderedDict[int, None] = OrderedDict()
+
+    def __contains__(self, user_id: int) -> bool:
+        if user_id in self._ids:
+            self._ids.move_to_end(user_id)
+            return True
+        return False
+
+    def add(self, user_id: int) -> None:
+        self._ids[user_id] = None
+        self._ids.move_to_end(user_id)
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+
+    def discard(self, user_id: int) -> None:
+        self._ids.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+known_users = KnownUsers()
+
 
 #----------------------------------------#----------------------------------------#
 class UserService(BaseHandlerExtensions):
@@ -29,14 +69,18 @@ class UserService(BaseHandlerExtensions):
     @staticmethod
     async def user_exists(user_id: int) -> bool:
         try:
-            async with db_helper.session_getter() as session:
+            async with db_helper.read_session_getter() as session:
                 return await clients.user_exists_by_id(session, user_id)
         except SQLAlchemyError as e:
             logging.error(f"Ошибка при проверке пользователя {user_id}: {e}", exc_info=True)
             return False
 
     @staticmethod
-    async def create_default_user(user_id: int, username: str) -> UserRead:
+    async def create_default_user(user_id: int, username: str) -> Optional[UserRead]:
+        """
+        Создаёт пользователя, если его ещё нет (INSERT ... ON CONFLICT DO NOTHING).
+        Существующий пользователь не считается ошибкой — вернётся он же.
+        """
         try:
             user_data = UserCreate(
                 user_id=user_id,
@@ -44,14 +88,26 @@ class UserService(BaseHandlerExtensions):
                 activity="start",
                 bot_status=False,
             )
-            async with db_helper.session_getter() as session:
-                created_user = await clients.create_user(session, user_data)
-                return UserRead.model_validate(created_user)  # Преобразуем ORM → Pydantic
+            async def insert(session) -> Optional[bool]:
+                created = await clients.insert_user_if_absent(session, user_data)
+                if created is not None:
+                    # в кэш — только после COMMIT апдейта или пачки очереди: здесь зафиксирован лишь SAVEPOINT
+                    db_helper.on_commit(partial(known_users.add, user_id))
+                return created
+
+            created = await write_queue.submit(insert)
+            if created is None:
+                return None
+            if not created:
+                return UserRead(user_id=user_id, username=username)
+            logging.info(f"Новый пользователь {user_id}")
+            return UserRead(**user_data.model_dump())
         except SQLAlchemyError as e:
             logging.error(f"Ошибка при создании пользователя {user_id}: {e}", exc_info=True)
 
-    async def get_or_create_user(self, user_id: int, username: str) -> UserRead:
-        if await self.user_exists(user_id):
+    async def get_or_create_user(self, user_id: int, username: str) -> Optional[UserRead]:
+        # Уже встречали в этом процессе — в базу не ходим
+        if user_id in known_users:
             return UserRead(user_id=user_id, username=username)
 
         return await self.create_default_user(user_id, username)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from array import array
+from typing import Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Импортируем Хэлпер для алхимии, предоставляет доступ к базе
+from ...models.alchemy_helper import db_helper
+
+# Импортируем crud модели целиком
+from ...models.crud import hubs
+
+from config.config import settings, WarehouseDirectorySettings
+
+
+#----------------------------------------#----------------------------------------#
+class WarehouseDirectory:
+    """
+    Справочник складов в памяти процесса.
+
+    • загружается одним запросом и заменяется целиком (читатели не видят полузагруженный список);
+    • хранится компактно: `array` id складов и список имён в порядке `warehouses.id`
+      плюс словарь warehouse_id → позиция;
+    • страницы, общее количество и имена по id отдаются без обращения к базе;
+    • перечитывается по таймеру (`refresh_interval`) или явно через invalidate().
+    """
+
+    def __init__(self, config: WarehouseDirectorySettings = settings.warehouses) -> None:
+        self.config = config
+        self._ids: array = array("q")
+        self._names: list[str] = []
+        self._position: dict[int, int] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        self.loaded: bool = False
+
+    # ── загрузка ─────────────────────────────────────────────────────────────
+    async def load(self, session: Optional[AsyncSession] = None) -> int:
+        """Перечитывает справочник из базы (в переданной сессии или в новой)."""
+        if session is None:
+            async with db_helper.read_session_getter() as session:
+                rows = await hubs.get_warehouse_directory(session)
+        else:
+            rows = await hubs.get_warehouse_directory(session)
+
+        ids = array("q", (warehouse_id for warehouse_id, _ in rows))
+        names = [name or "" for _, name in rows]
+        self._ids, self._names, self._position = ids, names, {wid: i for i, wid in enumerate(ids)}
+        self.loaded = True
+        logging.info(f"Справочник складов: загружено {len(ids)}")
+        return len(ids)
+
+    async def ensure_loaded(self, session: Optional[AsyncSession] = None) -> None:
+        if not self.loaded:
+            await self.load(session)
+
+    async def invalidate(self) -> None:
+        """Явное обновление — после изменения таблицы `warehouses`."""
+        await self.load()
+
+    def start_refresh(self) -> None:
+        """Запускает фоновое обновление по таймеру (если `refresh_interval` > 0)."""
+        if self.config.refresh_interval > 0 and self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop(), name="warehouse-directory")
+
+    async def stop_refresh(self) -> None:
+        if self._refresher:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.refresh_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                # остаёмся на прежнем снимке — он лучше, чем никакой
+                logging.error(f"Ошибка обновления справочника складов: {e}", exc_info=True)
+
+    # ── чтение ───────────────────────────────────────────────────────────────
+    @property
+    def total(self) -> int:
+        return len(self._ids)
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> list[dict[str, int | str]]:
+        """Страница по смещению: [{'id': …, 'name': …}, …] — срез массива, без OFFSET в базе."""
+        end = self.total if limit is None else offset + limit
+        return [{"id": self._ids[i], "name": self._names[i]} for i in range(max(offset, 0), min(end, self.total))]
+
+    def page_after(self, warehouse_id: Optional[int], limit: int) -> list[dict[str, int | str]]:
+        """Keyset-страница: `limit` складов после склада `warehouse_id` (None — с начала)."""
+        start = 0 if warehouse_id is None else self._position.get(warehouse_id, -1) + 1
+        return self.page(start, limit)
+
+    def name(self, warehouse_id: int, default: Optional[str] = None) -> Optional[str]:
+        position = self._position.get(warehouse_id)
+        return self._names[position] if position is not None else default
+
+    def name_map(self, warehouse_ids: Iterable[int]) -> list[dict[str, int | str]]:
+        """То же, что hubs.get_warehouses_name_map: [{'id': …, 'name': …}] для известных складов."""
+        position = self._position
+        return [
+            {"id": wid, "name": self._names[position[wid]]}
+            for wid in dict.fromkeys(warehouse_ids) if wid in position
+        ]
+
+    def __contains__(self, warehouse_id: int) -> bool:
+        return warehouse_id in self._position
+
+
+warehouse_directory = WarehouseDirectory()
@@ -1,11 +1,27 @@
 # https://github.com/MartyshWin/config_logging.git
+import atexit
 import copy
+import json
 import logging
 import logging.config
+import logging.handlers
+import queue
 import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
 
 from app.enums.logging import LogLevel
 from config.LoggerdictConfig import BASE_LOGGING_CONFIG
+from config.config import LoggingSettings
+
+# Апдейт, в контексте которого идёт логирование (выставляет LoggingMiddleware)
+current_update_id: ContextVar[Optional[int]] = ContextVar("current_update_id", default=None)
+# Попал ли текущий апдейт в выборку DEBUG-логов; вне апдейтов — всегда да
+update_debug_sampled: ContextVar[bool] = ContextVar("update_debug_sampled", default=True)
+
+# Слушатель очереди логов: форматирование и запись идут в его потоке, а не в event loop
+_listener: Optional[logging.handlers.QueueListener] = None
 
 
 class ColoredFormatter(logging.Formatter):
@@ -84,6 +100,55 @@ class ColoredFormatter(logging.Formatter):
         return f"{ts} --- {lvl} {file} == {msg}{exc}"
 
 
+class JsonFormatter(logging.Formatter):
+    """
+    Одна запись — одна строка JSON: ts, level, logger, file, line, message, update_id, exc.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        update_id = getattr(record, "update_id", None)
+        if update_id is not None:
+            payload["update_id"] = update_id
+        if record.exc_info:
+            payload["exc"] = "".join(traceback.format_exception(*record.exc_info)).strip()
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class UpdateContextFilter(logging.Filter):
+    """
+    Работает в потоке вызова логгера, пока контекст апдейта ещё доступен:
+    • добавляет к записи `update_id`;
+    • отбрасывает DEBUG-записи апдейтов, не попавших в выборку.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and not update_debug_sampled.get():
+            return False
+        record.update_id = current_update_id.get()
+        return True
+
+
+class LoopQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler для event loop: в потоке вызова только подставляет аргументы в сообщение
+    (они могут измениться позже) и кладёт запись в очередь. Трейсбек, цвета и JSON
+    собираются форматтерами в потоке QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
 def add_success_level():
     """
     Добавляем новый уровень (SUCCESS) к стандартному модулю logging.
@@ -97,7 +162,18 @@ def add_success_level():
 
     logging.Logger.success = success
 
-def setup_logger(logging_level: LogLevel = LogLevel.DEBUG):
+def setup_logger(logging_level: LogLevel = LogLevel.DEBUG, config: Optional[LoggingSettings] = None):
+    """
+    Настраивает логирование через очередь:
+
+        logger (поток event loop) → LoopQueueHandler → очередь → QueueListener (свой поток)
+                                                              → console (colored) [+ file]
+
+    В event loop остаётся только фильтр и put в очередь; форматирование и запись в консоль/файл
+    не блокируют обработку апдейтов. Файл `logs_dir/app.log` ротируется по размеру.
+    """
+    global _listener
+    config = config or LoggingSettings(level=logging_level, log_to_file_status=False)
     add_success_level()  # Добавляем уровень SUCCESS
     cfg = copy.deepcopy(BASE_LOGGING_CONFIG)
 
@@ -107,21 +183,51 @@ def setup_logger(logging_level: LogLevel = LogLevel.DEBUG):
     cfg["root"]["level"] = logging_level.value
     cfg["handlers"]["console"]["level"] = logging_level.value
 
-    # ——— при необходимости пишем в файл ———
-    # ——— Включение записи логов в файл  ———
-    # if log_status:
-    #     log_path = logs_dir / "app.log"
-    #     log_path.parent.mkdir(parents=True, exist_ok=True)
-    #
-    #     cfg["handlers"]["file"] = {
-    #         "class": "logging.FileHandler",
-    #         "filename": str(log_path),
-    #         "level": logging_level.value,
-    #         "formatter": "colored",
-    #     }
-    #     cfg["root"]["handlers"].append("file")
+    # ——— Включение записи логов в файл (с ротацией) ———
+    if config.log_to_file_status:
+        log_path = config.logs_dir / "app.log"
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+
+        cfg["handlers"]["file"] = {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": str(log_path),
+            "maxBytes": config.file_max_bytes,
+            "backupCount": config.file_backup_count,
+            "encoding": "utf-8",
+            "level": logging_level.value,
+            "formatter": "json" if config.file_format == "json" else "plain",
+        }
+        cfg["root"]["handlers"].append("file")
+
+    if _listener is not None:  # повторная настройка — дописываем старую очередь
+        _listener.stop()
     logging.config.dictConfig(cfg)
 
+    # ——— выносим обработчики корневого логгера за очередь ———
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LoopQueueHandler(log_queue)
+    queue_handler.addFilter(UpdateContextFilter())
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logger() -> None:
+    """Дописывает очередь логов и останавливает поток слушателя (вызывается и при выходе)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logger)
+
 
 # Использования уровней логирования (Примеры)
 if __name__ == "__main__":
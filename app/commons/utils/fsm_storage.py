@@ -0,0 +1,228 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, AsyncIterator, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType, DefaultKeyBuilder, KeyBuilder
+
+from app.enums.general import TaskMode, BoxType, TariffOptions
+
+# Импортируем Хэлпер для алхимии, предоставляет доступ к базе
+from app.models.alchemy_helper import db_helper
+from app.models.write_queue import write_queue
+
+# Импортируем crud модели целиком
+from app.models.crud import states
+
+from config.config import settings, FSMSettings
+
+# Enum, которые могут лежать в данных состояния (например, setup_task['mode'])
+STATE_ENUMS: dict[str, type[Enum]] = {cls.__name__: cls for cls in (TaskMode, BoxType, TariffOptions)}
+
+
+#----------------------------------------#----------------------------------------#
+def encode_state_data(value: Any) -> Any:
+    """
+    Данные состояния → JSON-совместимое дерево.
+
+    Даты, Enum и кортежи помечаются, чтобы после чтения обработчики получили те же типы:
+    `update_task['default'][0].isoformat()`, `setup_task['mode'] is TaskMode.FLEX`.
+    """
+    if isinstance(value, Enum):
+        return {"$enum": type(value).__name__, "value": value.value}
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, Mapping):
+        return {str(key): encode_state_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [encode_state_data(item) for item in value]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    raise TypeError(f"Значение {value!r} ({type(value).__name__}) нельзя сохранить в состоянии FSM")
+
+
+def decode_state_data(value: Any) -> Any:
+    """JSON-дерево из encode_state_data → исходные значения (кортежи становятся списками)."""
+    if isinstance(value, dict):
+        if "$enum" in value:
+            return STATE_ENUMS[value["$enum"]](value["value"])
+        if "$datetime" in value:
+            return datetime.fromisoformat(value["$datetime"])
+        if "$date" in value:
+            return date.fromisoformat(value["$date"])
+        return {key: decode_state_data(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_state_data(item) for item in value]
+    return value
+
+
+#----------------------------------------#----------------------------------------#
+@dataclass(slots=True)
+class _Record:
+    """Состояние одного ключа в рамках апдейта: что известно и что нужно записать."""
+    state: Optional[str] = None
+    data: dict[str, Any] = field(default_factory=dict)  # уже в виде JSON-дерева
+    loaded: bool = False                                # state и data прочитаны из базы
+    dirty: set[str] = field(default_factory=set)        # {"state", "data"}
+
+    def known(self, name: str) -> bool:
+        return self.loaded or name in self.dirty
+
+
+class SQLAlchemyStorage(BaseStorage):
+    """
+    FSM-хранилище в таблице `fsm_states` (SQLite/Postgres через общий db_helper).
+
+    • состояние видно всем процессам бота (polling или webhook-воркеры), переживает рестарт;
+    • данные хранятся JSON-деревом (см. encode_state_data), запись живёт `ttl` секунд
+      с последнего изменения;
+    • внутри `batch()` (его открывает FSMBatchMiddleware на каждый апдейт) чтения кэшируются,
+      а записи копятся и уходят одной транзакцией при выходе: `state.clear()` +
+      `update_data(...)` — одна запись вместо трёх. Кэш живёт только в пределах апдейта,
+      поэтому процессы не видят друг у друга устаревших данных;
+    • вне batch() каждая операция сразу идёт в базу;
+    • устаревшие записи удаляются на старте и по таймеру (`purge_interval`, см. start_purge).
+    """
+
+    def __init__(self, config: FSMSettings = settings.fsm, key_builder: KeyBuilder | None = None) -> None:
+        self.ttl: Optional[timedelta] = timedelta(seconds=config.ttl) if config.ttl else None
+        self.purge_interval = config.purge_interval
+        self.key_builder: KeyBuilder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._batch: ContextVar[Optional[dict[str, _Record]]] = ContextVar("fsm_batch", default=None)
+        # Последнее чтение вне batch: FSMContextMiddleware читает состояние до FSMBatchMiddleware,
+        # batch подхватывает эту запись и не читает её повторно
+        self._prefetched: ContextVar[Optional[tuple[str, _Record]]] = ContextVar("fsm_prefetched", default=None)
+        self._purger: Optional[asyncio.Task] = None
+
+    # ── batch ────────────────────────────────────────────────────────────────
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        """Кэш чтений и отложенная запись на время одного апдейта."""
+        if self._batch.get() is not None:  # вложенный batch — работаем во внешнем
+            yield
+            return
+
+        records: dict[str, _Record] = {}
+        if (prefetched := self._prefetched.get()) is not None:
+            records[prefetched[0]] = prefetched[1]
+            self._prefetched.set(None)
+        token = self._batch.set(records)
+        try:
+            yield
+        finally:
+            self._batch.reset(token)
+            await self._flush(records)
+
+    # ── BaseStorage ──────────────────────────────────────────────────────────
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._write(key, state=state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._read(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._write(key, data=encode_state_data(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return decode_state_data((await self._read(key)).data)
+
+    async def close(self) -> None:
+        await self.stop_purge()
+
+    # ── очистка ──────────────────────────────────────────────────────────────
+    async def purge_expired(self) -> int:
+        """Удаляет устаревшие записи; вызывается на старте и по таймеру."""
+        now = self._now()
+        # на SQLite — через очередь записи, не соперничая с её писателем за блокировку базы
+        removed = await write_queue.submit(lambda session: states.delete_expired_states(session, now))
+        if removed:
+            logging.info(f"FSM: удалено устаревших состояний — {removed}")
+        return removed
+
+    def start_purge(self) -> None:
+        """Запускает удаление устаревших записей по таймеру (если есть `ttl` и `purge_interval` > 0)."""
+        if self.ttl and self.purge_interval > 0 and self._purger is None:
+            self._purger = asyncio.create_task(self._purge_loop(), name="fsm-purge")
+
+    async def stop_purge(self) -> None:
+        if self._purger:
+            self._purger.cancel()
+            await asyncio.gather(self._purger, return_exceptions=True)
+            self._purger = None
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await self.purge_expired()
+            except Exception as e:
+                logging.error(f"Ошибка удаления устаревших состояний FSM: {e}", exc_info=True)
+
+    # ── служебное ────────────────────────────────────────────────────────────
+    async def _read(self, key: StorageKey) -> _Record:
+        records = self._batch.get()
+        name = self.key_builder.build(key)
+        record = records.get(name) if records is not None else None
+        if record is not None and record.known("state") and record.known("data"):
+            return record
+
+        # состояние читается сразу после своей же записи — только с основной базы, не с реплики
+        async with db_helper.read_session_getter(replica=False) as session:
+            row = await states.get_state_record(session, name, self._now())
+        stored = _Record(state=row.state, data=row.data or {}, loaded=True) if row else _Record(loaded=True)
+
+        if record is None:
+            record = stored
+        else:  # часть полей уже изменена в этом апдейте — они важнее прочитанных
+            record.state = record.state if "state" in record.dirty else stored.state
+            record.data = record.data if "data" in record.dirty else stored.data
+            record.loaded = True
+        if records is not None:
+            records[name] = record
+        else:
+            self._prefetched.set((name, _Record(record.state, dict(record.data), loaded=True)))
+        return record
+
+    async def _write(self, key: StorageKey, **fields: Any) -> None:
+        records = self._batch.get()
+        name = self.key_builder.build(key)
+        record = (records.get(name) if records is not None else None) or _Record()
+        for field_name, value in fields.items():
+            setattr(record, field_name, value)
+            record.dirty.add(field_name)
+
+        if records is None:
+            self._prefetched.set(None)
+            await self._flush({name: record})
+        else:
+            records[name] = record
+
+    async def _flush(self, records: dict[str, _Record]) -> None:
+        upserts: dict[str, dict[str, Any]] = {}
+        deletes: list[str] = []
+        for name, record in records.items():
+            if not record.dirty:
+                continue
+            if record.known("state") and record.known("data") and record.state is None and not record.data:
+                deletes.append(name)
+            else:
+                upserts[name] = {field_name: getattr(record, field_name) for field_name in record.dirty}
+
+        if not upserts and not deletes:
+            return
+        now = self._now()
+        # на SQLite — групповым коммитом вместе с записями других апдейтов
+        await write_queue.submit(lambda session: states.save_state_records(
+            session, upserts, deletes, now, now + self.ttl if self.ttl else None
+        ))
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
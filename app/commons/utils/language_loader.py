@@ -1,21 +1,75 @@
 import importlib
-from types import ModuleType
+import logging
+import pkgutil
+from types import MappingProxyType, ModuleType
+from typing import Mapping
 
+from app import localization
 from app.schemas.typed_dict import LangType
 
+DEFAULT_LANGUAGE = 'ru'
+
+
+def _freeze(value):
+    """Рекурсивно превращает словари в неизменяемые MappingProxyType."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+class LocalizationRegistry:
+    """
+    Реестр языковых пакетов.
+
+    • все модули `app/localization/*.py` загружаются один раз (при первом обращении
+      или явно через `load()` на старте);
+    • пакет — неизменяемый MappingProxyType: его можно отдавать в обработчики, не опасаясь,
+      что кто-то изменит его для всех пользователей;
+    • каждый пакет дополнен ключами пакета по умолчанию (ru), поэтому недопереведённый
+      язык не падает с KeyError, а показывает русский текст;
+    • поиск — один dict lookup: 'en' → 'en', 'en-US' → 'en', неизвестный → ru.
+    """
+
+    def __init__(self, default: str = DEFAULT_LANGUAGE) -> None:
+        self.default = default
+        self._packs: dict[str, Mapping] = {}
+
+    def load(self) -> None:
+        raw: dict[str, dict] = {}
+        for module_info in pkgutil.iter_modules(localization.__path__):
+            if module_info.ispkg or module_info.name.startswith('_'):
+                continue
+            module: ModuleType = importlib.import_module(f"{localization.__name__}.{module_info.name}")
+            raw[module_info.name] = getattr(module, "lang", {})
+
+        base = raw.get(self.default, {})
+        self._packs = {code: _freeze({**base, **pack}) for code, pack in raw.items()}
+        logging.info(f"Локализация: загружены языки {sorted(self._packs)}")
+
+    def get(self, lang_code: str | None) -> Mapping:
+        if not self._packs:
+            self.load()
+        if lang_code:
+            pack = self._packs.get(lang_code) or self._packs.get(lang_code.split('-', 1)[0].lower())
+            if pack:
+                return pack
+        return self._packs[self.default]
+
+    @property
+    def languages(self) -> list[str]:
+        if not self._packs:
+            self.load()
+        return list(self._packs)
+
+
+localization_registry = LocalizationRegistry()
+
 
 def load_language(lang_code: str) -> LangType:
     """
-    Загружает словарь языка по коду языка (например, 'ru', 'en').
+    Возвращает словарь языка по коду языка (например, 'ru', 'en') из реестра.
 
     :param lang_code: Код языка, например 'ru' или 'en'
-    :return: Словарь переводов
+    :return: Неизменяемый словарь переводов (фоллбек — язык по умолчанию)
     """
-    try:
-        # print(f"app.localization.{lang_code}")
-        module: ModuleType = importlib.import_module(f"app.localization.{lang_code}")
-        return getattr(module, "lang", {})
-    except ModuleNotFoundError:
-        # Фоллбек на английский язык
-        fallback_module: ModuleType = importlib.import_module("app.localization.en")
-        return getattr(fallback_module, "lang", {})
\ No newline at end of file
+    return localization_registry.get(lang_code)
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from tabulate import tabulate
+
+# Границы корзин гистограмм, сек: от 1 мс до 10 с
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0,
+)
+QUANTILES: tuple[float, ...] = (0.5, 0.95, 0.99)
+
+
+#----------------------------------------#----------------------------------------#
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами (как histogram в Prometheus).
+
+    Память не растёт с числом наблюдений; квантили оцениваются линейной интерполяцией
+    внутри корзины — точности корзин хватает для p50/p95/p99 при подборе числа реплик.
+    """
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, in_bucket in enumerate(self.counts):
+            if in_bucket and cumulative + in_bucket >= rank:
+                if index == len(self.buckets):  # выше последней границы — точнее не знаем
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / in_bucket
+            cumulative += in_bucket
+        return self.buckets[-1]
+
+    def prometheus(self, name: str, labels: str) -> Iterable[str]:
+        cumulative = 0
+        for bound, in_bucket in zip(self.buckets, self.counts):
+            cumulative += in_bucket
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+@dataclass(slots=True)
+class HandlerStats:
+    """Метрики одного обработчика роутера."""
+    latency: Histogram = field(default_factory=Histogram)
+    db: Histogram = field(default_factory=Histogram)
+    api: Histogram = field(default_factory=Histogram)
+    errors: int = 0
+    in_flight: int = 0
+
+
+@dataclass(slots=True)
+class UpdateTimings:
+    """Время в базе и в Bot API, набранное за время работы текущего обработчика."""
+    db: float = 0.0
+    api: float = 0.0
+
+
+# Накопитель времени текущего обработчика (выставляет MetricsMiddleware)
+current_timings: ContextVar[Optional[UpdateTimings]] = ContextVar("current_timings", default=None)
+
+
+#----------------------------------------#----------------------------------------#
+class MetricsRegistry:
+    """
+    Метрики бота в памяти процесса:
+
+    • по обработчикам — латентность, время в БД и в Bot API (гистограммы), ошибки, in-flight;
+    • по методам Bot API — латентность запросов (включая рассылки вне обработчиков).
+
+    Отдаются текстом Prometheus (`render_prometheus`, см. app/server/metrics.py) и
+    периодической сводкой в лог с p50/p95/p99.
+    """
+
+    def __init__(self) -> None:
+        self.handlers: dict[str, HandlerStats] = {}
+        self.api_methods: dict[str, Histogram] = {}
+        # Внешние источники строк Prometheus (например, db_helper.instrumentation)
+        self.collectors: list[Callable[[], Iterable[str]]] = []
+        self._summary_task: Optional[asyncio.Task] = None
+
+    def handler(self, name: str) -> HandlerStats:
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = HandlerStats()
+        return stats
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        self.collectors.append(collector)
+
+    def observe_api(self, method: str, seconds: float) -> None:
+        histogram = self.api_methods.get(method)
+        if histogram is None:
+            histogram = self.api_methods[method] = Histogram()
+        histogram.observe(seconds)
+        if (timings := current_timings.get()) is not None:
+            timings.api += seconds
+
+    @staticmethod
+    def observe_db(seconds: float) -> None:
+        """Время SQL засчитывается текущему обработчику (вызывает SQLInstrumentation на каждый запрос)."""
+        if (timings := current_timings.get()) is not None:
+            timings.db += seconds
+
+    # ── вывод ────────────────────────────────────────────────────────────────
+    def render_prometheus(self) -> str:
+        lines: list[str] = []
+        histograms = (
+            ("bot_handler_duration_seconds", "Время обработчика", "latency"),
+            ("bot_handler_db_seconds", "Время в БД за вызов обработчика", "db"),
+            ("bot_handler_api_seconds", "Время в Bot API за вызов обработчика", "api"),
+        )
+        for name, help_text, attr in histograms:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for handler, stats in sorted(self.handlers.items()):
+                lines.extend(getattr(stats, attr).prometheus(name, f'handler="{handler}"'))
+
+        lines += ["# HELP bot_handler_errors_total Исключения в обработчике", "# TYPE bot_handler_errors_total counter"]
+        lines += [f'bot_handler_errors_total{{handler="{h}"}} {s.errors}' for h, s in sorted(self.handlers.items())]
+        lines += ["# HELP bot_handler_in_flight Вызовы в обработке", "# TYPE bot_handler_in_flight gauge"]
+        lines += [f'bot_handler_in_flight{{handler="{h}"}} {s.in_flight}' for h, s in sorted(self.handlers.items())]
+
+        name = "bot_api_request_duration_seconds"
+        lines += [f"# HELP {name} Запросы к Bot API", f"# TYPE {name} histogram"]
+        for method, histogram in sorted(self.api_methods.items()):
+            lines.extend(histogram.prometheus(name, f'method="{method}"'))
+
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Таблица по обработчикам: вызовы, ошибки, p50/p95/p99 (мс) и средние БД/API."""
+        rows = []
+        for handler, stats in sorted(self.handlers.items(), key=lambda item: -item[1].latency.count):
+            count = stats.latency.count
+            if not count:
+                continue
+            rows.append((
+                handler, count, stats.errors,
+                *(f"{stats.latency.quantile(q) * 1000:.1f}" for q in QUANTILES),
+                f"{stats.db.sum / count * 1000:.1f}",
+                f"{stats.api.sum / count * 1000:.1f}",
+            ))
+        headers = ["обработчик", "вызовов", "ошибок", "p50, мс", "p95, мс", "p99, мс", "БД ср., мс", "API ср., мс"]
+        return tabulate(rows, headers=headers)
+
+    def start_log_summary(self, interval: float) -> None:
+        if interval and (self._summary_task is None or self._summary_task.done()):
+            self._summary_task = asyncio.create_task(self._summary_loop(interval))
+
+    async def stop_log_summary(self) -> None:
+        if self._summary_task:
+            self._summary_task.cancel()
+            await asyncio.gather(self._summary_task, return_exceptions=True)
+            self._summary_task = None
+
+    async def _summary_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            if self.handlers:
+                logging.info(f"📊 Метрики обработчиков:\n{self.summary()}")
+
+
+metrics = MetricsRegistry()
+
+
+#----------------------------------------#----------------------------------------#
+class ApiTimingMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время каждого запроса к Bot API → metrics."""
+
+    def __init__(self, registry: MetricsRegistry = metrics) -> None:
+        self.registry = registry
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            self.registry.observe_api(type(method).__name__, time.perf_counter() - started)
+
+
+def handler_name(callback: Any) -> str:
+    """`app.routes.callbacks.task_create.task_mode` → `task_create.task_mode`."""
+    module = getattr(callback, "__module__", "") or ""
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__name__', repr(callback))}"
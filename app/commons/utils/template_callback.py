@@ -5,14 +5,15 @@ from aiogram.exceptions import TelegramNetworkError
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup
 
-from app.keyboards.inline.general import InlineKeyboardHandler
+from app.keyboards.inline.general import InlineKeyboardHandler, keyboard_registry
+from app.keyboards.inline.registry import KeyboardCall
 from app.schemas.general import ResponseModel
 
 # тип-подсказка: либо один ResponseModel, либо список
 ResponseLike = Union["ResponseModel", Sequence["ResponseModel"]]
 
-# тип-подсказка: либо строковый «псевдоним» клавиатуры, либо готовый объект
-KBLike = Union[str, InlineKeyboardMarkup]
+# тип-подсказка: строковый «псевдоним» клавиатуры, вызов фабрики или готовый объект
+KBLike = Union[str, KeyboardCall, InlineKeyboardMarkup]
 
 async def template_callback(
     cq: CallbackQuery,
@@ -93,16 +94,6 @@ async def template_callback(
         logging.error(f"template_callback error: {e}", exc_info=True)
 
 
-async def parse_cq(cq: CallbackQuery):
-    """
-    Возвращает:
-    • data       – список токенов callback-данных (split("_"))
-    • user_lang  – язык пользователя или 'unknown'
-    """
-    data = cq.data.split("_")
-    user_lang = cq.from_user.language_code or "ru" # or "unknown"
-    return data, user_lang
-
 async def resolve_kb(kb_like: KBLike, inline: InlineKeyboardHandler) -> InlineKeyboardMarkup:
     """
     Приводит «что-угодно-похожее-на-клавиатуру» к реальному объекту
@@ -110,10 +101,14 @@ async def resolve_kb(kb_like: KBLike, inline: InlineKeyboardHandler) -> InlineKe
 
     Параметры
     ----------
-    kb_like : str | InlineKeyboardMarkup
-        • str – псевдоним/выражение: будет передан в `inline.get_keyboard`;
+    kb_like : str | KeyboardCall | InlineKeyboardMarkup
+        • str – псевдоним из `keyboard_registry` (один поиск в словаре);
+        • KeyboardCall – псевдоним фабрики с аргументами;
         • InlineKeyboardMarkup – уже готовый объект.
 
+    `inline` оставлен для совместимости сигнатуры: строки вида "name(args)" больше
+    не разбираются (прежний разбор — только как база сравнения в benchmarks/keyboard_resolve.py).
+
     Возврат
     -------
     InlineKeyboardMarkup
@@ -123,9 +118,9 @@ async def resolve_kb(kb_like: KBLike, inline: InlineKeyboardHandler) -> InlineKe
     kb = await resolve_kb(some_keyboard)   # some_keyboard: str | InlineKeyboardMarkup
     await callback_query.message.edit_reply_markup(kb)
     """
-    # строка → строим по фабрике
-    if isinstance(kb_like, str):
-        return inline.get_keyboard(kb_like)
+    # псевдоним или вызов фабрики → реестр
+    if isinstance(kb_like, (str, KeyboardCall)):
+        return keyboard_registry.resolve(kb_like)
 
     # уже готовая клавиатура → вернуть как есть
     if isinstance(kb_like, InlineKeyboardMarkup):
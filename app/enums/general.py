@@ -14,4 +14,41 @@ class TariffOptions(IntEnum):
     FREE     = 3
     TARIFF_1 = 10
     TARIFF_2 = 20
-    TARIFF_3 = 30
\ No newline at end of file
+    TARIFF_3 = 30
+
+# ── Параметры кнопок (app/keyboards/inline/callbacks.py) ─────────────────────
+# В callback_data перечисления кодируются номером члена: новые члены — только в конец,
+# иначе уже отправленные кнопки поменяют смысл (или поднимите CALLBACK_VERSION)
+class TaskFlow(IntEnum):
+    CREATE = 0  # создание задачи
+    EDIT   = 1  # редактирование задачи по складу
+
+class DatePeriod(str, Enum):
+    TODAY    = 'today'
+    TOMORROW = 'tomorrow'
+    WEEK     = 'week'
+    MONTH    = 'month'
+
+class DateAction(IntEnum):
+    PERIOD   = 0  # готовый период (DatePeriod)
+    CALENDAR = 1  # открыть календарь
+    MONTH    = 2  # листание месяца
+    DAY      = 3  # выбор дня
+    CONFIRM  = 4  # подтвердить диапазон
+
+class UpdateAction(IntEnum):
+    LIST   = 0  # список складов с задачами
+    SELECT = 1  # карточка задачи по складу
+    BOX    = 2
+    COEF   = 3
+    DATE   = 4
+
+class DeleteAction(IntEnum):
+    ASK = 0  # спросить подтверждение
+    ALL = 1  # удалить все задачи
+    ONE = 2  # удалить задачу по складу
+
+class PaymentAction(IntEnum):
+    CHECK       = 0
+    CANCEL      = 1
+    UNSUBSCRIBE = 2
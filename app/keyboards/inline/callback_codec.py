@@ -0,0 +1,189 @@
+import dataclasses
+import functools
+import types
+from datetime import date
+from enum import Enum
+from typing import Any, Callable, ClassVar, Optional, TypeVar, Union, get_args, get_origin, get_type_hints
+
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery
+
+# Версия формата — первый символ callback_data. Старые кнопки вида "task_mode_mass_id5" начинаются
+# с буквы и не декодируются; смена раскладки полей или порядка членов перечислений — новая версия
+CALLBACK_VERSION = "1"
+MAX_CALLBACK_BYTES = 64  # лимит Telegram на callback_data
+
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+_MISSING = dataclasses.MISSING
+
+C = TypeVar("C", bound="Callback")
+
+# (имя поля, кодер, декодер, значение по умолчанию | _MISSING)
+FieldCodec = tuple[str, Callable[[Any], str], Callable[[str], Any], Any]
+
+
+class CallbackDecodeError(ValueError):
+    """callback_data не в текущем формате: кнопка из старого сообщения или подделка."""
+
+
+def _b36(value: int) -> str:
+    if value < 0:
+        return "-" + _b36(-value)
+    if value < 36:
+        return _DIGITS[value]
+    out: list[str] = []
+    while value:
+        value, rest = divmod(value, 36)
+        out.append(_DIGITS[rest])
+    return "".join(reversed(out))
+
+
+def _field_codec(tp: Any) -> tuple[Callable[[Any], str], Callable[[str], Any]]:
+    """
+    Тип поля → (кодер, декодер):
+        int        → base36 (117986 → "2j1e");
+        bool       → "1" / "0";
+        Enum       → base36 номера члена в порядке объявления;
+        date       → base36 порядкового номера дня (date.toordinal);
+        str        → как есть, только последним полем (может содержать ".");
+        Optional[] → пустая строка для None.
+    """
+    if get_origin(tp) in (Union, types.UnionType):
+        inner = [arg for arg in get_args(tp) if arg is not type(None)]
+        if len(inner) != 1:
+            raise TypeError(f"Поле {tp!r}: поддерживается только Optional[X]")
+        encode, decode = _field_codec(inner[0])
+        return (lambda v: "" if v is None else encode(v)), (lambda s: None if s == "" else decode(s))
+    if tp is bool:
+        return (lambda v: "1" if v else "0"), {"1": True, "0": False}.__getitem__
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        members = tuple(tp)
+        index = {member: i for i, member in enumerate(members)}
+        return (lambda v: _b36(index[v])), (lambda s: members[int(s, 36)])
+    if tp is int:
+        return _b36, (lambda s: int(s, 36))
+    if tp is date:
+        return (lambda v: _b36(v.toordinal())), (lambda s: date.fromordinal(int(s, 36)))
+    if tp is str:
+        return str, str
+    raise TypeError(f"Тип поля {tp!r} не поддерживается кодеком callback_data")
+
+
+#----------------------------------------#----------------------------------------#
+class Callback:
+    """
+    Типизированные данные кнопки. Подклассы объявляются через `@callback("<opcode>")` и становятся
+    frozen-dataclass; в callback_data они упаковываются компактно:
+
+        <версия><opcode>[:<поле>.<поле>…]     WarehousePick(TaskMode.MASS, warehouse_id=117986) → "1w:1.0.2j1e"
+
+    Хвостовые поля со значением по умолчанию не пишутся. Разбор — один раз на апдейт в
+    CallbackDataMiddleware: обработчики получают готовый объект аргументом `callback_data`.
+    """
+    __slots__ = ()
+
+    _opcode: ClassVar[str]
+    _fields: ClassVar[tuple[FieldCodec, ...]]
+    _decoders: ClassVar[tuple[Callable[[str], Any], ...]]
+    _required: ClassVar[int]  # обязательные поля dataclass всегда идут первыми
+
+    def pack(self) -> str:
+        values = [getattr(self, name) for name, *_ in self._fields]
+        size = len(values)
+        while size and values[size - 1] == self._fields[size - 1][3]:
+            size -= 1
+        text = CALLBACK_VERSION + self._opcode
+        if size:
+            text += ":" + ".".join(self._fields[i][1](values[i]) for i in range(size))
+        if len(text.encode()) > MAX_CALLBACK_BYTES:
+            raise ValueError(f"callback_data длиннее {MAX_CALLBACK_BYTES} байт: {text!r}")
+        return text
+
+    @classmethod
+    def filter(cls, **values: Any) -> "CallbackFilter":
+        """Фильтр роутера: кнопка этого типа (и с такими значениями полей)."""
+        return CallbackFilter(cls, **values)
+
+
+_registry: dict[str, type[Callback]] = {}
+
+
+def callback(opcode: str) -> Callable[[type[C]], type[C]]:
+    """Регистрирует класс кнопки под коротким кодом операции (строчные латинские буквы)."""
+    if not (opcode.isascii() and opcode.isalpha() and opcode.islower()):
+        raise ValueError(f"Код операции {opcode!r}: только строчные латинские буквы")
+
+    def register(cls: type[C]) -> type[C]:
+        if opcode in _registry:
+            raise ValueError(f"Код операции {opcode!r} уже занят {_registry[opcode].__name__}")
+        cls = dataclasses.dataclass(frozen=True, slots=True)(cls)
+        hints = get_type_hints(cls)
+        fields = dataclasses.fields(cls)
+        codecs: list[FieldCodec] = []
+        for position, field in enumerate(fields):
+            tp = hints[field.name]
+            if str in (tp, *get_args(tp)) and position != len(fields) - 1:
+                raise TypeError(f"{cls.__name__}.{field.name}: строковое поле может быть только последним")
+            codecs.append((field.name, *_field_codec(tp), field.default))
+        cls._opcode = opcode
+        cls._fields = tuple(codecs)
+        cls._decoders = tuple(decode for _, _, decode, _ in codecs)
+        cls._required = sum(default is _MISSING for *_, default in codecs)
+        _registry[opcode] = cls
+        return cls
+
+    return register
+
+
+@functools.lru_cache(maxsize=4096)
+def unpack(data: str) -> Callback:
+    """
+    callback_data → объект кнопки; CallbackDecodeError, если формат не текущий.
+
+    Результат кэшируется по строке: объекты неизменяемы, а одни и те же кнопки нажимают все
+    пользователи. Ошибки не кэшируются.
+    """
+    if not data or data[0] != CALLBACK_VERSION:
+        raise CallbackDecodeError(f"callback_data не версии {CALLBACK_VERSION}: {data!r}")
+    opcode, sep, payload = data[1:].partition(":")
+    cls = _registry.get(opcode)
+    if cls is None:
+        raise CallbackDecodeError(f"Неизвестный код операции: {data!r}")
+
+    decoders = cls._decoders
+    if not sep:
+        parts = []
+    elif not decoders:
+        raise CallbackDecodeError(f"Лишние поля: {data!r}")
+    else:
+        # последнее поле получает весь остаток — строковое поле может содержать "."
+        parts = payload.split(".", len(decoders) - 1)
+    if len(parts) < cls._required:
+        raise CallbackDecodeError(f"Нет поля {cls._fields[len(parts)][0]!r}: {data!r}")
+    try:
+        values = [decode(part) for decode, part in zip(decoders, parts)]
+    except (ValueError, IndexError, KeyError, OverflowError) as e:
+        raise CallbackDecodeError(f"Поле не разбирается: {data!r}") from e
+    # недостающие хвостовые поля dataclass заполнит значениями по умолчанию
+    return cls(*values)
+
+
+#----------------------------------------#----------------------------------------#
+class CallbackFilter(Filter):
+    """Нажата кнопка одного из типов `kinds`, и её поля равны `values` (CallbackDataMiddleware)."""
+
+    def __init__(self, *kinds: type[Callback], **values: Any) -> None:
+        self.kinds = kinds
+        self.values = values
+
+    async def __call__(self, callback_query: CallbackQuery, callback_data: Optional[Callback] = None) -> bool:
+        return isinstance(callback_data, self.kinds) and all(
+            getattr(callback_data, name) == value for name, value in self.values.items()
+        )
+
+
+class StaleCallback(Filter):
+    """Кнопка не декодировалась: сообщение отправлено до смены формата callback_data."""
+
+    async def __call__(self, callback_query: CallbackQuery, callback_data: Optional[Callback] = None) -> bool:
+        return callback_data is None
@@ -0,0 +1,151 @@
+"""
+Кнопки бота: что передаёт нажатие. Кодек и формат — app/keyboards/inline/callback_codec.py.
+
+Коды операций и порядок полей — часть формата: уже отправленные сообщения хранят кнопки
+в нём. Новые поля добавляются в конец со значением по умолчанию; переименование кода,
+перестановка или удаление поля — только вместе с CALLBACK_VERSION.
+"""
+from datetime import date
+from typing import Optional
+
+from app.enums.general import (
+    BoxType, DateAction, DatePeriod, DeleteAction, PaymentAction, TaskFlow, TaskMode, UpdateAction
+)
+from app.keyboards.inline.callback_codec import Callback, callback
+
+
+# ── навигация ────────────────────────────────────────────────────────────────
+@callback("m")
+class MainMenu(Callback):
+    pass
+
+
+@callback("n")
+class Noop(Callback):
+    """Кнопка-надпись: заголовок календаря, пустая ячейка, склад с уже заведённой задачей."""
+
+
+@callback("r")
+class Rules(Callback):
+    pass
+
+
+# ── создание задачи ──────────────────────────────────────────────────────────
+@callback("c")
+class CreateTask(Callback):
+    pass
+
+
+@callback("w")
+class WarehousePick(Callback):
+    """Выбор складов: страница, клик по складу или подтверждение выбора."""
+    mode: TaskMode
+    page: int = 0
+    warehouse_id: Optional[int] = None
+    confirm: bool = False
+
+
+@callback("b")
+class BoxPick(Callback):
+    """Тип упаковки (переключение) или подтверждение; склад и страница — в состоянии FSM."""
+    flow: TaskFlow = TaskFlow.CREATE
+    box: Optional[BoxType] = None
+    confirm: bool = False
+
+
+@callback("k")
+class CoefPick(Callback):
+    flow: TaskFlow = TaskFlow.CREATE
+    coef: Optional[int] = None
+    confirm: bool = False
+
+
+@callback("d")
+class DatePick(Callback):
+    """
+    Период поставки: готовый период, календарь, листание месяца (`day` — 1-е число),
+    выбор дня, подтверждение диапазона.
+    """
+    flow: TaskFlow
+    action: DateAction
+    period: Optional[DatePeriod] = None
+    day: Optional[date] = None
+
+
+@callback("s")
+class TaskSave(Callback):
+    pass
+
+
+@callback("ta")
+class TasksAppend(Callback):
+    pass
+
+
+# ── просмотр, редактирование, удаление ───────────────────────────────────────
+@callback("t")
+class MyTasks(Callback):
+    page: int = 0
+
+
+@callback("u")
+class TaskUpdate(Callback):
+    action: UpdateAction = UpdateAction.LIST
+    warehouse_id: int = 0
+    page: int = 0
+
+
+@callback("x")
+class TaskDelete(Callback):
+    action: DeleteAction
+    warehouse_id: int = 0
+    page: int = 0
+
+
+# ── уведомления ──────────────────────────────────────────────────────────────
+@callback("a")
+class AlarmSettings(Callback):
+    pass
+
+
+@callback("aw")
+class AlarmWarehouses(Callback):
+    pass
+
+
+@callback("at")
+class AlarmToggle(Callback):
+    warehouse_id: int
+    page: int = 0
+
+
+@callback("aa")
+class AlarmAll(Callback):
+    on: bool
+
+
+@callback("ab")
+class BotConnect(Callback):
+    pass
+
+
+# ── подписка и оплата ────────────────────────────────────────────────────────
+@callback("p")
+class Tariffs(Callback):
+    pass
+
+
+@callback("pt")
+class TariffPick(Callback):
+    tariff: int
+
+
+@callback("pf")
+class FreeTrial(Callback):
+    pass
+
+
+@callback("pp")
+class Payment(Callback):
+    action: PaymentAction
+    payment_id: str
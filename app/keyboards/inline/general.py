@@ -1,55 +1,80 @@
-import ast
 import json
-import re
-import shlex
 from itertools import batched
 from sys import prefix
 from typing import Union, Callable, List, Any, TypedDict, Optional, Iterable, Tuple, Sequence
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 import calendar
-from datetime import datetime
+from datetime import date
+from functools import lru_cache
 
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from app.enums.constants import COEF_TITLES
-from app.enums.general import BoxType
+from app.enums.general import BoxType, DateAction, DatePeriod, DeleteAction, PaymentAction, TaskFlow, TaskMode, UpdateAction
+from app.keyboards.inline.callback_codec import Callback
+from app.keyboards.inline.callbacks import (
+    AlarmAll, AlarmSettings, AlarmToggle, AlarmWarehouses, BotConnect, BoxPick, CoefPick, CreateTask, DatePick,
+    FreeTrial, MainMenu, MyTasks, Noop, Payment, Rules, TariffPick, Tariffs, TaskDelete, TaskSave, TaskUpdate,
+    TasksAppend, WarehousePick
+)
 from app.schemas.general import ResponseWarehouses, ResponseBoxTypes, ResponseCoefs, ResponseTasks
+from app.keyboards.inline.registry import KeyboardRegistry, FrozenInlineKeyboardMarkup, freeze_markup
+
+# Сколько разных календарей (месяц × выбранный день × сценарий) держать в кэше
+CALENDAR_CACHE_SIZE = 512
 
 
 # Кнопки должны получать язык приложения, чтобы соответствовать выбранному пользователем
 class InlineKeyboardHandler:
+    # Фабрики, доступные по псевдониму через реестр клавиатур (keyboard_registry)
+    factories: tuple[str, ...] = (
+        "create_billing",
+        "cancel_subscription",
+        "verify_invoice",
+        "save_params",
+        "create_warehouse_list",
+        "box_type",
+        "coefs",
+        "create_select_date",
+        "create_alarm_list",
+        "create_task_list",
+        "edit_task_warehouse",
+        "generate_calendar",
+        "generate_pagination_keyboard",
+    )
+
     def __init__(self):
 
         self.start_kb: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "📝 Создать список задач", "callback_data": "create_task"}],
-            [{"text": "🗂 Мой список задач", "callback_data": "my_tasks"}],
-            [{"text": "⚙️ Настройка уведомлений", "callback_data": "alarm_setting"}],
-            [{"text": "💎 Подписка", "callback_data": "choose_tariff"}],
-            [{"text": "ℹ️ Инструкция", "callback_data": "rules"}],
+            [{"text": "📝 Создать список задач", "callback_data": CreateTask().pack()}],
+            [{"text": "🗂 Мой список задач", "callback_data": MyTasks().pack()}],
+            [{"text": "⚙️ Настройка уведомлений", "callback_data": AlarmSettings().pack()}],
+            [{"text": "💎 Подписка", "callback_data": Tariffs().pack()}],
+            [{"text": "ℹ️ Инструкция", "callback_data": Rules().pack()}],
         ])
 
         self.task_mode_keyboard: InlineKeyboardMarkup = self.build_inline_keyboard([
             [
-                {"text": "🛠️ Массовая настройка задач", "callback_data": "task_mode_mass"},
-                {"text": "🔧 Гибкая настройка задач", "callback_data": "task_mode_flex"}
+                {"text": "🛠️ Массовая настройка задач", "callback_data": WarehousePick(TaskMode.MASS).pack()},
+                {"text": "🔧 Гибкая настройка задач", "callback_data": WarehousePick(TaskMode.FLEX).pack()}
             ],
-            [{"text": "🏠 Главное меню", "callback_data": "main"}],
+            [{"text": "🏠 Главное меню", "callback_data": MainMenu().pack()}],
         ])
         self.tasks_update_all: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "♻️ Создать новый список", "callback_data": "task_delete_confirm"}],
-            [{"text": "✏️ Добавить к списку", "callback_data": "tasks_append"}],
-            [{"text": "Назад ↩️", "callback_data": "main"}],
+            [{"text": "♻️ Создать новый список", "callback_data": TaskDelete(DeleteAction.ASK).pack()}],
+            [{"text": "✏️ Добавить к списку", "callback_data": TasksAppend().pack()}],
+            [{"text": "Назад ↩️", "callback_data": MainMenu().pack()}],
         ])
 
         self.delete_confirm: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "Да", "callback_data": "task_delete_all"}], # tasks_update_all
-            [{"text": "Отмена", "callback_data": "main"}],
+            [{"text": "Да", "callback_data": TaskDelete(DeleteAction.ALL).pack()}], # tasks_update_all
+            [{"text": "Отмена", "callback_data": MainMenu().pack()}],
         ])
 
         self.tasks_delete_all: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "♻️ Создать новый список", "callback_data": "create_task"}],
-            [{"text": "🏠 Главное меню", "callback_data": "main"}],
+            [{"text": "♻️ Создать новый список", "callback_data": CreateTask().pack()}],
+            [{"text": "🏠 Главное меню", "callback_data": MainMenu().pack()}],
         ])
 
         # self.search_slot_mass: InlineKeyboardMarkup = self.build_inline_keyboard([
@@ -63,138 +88,57 @@ class InlineKeyboardHandler:
         # ])
 
         self.subscribe: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "💳 Оформить подписку", "callback_data": "choose_tariff"}],
-            [{"text": "🆓 Получить 7 дней доступа", "callback_data": "free_sub"}],
-            [{"text": "🏠 Главное меню", "callback_data": "main"}],
+            [{"text": "💳 Оформить подписку", "callback_data": Tariffs().pack()}],
+            [{"text": "🆓 Получить 7 дней доступа", "callback_data": FreeTrial().pack()}],
+            [{"text": "🏠 Главное меню", "callback_data": MainMenu().pack()}],
         ])
 
         self.bot_add: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "🚫 Отмена", "callback_data": "alarm_setting"}],
+            [{"text": "🚫 Отмена", "callback_data": AlarmSettings().pack()}],
         ])
 
         self.choose_tariff: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "💼 Тариф \"СТАРТ\" (590 руб.)", "callback_data": "tarif_1"}],
-            [{"text": "🚀 Тариф \"ПРОФИ\" (790 руб.)", "callback_data": "tarif_2"}],
-            [{"text": "👑 Тариф \"МАКСИ\" (1390 руб.)", "callback_data": "tarif_3"}],
-            [{"text": "Назад ↩️", "callback_data": "choose_tariff"}],
+            [{"text": "💼 Тариф \"СТАРТ\" (590 руб.)", "callback_data": TariffPick(1).pack()}],
+            [{"text": "🚀 Тариф \"ПРОФИ\" (790 руб.)", "callback_data": TariffPick(2).pack()}],
+            [{"text": "👑 Тариф \"МАКСИ\" (1390 руб.)", "callback_data": TariffPick(3).pack()}],
+            [{"text": "Назад ↩️", "callback_data": Tariffs().pack()}],
         ])
 
         self.choose_tariff_with_free: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "💼 Тариф \"СТАРТ\" (590 руб.)", "callback_data": "tarif_1"}],
-            [{"text": "🚀 Тариф \"ПРОФИ\" (790 руб.)", "callback_data": "tarif_2"}],
-            [{"text": "👑 Тариф \"МАКСИ\" (1390 руб.)", "callback_data": "tarif_3"}],
-            [{"text": "🆓 Получить 7 дней доступа", "callback_data": "free_sub"}],
-            [{"text": "Назад ↩️", "callback_data": "choose_tariff"}],
+            [{"text": "💼 Тариф \"СТАРТ\" (590 руб.)", "callback_data": TariffPick(1).pack()}],
+            [{"text": "🚀 Тариф \"ПРОФИ\" (790 руб.)", "callback_data": TariffPick(2).pack()}],
+            [{"text": "👑 Тариф \"МАКСИ\" (1390 руб.)", "callback_data": TariffPick(3).pack()}],
+            [{"text": "🆓 Получить 7 дней доступа", "callback_data": FreeTrial().pack()}],
+            [{"text": "Назад ↩️", "callback_data": Tariffs().pack()}],
         ])
 
         self.my_tasks: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "📝 Добавить задачи", "callback_data": "create_task"}],
-            [{"text": "✏️ Редактировать задачи", "callback_data": "task_update"}],
-            [{"text": "🗑️ Удалить все задачи", "callback_data": "task_delete_confirm"}],
-            [{"text": "Назад ↩️", "callback_data": "main"}],
+            [{"text": "📝 Добавить задачи", "callback_data": CreateTask().pack()}],
+            [{"text": "✏️ Редактировать задачи", "callback_data": TaskUpdate().pack()}],
+            [{"text": "🗑️ Удалить все задачи", "callback_data": TaskDelete(DeleteAction.ASK).pack()}],
+            [{"text": "Назад ↩️", "callback_data": MainMenu().pack()}],
         ])
 
         self.alarm_setting: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "🚀 Подключить бота уведомлений", "callback_data": "bot_add"}],
-            [{"text": "⭐ Уведомления по складам", "callback_data": "alarm_edit"}],
-            [{"text": "Назад ↩️", "callback_data": "main"}],
+            [{"text": "🚀 Подключить бота уведомлений", "callback_data": BotConnect().pack()}],
+            [{"text": "⭐ Уведомления по складам", "callback_data": AlarmWarehouses().pack()}],
+            [{"text": "Назад ↩️", "callback_data": MainMenu().pack()}],
         ])
 
         self.my_tasks_empty: InlineKeyboardMarkup = self.build_inline_keyboard([
-            [{"text": "📝 Создать список задач", "callback_data": "create_task"}],
-            [{"text": "🏠 Главное меню", "callback_data": "main"}],
+            [{"text": "📝 Создать список задач", "callback_data": CreateTask().pack()}],
+            [{"text": "🏠 Главное меню", "callback_data": MainMenu().pack()}],
         ])
 
         self.select_date = self.create_select_date()
 
+        # Готовые клавиатуры общие для всех пользователей — замораживаем, чтобы их нельзя было изменить на месте
+        for name, value in list(vars(self).items()):
+            if isinstance(value, InlineKeyboardMarkup):
+                setattr(self, name, freeze_markup(value))
         # self.select_date: InlineKeyboardMarkup = self.create_select_date()
 
 
-    # def get_keyboard(self, attribute_name: str | object) -> str | None | Any:
-    #     """
-    #     Получает метод по имени и вызывает его с аргументами, если они указаны.
-    #
-    #     :param attribute_name: Имя метода и аргументы в формате 'method_name(arg1, arg2)'.
-    #     :return: Результат выполнения метода или строка с ошибкой, если метод не найден.
-    #     """
-    #     # Проверяем, есть ли скобки в строке
-    #     if attribute_name is not None:
-    #         if '(' in attribute_name and attribute_name.endswith(')'):
-    #             # Извлекаем имя метода и аргументы
-    #             match = re.match(r"(\w+)\((.*)\)", attribute_name)
-    #             if not match:
-    #                 return "Invalid format"
-    #
-    #             method_name, args_str = match.groups()
-    #
-    #             # Получаем метод по имени
-    #             method = getattr(self, method_name, None)
-    #             if not method or not callable(method):
-    #                 return "Not Found keyboard"
-    #
-    #             # Разделяем аргументы по запятой и убираем лишние пробелы
-    #             args: List[str] = [arg.strip() for arg in args_str.split(',')] if args_str else []
-    #
-    #             # Вызываем метод с аргументами
-    #             return method(*args)
-    #         else:
-    #             # Если скобок нет, просто вызываем метод без аргументов
-    #             return getattr(self, attribute_name, "Not Found keyboard")
-
-    def get_keyboard(self, call: Optional[str] = None) -> Any:
-        """
-        Динамически вызывает метод экземпляра по строке вида
-        ``"method_name(1, 'txt', True)"`` или просто ``"property_name"``.
-
-        :param call: Строка с вызовом или именем атрибута.
-        :raises ValueError: Если формат строки некорректен.
-        :raises AttributeError: Если метод/атрибут не найден.
-        :raises TypeError: Если попытка вызвать не-callable.
-        """
-        if call is None:
-            raise ValueError("call may not be None")
-
-        # Вызов с аргументами
-        if '(' in call and call.rstrip().endswith(')'):
-            name, args = self._parse_call(call)
-            method = self._get_callable(name)
-            return method(*args)
-
-        # Просто атрибут/метод без скобок
-        attr = getattr(self, call, None)
-        if attr is None:
-            raise AttributeError(f"{call!r} not found in {self.__class__.__name__}")
-        return attr() if callable(attr) else attr
-
-    # ---- вспомогательные private-методы ----
-    _call_re = re.compile(r"\s*(\w+)\s*\((.*)\)\s*")
-
-    def _parse_call(self, text: str) -> tuple[str, List[Any]]:
-        """Возвращает (имя, [аргументы])."""
-        m = self._call_re.fullmatch(text)
-        if not m:
-            raise ValueError(f"Invalid call syntax: {text!r}")
-
-        name, arg_str = m.groups()
-        if not arg_str.strip():
-            return name, []
-
-        lexer = shlex.shlex(arg_str, posix=True)
-        lexer.whitespace_split = True
-        lexer.whitespace = ','
-        args = [ast.literal_eval(tok) for tok in lexer]
-        return name, args
-
-    def _get_callable(self, name: str) -> Callable[..., Any]:
-        """Проверяет, что атрибут существует и является вызываемым."""
-        attr = getattr(self, name, None)
-        if attr is None:
-            raise AttributeError(f"{name!r} not found in {self.__class__.__name__}")
-        if not callable(attr):
-            raise TypeError(f"{name!r} is not callable")
-        return attr
-    # ---------------------------
-
     @staticmethod
     def build_inline_keyboard(
             rows: list[list[dict[str, str | bool | dict | None]]]
@@ -263,27 +207,27 @@ class InlineKeyboardHandler:
     def create_billing(self, link_pay: str, payment_id: str) -> InlineKeyboardMarkup:
         return self.build_inline_keyboard([
             [{"text": "💳 Оплатить", "url": link_pay}],
-            [{"text": "🔄 Проверить платеж", "callback_data": "check_pay_" + payment_id}],
-            [{"text": "🚫 Отменить платеж", "callback_data": "canceled_payment_" + payment_id}],
-            [{"text": "🏠 Главное меню", "callback_data": "choose_tariff"}],
+            [{"text": "🔄 Проверить платеж", "callback_data": Payment(PaymentAction.CHECK, payment_id).pack()}],
+            [{"text": "🚫 Отменить платеж", "callback_data": Payment(PaymentAction.CANCEL, payment_id).pack()}],
+            [{"text": "🏠 Главное меню", "callback_data": Tariffs().pack()}],
         ])
 
     def cancel_subscription(self, payment_id: str) -> InlineKeyboardMarkup:
         return self.build_inline_keyboard([
-            [{"text": "⛔️ Отменить подписку", "callback_data": "cancel_subscription_" + payment_id}],
-            [{"text": "Назад ↩️", "callback_data": "choose_tariff"}],
+            [{"text": "⛔️ Отменить подписку", "callback_data": Payment(PaymentAction.UNSUBSCRIBE, payment_id).pack()}],
+            [{"text": "Назад ↩️", "callback_data": Tariffs().pack()}],
         ])
 
     def verify_invoice(self, payment_id: str) -> InlineKeyboardMarkup:
         return self.build_inline_keyboard([
-            [{"text": "🔄 Проверить платеж", "callback_data": "check_pay_" + payment_id}],
-            [{"text": "🏠 Главное меню", "callback_data": "choose_tariff"}],
+            [{"text": "🔄 Проверить платеж", "callback_data": Payment(PaymentAction.CHECK, payment_id).pack()}],
+            [{"text": "🏠 Главное меню", "callback_data": Tariffs().pack()}],
         ])
 
     def save_params(self) -> InlineKeyboardMarkup:
         return self.build_inline_keyboard([
-            [{"text": "🚀 Отправить в работу", "callback_data": "task_save"}],
-            [{"text": "Назад ↩️", "callback_data": "coefs_confirm"}],
+            [{"text": "🚀 Отправить в работу", "callback_data": TaskSave().pack()}],
+            [{"text": "Назад ↩️", "callback_data": CoefPick(confirm=True).pack()}],
         ])
     # 〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰〰
     #   ► Создание навигационных клавиатур с указанием параметров
@@ -380,7 +324,7 @@ class InlineKeyboardHandler:
         warehouses = page_data.warehouses
         page_idx: int = page_data.page_index
         total_pages = page_data.total_pages
-        url = f"task_mode_{page_data.mode}"
+        mode = TaskMode(page_data.mode)
 
         # --- основная сетка кнопок ----------------------------------------------
         pairs: list[tuple[str, str]] = []
@@ -390,10 +334,10 @@ class InlineKeyboardHandler:
 
             if wid in existing_whs_ids:
                 label = f"🔔 {name}"
-                cb_data = f"ignore_wh_{wid}"
+                cb_data = Noop().pack()
             else:
                 label = f"🟢 {name}" if wid in (*selected_warehouses, *selected_list) else name
-                cb_data = f"{url}_id{wid}"
+                cb_data = WarehousePick(mode, warehouse_id=wid).pack()
 
             pairs.append((label, cb_data))
 
@@ -402,16 +346,16 @@ class InlineKeyboardHandler:
         pagination: list[tuple[str, str]] = []
 
         if page_idx > 0:
-            pagination.append(("⬅️ Предыдущая", f"{url}_{page_idx - 1}"))
+            pagination.append(("⬅️ Предыдущая", WarehousePick(mode, page_idx - 1).pack()))
         if page_idx < total_pages - 1:
-            pagination.append(("Следующая ➡️", f"{url}_{page_idx + 1}"))
+            pagination.append(("Следующая ➡️", WarehousePick(mode, page_idx + 1).pack()))
         if pagination:
             tail_rows.append(pagination)
 
         if selected_warehouses:
-            tail_rows.append([("Подтвердить выбор ✅", f"{url}_confirm")])
+            tail_rows.append([("Подтвердить выбор ✅", WarehousePick(mode, confirm=True).pack())])
 
-        tail_rows.append([("Назад ↩️", "create_task")])
+        tail_rows.append([("Назад ↩️", CreateTask().pack())])
 
         # --- сборка --------------------------------------------------------------
         return self.build_kb(pairs, row_width=2, tail_rows=tail_rows)
@@ -422,14 +366,14 @@ class InlineKeyboardHandler:
             self,
             data: ResponseBoxTypes,
             box_titles: dict[str, str],
-            url: str = 'box_type',
-            url_back: Optional[str] = None
+            flow: TaskFlow = TaskFlow.CREATE,
+            back: Optional[Callback] = None
     ) -> InlineKeyboardMarkup:
         # --- шорткаты и маркеры ----------------------------------------------------
         selected = set(data.selected) or []  # отмеченные типы
         checked = {i: "🟢 " for i in (selected or {})}  # зелёная точка у выбранных
-        if url_back is None:
-            url_back = f"task_mode_{data.mode}"  # возвращает к выбору складов
+        if back is None:
+            back = WarehousePick(TaskMode(data.mode))  # возвращает к выбору складов
 
         # --- кнопки типов коробок --------------------------------------------------
         pairs: list[tuple[str, str]] = []
@@ -437,7 +381,7 @@ class InlineKeyboardHandler:
             title = box_titles[bt]  # "Монопаллеты" / …
             code = bt.value  # "mono" / "safe" / "pan"
             bullet = "🟢 " if code in selected else ""  # зелёная метка
-            cb_data = f"{url}_{code}_{data.warehouse_id}_{data.page}"
+            cb_data = BoxPick(flow, bt).pack()
 
             pairs.append((f"{bullet}{title}", cb_data))
 
@@ -447,11 +391,11 @@ class InlineKeyboardHandler:
         # confirm – показываем, если выбор есть и он отличается от дефолта
         # print(set(data.box_default), selected)
         if selected and list(set((data.box_default or []))) != list(selected):
-            tail.append([("Подтвердить выбор ✅", f"{url}_confirm")])
+            tail.append([("Подтвердить выбор ✅", BoxPick(flow, confirm=True).pack())])
 
         # назад
-        back_cb: str = f"task_update_select_{data.warehouse_id}_{data.page}" if data.back else url_back
-        tail.append([("Назад ↩️", back_cb)])
+        back_cb = TaskUpdate(UpdateAction.SELECT, data.warehouse_id, data.page) if data.back else back
+        tail.append([("Назад ↩️", back_cb.pack())])
 
         # --- сборка и возврат -------------------------------------------------------
         return self.build_kb(pairs, row_width=1, tail_rows=tail)
@@ -461,19 +405,19 @@ class InlineKeyboardHandler:
     def coefs(
             self,
             data: ResponseCoefs,
-            url: str = 'coefs',
-            url_back: Optional[str] = None
+            flow: TaskFlow = TaskFlow.CREATE,
+            back: Optional[Callback] = None
     ) -> InlineKeyboardMarkup:
         # --- шорткаты и маркеры --------------------------------------------------
         selected = data.selected                    # один-единственный int | None
-        if url_back is None:
-            url_back = f"task_mode_{data.mode}_confirm" # возвращает к выбору box-types
+        if back is None:
+            back = WarehousePick(TaskMode(data.mode), confirm=True) # возвращает к выбору box-types
 
         # --- кнопки коэффициентов (21 шт., по 3 в строке) -----------------------
         pairs: list[tuple[str, str]] = []
         for coef_id, title in COEF_TITLES.items():  # 0 → "Бесплатные", …
             bullet = "🟢 " if coef_id == selected else ""
-            cb_data = f"{url}_{coef_id}"
+            cb_data = CoefPick(flow, coef_id).pack()
             pairs.append((f"{bullet}{title}", cb_data))
 
         # --- «хвост» (confirm / back) -------------------------------------------
@@ -481,13 +425,13 @@ class InlineKeyboardHandler:
 
         # confirm – если выбор есть и он отличается от дефолта
         if selected is not None and data.coef_default != selected:
-            tail.append([("Подтвердить выбор ✅", f"{url}_confirm")])
+            tail.append([("Подтвердить выбор ✅", CoefPick(flow, confirm=True).pack())])
 
         back_cb = (
-            f"task_update_select_{data.warehouse_id}_{data.page}"
-            if data.back else url_back
+            TaskUpdate(UpdateAction.SELECT, data.warehouse_id, data.page)
+            if data.back else back
         )
-        tail.append([("Назад ↩️", back_cb)])
+        tail.append([("Назад ↩️", back_cb.pack())])
 
         # --- сборка клавиатуры ---------------------------------------------------
         return self.build_kb(pairs, row_width=3, tail_rows=tail)
@@ -496,24 +440,24 @@ class InlineKeyboardHandler:
     # Выбор даты поставки (периода времени)
     def create_select_date(
             self,
-            url: str = 'select_date',
-            url_back: str = 'box_type_confirm',
-            url_calendar: str = 'select_diapason'
+            flow: TaskFlow = TaskFlow.CREATE,
+            back: Optional[Callback] = None
     ) -> InlineKeyboardMarkup:
         # --- шорткаты -----------------------------------------------------------
-        # f"task_update_select_{warehouse_id}_{page}"
+        if back is None:
+            back = BoxPick(flow, confirm=True)  # возвращает к выбору коэффициента
 
         # --- основные кнопки ----------------------------------------------------
         pairs: list[tuple[str, str]] = [
-            ("Сегодня", f"{url}_today"),
-            ("Завтра", f"{url}_tomorrow"),
-            ("Неделя", f"{url}_week"),
-            ("Месяц", f"{url}_month"),
-            ("Выбрать на календаре", url_calendar),
+            ("Сегодня", DatePick(flow, DateAction.PERIOD, DatePeriod.TODAY).pack()),
+            ("Завтра", DatePick(flow, DateAction.PERIOD, DatePeriod.TOMORROW).pack()),
+            ("Неделя", DatePick(flow, DateAction.PERIOD, DatePeriod.WEEK).pack()),
+            ("Месяц", DatePick(flow, DateAction.PERIOD, DatePeriod.MONTH).pack()),
+            ("Выбрать на календаре", DatePick(flow, DateAction.CALENDAR).pack()),
         ]
 
         # --- «хвост» (только кнопка «Назад») ------------------------------------
-        tail = [[("Назад ↩️", url_back)]]
+        tail = [[("Назад ↩️", back.pack())]]
 
         # --- сборка и возврат ----------------------------------------------------
         # row_width=2 → «Сегодня|Завтра», «Неделя|Месяц», «Календарь», «Назад»
@@ -522,11 +466,12 @@ class InlineKeyboardHandler:
     def create_alarm_list(
             self,
             page_data: ResponseTasks,
-            url: str = 'toggle_alarm',
+            item: Callable[[int, int], Callback] = AlarmToggle,
             prefix_icon: tuple[str, str] = ("🔔", "🔕"),
             alarm_helper_btn: bool = True,
-            back: str = 'alarm_setting'
+            back: Callback = AlarmSettings()
     ) -> InlineKeyboardMarkup:
+        """`item(warehouse_id, page)` — кнопка склада: AlarmToggle или, например, TaskUpdate.select."""
         # --- данные из модели: Парсинг Pydantic модели --------------------------
         warehouses = page_data.warehouses_names_list
         page: int = page_data.page_index
@@ -540,7 +485,7 @@ class InlineKeyboardHandler:
             name = warehouse["name"]
             icon = prefix_icon[0] if alarm_status.get(wid) else prefix_icon[1]
             label = f"{icon} {name}"
-            pairs.append((label, f"{url}_{wid}_{page}"))
+            pairs.append((label, item(wid, page).pack()))
 
         # --- «хвост» (пагинация + действия + назад) ---------------------------------
         tail_rows: list[list[tuple[str, str]]] = []
@@ -556,10 +501,10 @@ class InlineKeyboardHandler:
         #     tail_rows.append(pagination)
 
         if warehouses and alarm_helper_btn:
-            tail_rows.append([("Включить для всех", "alarm_all_on")])
-            tail_rows.append([("Отключить для всех", "alarm_all_off")])
+            tail_rows.append([("Включить для всех", AlarmAll(True).pack())])
+            tail_rows.append([("Отключить для всех", AlarmAll(False).pack())])
 
-        tail_rows.append([("Назад ↩️", back)])
+        tail_rows.append([("Назад ↩️", back.pack())])
 
         # --- сборка -----------------------------------------------------------------
         return self.build_kb(pairs, row_width=2, tail_rows=tail_rows)
@@ -620,7 +565,7 @@ class InlineKeyboardHandler:
         for warehouse in warehouses:
             wid = warehouse["id"]
             name = str(warehouse["name"])  # Значение alarm никак не влияет на имя
-            row.append(InlineKeyboardButton(text=name, callback_data=f"task_update_select_{wid}_{page}"))
+            row.append(InlineKeyboardButton(text=name, callback_data=TaskUpdate(UpdateAction.SELECT, wid, page).pack()))
 
             if len(row) == 2:
                 buttons.append(row)
@@ -631,13 +576,13 @@ class InlineKeyboardHandler:
 
         pagination: list[InlineKeyboardButton] = []
         if page > 0:
-            pagination.append(InlineKeyboardButton(text="⬅️ Предыдущая", callback_data=f"task_update_page_{page - 1}"))
+            pagination.append(InlineKeyboardButton(text="⬅️ Предыдущая", callback_data=TaskUpdate(page=page - 1).pack()))
         if page < total_pages - 1:
-            pagination.append(InlineKeyboardButton(text="Следующая ➡️", callback_data=f"task_update_page_{page + 1}"))
+            pagination.append(InlineKeyboardButton(text="Следующая ➡️", callback_data=TaskUpdate(page=page + 1).pack()))
         if pagination:
             buttons.append(pagination)
 
-        buttons.append([InlineKeyboardButton(text="Назад ↩️", callback_data="my_tasks")])
+        buttons.append([InlineKeyboardButton(text="Назад ↩️", callback_data=MyTasks().pack())])
         return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
@@ -649,23 +594,23 @@ class InlineKeyboardHandler:
          return self.build_inline_keyboard([
             [{
                 "text": "📦 Изменить тип упаковки",
-                "callback_data": f"task_update_box_{warehouse_id}_{page}"
+                "callback_data": TaskUpdate(UpdateAction.BOX, warehouse_id, page).pack()
             }],
             [{
                 "text": "🧮 Изменить коэффициент",
-                "callback_data": f"task_update_coef_{warehouse_id}_{page}"
+                "callback_data": TaskUpdate(UpdateAction.COEF, warehouse_id, page).pack()
             }],
             [{
                 "text": "📅 Изменить период",
-                "callback_data": f"task_update_date_{warehouse_id}_{page}"
+                "callback_data": TaskUpdate(UpdateAction.DATE, warehouse_id, page).pack()
             }],
             [{
                 "text": "🗑️ Удалить задачу",
-                "callback_data": f"task_delete_id{warehouse_id}_{page}"
+                "callback_data": TaskDelete(DeleteAction.ONE, warehouse_id, page).pack()
             }],
             [{
                 "text": "Назад ↩️",
-                "callback_data": f"task_update_page_{page}"
+                "callback_data": TaskUpdate(page=page).pack()
             }],
         ])
 
@@ -676,10 +621,8 @@ class InlineKeyboardHandler:
         month: int | None = None,  # выбранный месяц (None → текущий)
         highlight_day: int | None = None,  # «выбранный» день (None → нет)
         confirm: bool = False,  # показать кнопку «Подтвердить выбор»
-        url: str = 'select_day',
-        url_confirm: str = 'date_confirm',
-        url_back: str = 'coefs_confirm',
-        url_change: str = 'change_month'
+        flow: TaskFlow = TaskFlow.CREATE,  # сценарий кнопок дня / месяца / подтверждения
+        back: Optional[Callback] = None  # None → к выбору коэффициента
     ) -> InlineKeyboardMarkup:
         """
         Генерирует инлайн-календарь одного месяца.
@@ -695,11 +638,40 @@ class InlineKeyboardHandler:
         └───────────────┘
         """
         # ── 0. дата по умолчанию ------------------------------------------
-        today = datetime.now()
-        year = year or today.year
-        month = month or today.month
-        highlight_day = highlight_day or today.day
+        today = date.today()
+        if InlineKeyboardHandler._calendar_day != today:
+            # наступили новые сутки — метка «сегодня» и кнопка «Сегодня» устарели
+            InlineKeyboardHandler._calendar_markup.cache_clear()
+            InlineKeyboardHandler._calendar_day = today
+
+        return InlineKeyboardHandler._calendar_markup(
+            today,
+            year or today.year,
+            month or today.month,
+            highlight_day or today.day,
+            confirm,
+            flow,
+            back or CoefPick(flow, confirm=True),
+        )
 
+    # Дата, для которой собраны календари в кэше _calendar_markup
+    _calendar_day: date | None = None
+
+    @staticmethod
+    @lru_cache(maxsize=CALENDAR_CACHE_SIZE)
+    def _calendar_markup(
+            today: date,
+            year: int,
+            month: int,
+            highlight_day: int,
+            confirm: bool,
+            flow: TaskFlow,
+            back: Callback,
+    ) -> FrozenInlineKeyboardMarkup:
+        """
+        Собирает календарь месяца. Результат кэшируется по всем аргументам, включая `today`,
+        поэтому отдаётся замороженная клавиатура — один объект на всех пользователей.
+        """
         # ── 1. заголовок и дни недели -------------------------------------
         # Можно использовать локализованные названия месяцев:
         MONTHS: list[str] = [
@@ -707,11 +679,12 @@ class InlineKeyboardHandler:
             "Июл", "Авг", "Сен", "Окт", "Ноя", "Дек"
         ]
         WEEKDAYS: list[str] = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+        ignore = Noop().pack()
         kb: list[list[InlineKeyboardButton]] = [
             # месяц + год
-            [InlineKeyboardButton(text=f"[{MONTHS[month - 1]} {year}]", callback_data="ignore")],
+            [InlineKeyboardButton(text=f"[{MONTHS[month - 1]} {year}]", callback_data=ignore)],
             # шапка дней недели
-            [InlineKeyboardButton(text=day, callback_data="ignore") for day in WEEKDAYS],
+            [InlineKeyboardButton(text=day, callback_data=ignore) for day in WEEKDAYS],
         ]
 
         # ── 2. сетка дней ---------------------------------------------------
@@ -719,7 +692,7 @@ class InlineKeyboardHandler:
             row: list[InlineKeyboardButton] = []
             for day in week:
                 if day == 0:  # пустая ячейка
-                    row.append(InlineKeyboardButton(text=" ", callback_data="ignore"))
+                    row.append(InlineKeyboardButton(text=" ", callback_data=ignore))
                     continue
 
                 # подсветка «сегодня» или выбранного дня
@@ -732,7 +705,7 @@ class InlineKeyboardHandler:
                 row.append(
                     InlineKeyboardButton(
                         text=f"{mark}{day}{mark}",
-                        callback_data=f"{url}_{year}_{month}_{day}"
+                        callback_data=DatePick(flow, DateAction.DAY, day=date(year, month, day)).pack()
                     )
                 )
             kb.append(row)
@@ -746,30 +719,30 @@ class InlineKeyboardHandler:
 
         # Нижний ряд кнопок: назад по месяцу, сегодня, вперёд по месяцу
         kb.append([
-            InlineKeyboardButton(text="⬅️", callback_data=f"{url_change}_{prev_y}_{prev_m}"),
+            InlineKeyboardButton(text="⬅️", callback_data=DatePick(flow, DateAction.MONTH, day=date(prev_y, prev_m, 1)).pack()),
             InlineKeyboardButton(
                 text="Сегодня",
-                callback_data=f"{url}_{today.year}_{today.month}_{today.day}"
+                callback_data=DatePick(flow, DateAction.DAY, day=today).pack()
             ),
-            InlineKeyboardButton(text="➡️", callback_data=f"{url_change}_{next_y}_{next_m}"),
+            InlineKeyboardButton(text="➡️", callback_data=DatePick(flow, DateAction.MONTH, day=date(next_y, next_m, 1)).pack()),
         ])
 
         # ── 4. confirm / back ----------------------------------------------
         if confirm:
-            kb.append([InlineKeyboardButton(text="Подтвердить выбор ✅", callback_data=url_confirm)])
+            kb.append([InlineKeyboardButton(text="Подтвердить выбор ✅", callback_data=DatePick(flow, DateAction.CONFIRM).pack())])
 
         # Кнопка "Назад"
-        kb.append([InlineKeyboardButton(text="Назад ↩️", callback_data=url_back)])
+        kb.append([InlineKeyboardButton(text="Назад ↩️", callback_data=back.pack())])
 
         # ── 5. возврат -------------------------------------------------------
-        return InlineKeyboardMarkup(inline_keyboard=kb)
+        return freeze_markup(InlineKeyboardMarkup(inline_keyboard=kb))
 
     @staticmethod
     def generate_pagination_keyboard(
             current_page: int,
             total_tasks: int,
             page_size: int = 5,
-            callback_data: str = "paginate_",
+            page_callback: Callable[[int], Callback] = MyTasks,
             base_keyboard: InlineKeyboardMarkup | None = None
     ) -> InlineKeyboardMarkup:
         """
@@ -779,7 +752,7 @@ class InlineKeyboardHandler:
         :param current_page: Текущая страница.
         :param total_tasks: Общее количество задач.
         :param page_size: Количество задач на одной странице.
-        :param callback_data: Префикс callback_data для кнопок.
+        :param page_callback: Кнопка страницы: номер страницы → объект кнопки (по умолчанию MyTasks).
         :param base_keyboard: Существующая клавиатура (InlineKeyboardMarkup) для расширения (опционально).
         :return: InlineKeyboardMarkup с кнопками пагинации.
         """
@@ -787,22 +760,24 @@ class InlineKeyboardHandler:
         total_pages: int = (total_tasks - 1) // page_size
 
         buttons: list[InlineKeyboardButton] = [
-            InlineKeyboardButton(text="⬅️ Предыдущая", callback_data=f"{callback_data}{current_page - 1}")
+            InlineKeyboardButton(text="⬅️ Предыдущая", callback_data=page_callback(current_page - 1).pack())
             if current_page > 0 else None,
-            InlineKeyboardButton(text="Следующая ➡️", callback_data=f"{callback_data}{current_page + 1}")
+            InlineKeyboardButton(text="Следующая ➡️", callback_data=page_callback(current_page + 1).pack())
             if current_page < total_pages else None
         ]
         buttons = [btn for btn in buttons if btn]
 
-        if not base_keyboard:
-            base_keyboard = InlineKeyboardMarkup(inline_keyboard=[])
-        else:
-            base_keyboard.inline_keyboard = [
-                row for row in base_keyboard.inline_keyboard
-                if all(btn.text not in {"⬅️ Предыдущая", "Следующая ➡️"} for btn in row)
-            ]
+        # базовую клавиатуру не меняем: она может быть общей (например, inline.my_tasks)
+        rows: list[list[InlineKeyboardButton]] = [
+            list(row) for row in (base_keyboard.inline_keyboard if base_keyboard else ())
+            if all(btn.text not in {"⬅️ Предыдущая", "Следующая ➡️"} for btn in row)
+        ]
 
         if buttons:
-            base_keyboard.inline_keyboard.insert(0, buttons)
+            rows.insert(0, buttons)
+
+        return InlineKeyboardMarkup(inline_keyboard=rows)
+
 
-        return base_keyboard
\ No newline at end of file
+# Реестр клавиатур: готовые клавиатуры и фабрики одного общего экземпляра обработчика
+keyboard_registry: KeyboardRegistry = KeyboardRegistry.from_handler(InlineKeyboardHandler())
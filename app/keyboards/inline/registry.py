@@ -0,0 +1,83 @@
+from typing import Any, Callable, NamedTuple
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from pydantic import ConfigDict
+
+KeyboardFactory = Callable[..., InlineKeyboardMarkup]
+
+
+class FrozenInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """
+    Неизменяемая клавиатура: ни присвоить `inline_keyboard`, ни вставить строку.
+    Готовые клавиатуры общие для всех пользователей, поэтому менять их на месте нельзя.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    inline_keyboard: tuple[tuple[InlineKeyboardButton, ...], ...]
+
+
+def freeze_markup(markup: InlineKeyboardMarkup) -> FrozenInlineKeyboardMarkup:
+    if isinstance(markup, FrozenInlineKeyboardMarkup):
+        return markup
+    return FrozenInlineKeyboardMarkup(inline_keyboard=tuple(tuple(row) for row in markup.inline_keyboard))
+
+
+class KeyboardCall(NamedTuple):
+    """
+    Ссылка на клавиатуру-фабрику с аргументами — замена строкам вида "method(1, 'x')".
+
+    ResponseModel(kb=KeyboardCall('edit_task_warehouse', (warehouse_id, page)))
+    """
+    alias: str
+    args: tuple[Any, ...] = ()
+    kwargs: dict[str, Any] = {}
+
+
+class KeyboardRegistry:
+    """
+    Реестр клавиатур: псевдоним → готовая замороженная клавиатура или фабрика.
+
+    Разрешение псевдонима — один поиск в словаре, без regex/shlex/literal_eval.
+    """
+
+    def __init__(self) -> None:
+        self._static: dict[str, FrozenInlineKeyboardMarkup] = {}
+        self._factories: dict[str, KeyboardFactory] = {}
+
+    def register(self, alias: str, markup: InlineKeyboardMarkup) -> FrozenInlineKeyboardMarkup:
+        frozen = freeze_markup(markup)
+        self._static[alias] = frozen
+        return frozen
+
+    def register_factory(self, alias: str, factory: KeyboardFactory) -> None:
+        self._factories[alias] = factory
+
+    @classmethod
+    def from_handler(cls, handler: Any) -> "KeyboardRegistry":
+        """
+        Строит реестр из InlineKeyboardHandler: атрибуты-клавиатуры экземпляра — готовые,
+        методы из `handler.factories` — фабрики под своими именами.
+        """
+        registry = cls()
+        for alias, value in vars(handler).items():
+            if isinstance(value, InlineKeyboardMarkup):
+                registry.register(alias, value)
+        for alias in getattr(handler, "factories", ()):
+            registry.register_factory(alias, getattr(handler, alias))
+        return registry
+
+    def resolve(self, ref: str | KeyboardCall) -> InlineKeyboardMarkup:
+        """Псевдоним → клавиатура; KeyboardCall → результат фабрики."""
+        if isinstance(ref, KeyboardCall):
+            return self._factories[ref.alias](*ref.args, **ref.kwargs)
+
+        markup = self._static.get(ref)
+        if markup is not None:
+            return markup
+        factory = self._factories.get(ref)
+        if factory is None:
+            raise KeyError(f"Клавиатура {ref!r} не зарегистрирована")
+        return factory()
+
+    def __contains__(self, alias: str) -> bool:
+        return alias in self._static or alias in self._factories
@@ -135,6 +135,9 @@ lang: dict[str, dict[str, str]] = {
         "❌ Произошла ошибка.\n"
         "Попробуйте позже."
     ),
+    'callback_outdated': (
+        "⌛ Эта кнопка устарела — откройте меню заново: /start"
+    ),
     'confirm_delete_tasks': (
         "⚠️ Вы уверены, что хотите удалить все ваши задачи?"
     ),
@@ -148,6 +151,25 @@ lang: dict[str, dict[str, str]] = {
     'single_task_deleted': (
         "❌ Задачи по этому складу полностью удалены.\n"
     ),
+    'tasks_not_saved': (
+        "❌ Не удалось сохранить задачи.\n"
+        "Попробуйте ещё раз позже."
+    ),
+    'tasks_saved_partially': (
+        "⚠️ Сохранено задач: {saved} из {total}.\n"
+        "Проверьте список и добавьте недостающие склады."
+    ),
+    'slot_alert': (
+        "🔔 <b>НАЙДЕНЫ СЛОТЫ НА ОТГРУЗКУ!</b>\n\n"
+        "{warehouses}"
+    ),
+    'slot_alert_warehouse': (
+        "🚛 <b>СКЛАД:</b> {name}\n"
+        "{slots}\n"
+    ),
+    'slot_alert_line': (
+        "📅 <u>{date}</u> — {box} — х{coefficient}"
+    ),
     'alarm_cancel': (
         "❌ Невозможно выполнить операцию\n"
         "У вас уже установлен текущий статус уведомлений!"
@@ -0,0 +1,33 @@
+import logging
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+from app.keyboards.inline import callbacks  # noqa: F401 — регистрирует коды операций кнопок
+from app.keyboards.inline.callback_codec import CallbackDecodeError, unpack
+
+
+class CallbackDataMiddleware(BaseMiddleware):
+    """
+    Middleware декодирует callback_data один раз на нажатие и кладёт в данные обработчика
+    типизированный объект кнопки — `callback_data` (app/keyboards/inline/callbacks.py).
+
+    Регистрируется внешним (outer) на dp.callback_query: срабатывает до фильтров роутеров,
+    поэтому `WarehousePick.filter()` и обработчики получают уже разобранный объект.
+    Кнопка в прежнем формате (сообщение отправлено до обновления) → `callback_data=None`,
+    такие нажатия ловит фильтр `StaleCallback`.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, CallbackQuery):
+            try:
+                data["callback_data"] = unpack(event.data or "")
+            except CallbackDecodeError as e:
+                logging.debug(f"Кнопка не декодирована: {e}")
+                data["callback_data"] = None
+        return await handler(event, data)
@@ -0,0 +1,24 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.commons.utils.fsm_storage import SQLAlchemyStorage
+
+
+class FSMBatchMiddleware(BaseMiddleware):
+    """
+    Middleware открывает batch хранилища FSM на время обработки апдейта:
+    чтения состояния кэшируются, записи уходят в базу одной транзакцией после обработчика.
+    """
+
+    def __init__(self, storage: SQLAlchemyStorage) -> None:
+        self.storage = storage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self.storage.batch():
+            return await handler(event, data)
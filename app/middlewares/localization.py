@@ -0,0 +1,24 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from app.commons.utils.language_loader import localization_registry
+
+
+class LocalizationMiddleware(BaseMiddleware):
+    """
+    Middleware кладёт в данные обработчика языковой пакет пользователя — `lang`.
+
+    Обработчики получают пакет аргументом (`lang: LangType`) и передают его дальше в
+    контроллеры; общий `self.lang` на экземпляре контроллера больше не используется.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        data["lang"] = localization_registry.get(user.language_code if user else None)
+        return await handler(event, data)
@@ -1,25 +1,45 @@
+import random
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import Update, TelegramObject
 import logging
 
+from app.commons.utils.custom_logger import current_update_id, update_debug_sampled
+from config.config import settings
+
+
 class LoggingMiddleware(BaseMiddleware):
     """
-    Middleware для логирования всех CallbackQuery.
+    Middleware для логирования апдейтов.
+
+    • привязывает к логам апдейта его `update_id` (попадает в JSON-записи);
+    • решает, попадёт ли апдейт в выборку DEBUG-логов (`update_debug_sample_rate`):
+      не попавшие DEBUG-записи отбрасываются ещё до очереди логов;
+    • сам апдейт (тип и callback_data) логируется одной DEBUG-строкой.
     """
 
+    def __init__(self, sample_rate: float = settings.logging.update_debug_sample_rate) -> None:
+        self.sample_rate = sample_rate
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        # Логируем событие
-        logging.warning(f"Middleware вызван для события: {type(event).__name__}")
+        if not isinstance(event, Update):
+            return await handler(event, data)
 
-        # Проверяем, является ли событие `CallbackQuery`
-        if isinstance(event, Update) and event.callback_query:
-            logging.warning(f"Получен CallbackQuery: {event.callback_query.data}")
+        sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        id_token = current_update_id.set(event.update_id)
+        sampled_token = update_debug_sampled.set(sampled)
+        try:
+            if sampled and logging.getLogger().isEnabledFor(logging.DEBUG):
+                callback = f": {event.callback_query.data}" if event.callback_query else ""
+                logging.debug(f"Апдейт {event.update_id} ({event.event_type}){callback}")
 
-        # Продолжаем выполнение обработчика
-        return await handler(event, data)
\ No newline at end of file
+            # Продолжаем выполнение обработчика
+            return await handler(event, data)
+        finally:
+            update_debug_sampled.reset(sampled_token)
+            current_update_id.reset(id_token)
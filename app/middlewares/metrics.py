@@ -0,0 +1,46 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject
+
+from app.commons.utils.metrics import MetricsRegistry, UpdateTimings, current_timings, handler_name, metrics
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Метрики по обработчикам роутеров: латентность, время в БД и Bot API, ошибки, in-flight.
+
+    Подключается как inner-middleware наблюдателей (`dp.message`, `dp.callback_query`) —
+    только там уже известен выбранный обработчик (`data["handler"]`).
+    """
+
+    def __init__(self, registry: MetricsRegistry = metrics) -> None:
+        self.registry = registry
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object: HandlerObject | None = data.get("handler")
+        if handler_object is None:
+            return await handler(event, data)
+
+        stats = self.registry.handler(handler_name(handler_object.callback))
+        timings = UpdateTimings()
+        token = current_timings.set(timings)
+        stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.latency.observe(time.perf_counter() - started)
+            stats.db.observe(timings.db)
+            stats.api.observe(timings.api)
+            stats.in_flight -= 1
+            current_timings.reset(token)
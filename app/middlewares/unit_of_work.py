@@ -0,0 +1,38 @@
+import logging
+import time
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.models.alchemy_helper import db_helper
+
+
+class UnitOfWorkMiddleware(BaseMiddleware):
+    """
+    Middleware открывает одну транзакцию на апдейт (db_helper.unit_of_work):
+    сервисы и CRUD получают общую сессию через db_helper.session_getter(),
+    коммит или откат — один раз после обработчика. Автор апдейта запоминается в единице
+    работы: после его записи чтения идут мимо реплик (read-your-writes).
+
+    Число SQL-запросов апдейта пишется в лог (DEBUG; WARNING — если больше `warn_queries`).
+    """
+
+    def __init__(self, warn_queries: int = 10) -> None:
+        self.warn_queries = warn_queries
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        async with db_helper.unit_of_work(actor=user.id if user else None) as uow:
+            data["uow"] = uow
+            result = await handler(event, data)
+
+        update_id = event.update_id if isinstance(event, Update) else None
+        elapsed = (time.perf_counter() - uow.started) * 1000
+        level = logging.WARNING if len(uow.queries) > self.warn_queries else logging.DEBUG
+        logging.log(level, f"Апдейт {update_id}: SQL-запросов — {len(uow.queries)}, {elapsed:.0f} мс")
+        return result
@@ -1,15 +1,131 @@
+import itertools
+import logging
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Any, Awaitable, Callable, Iterable, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.dialects import postgresql, sqlite
 
 from sqlalchemy.ext.asyncio import (
-    create_async_engine,
     AsyncEngine,
+    AsyncConnection,
+    AsyncTransaction,
     async_sessionmaker,
     AsyncSession,
 )
 
+from app.models.engine_profiles import EngineProfile, build_profile, create_engine_from, replica_options
+from app.models.sql_instrumentation import SQLInstrumentation
 from config.config import settings
 
+# Действие после фиксации транзакции: обновить структуры в памяти, отражающие базу
+CommitHook = Callable[[], None]
+
+# Хуки задания очереди записи, которое сейчас выполняется (выставляет WriteQueue)
+pending_commit_hooks: ContextVar[Optional[list[CommitHook]]] = ContextVar("pending_commit_hooks", default=None)
+
+# Куда записывать SQL вне контекста апдейта: писатель очереди засчитывает свои запросы апдейту-заказчику
+query_log: ContextVar[Optional[list[str]]] = ContextVar("query_log", default=None)
+
+
+def run_commit_hooks(hooks: Iterable[CommitHook]) -> None:
+    """Выполняет хуки после COMMIT; ошибка одного не мешает остальным (транзакция уже зафиксирована)."""
+    for hook in hooks:
+        try:
+            hook()
+        except Exception as e:
+            logging.error(f"Ошибка в действии после коммита {hook!r}: {e}", exc_info=True)
+
+
+@dataclass(slots=True)
+class UnitOfWork:
+    """
+    Одна транзакция на апдейт: общая сессия для сервисов и CRUD, коммит — один раз в конце.
+
+    Соединение берётся из пула при первом обращении к базе, а не на входе в апдейт;
+    с очередью записи (SQLite) транзакция апдейта — её задание (`update_session_source`).
+    `queries` — SQL, выполненный в рамках апдейта (в т.ч. вне общей сессии).
+    `actor` — пользователь Telegram, от которого пришёл апдейт (для read-your-writes).
+    `after_commit` — хуки db_helper.on_commit: выполняются только после COMMIT всей транзакции.
+    `release` — если транзакцию апдейта держит очередь записи (SQLite, см. WriteQueue.open_update):
+    завершает её задание — фиксирует (True) или откатывает (False) — вместо собственного COMMIT.
+    """
+    helper: "DatabaseHelper"
+    actor: Optional[int] = None
+    queries: list[str] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+    connection: Optional[AsyncConnection] = None
+    transaction: Optional[AsyncTransaction] = None
+    session: Optional[AsyncSession] = None
+    after_commit: list[CommitHook] = field(default_factory=list)
+    release: Optional[Callable[[bool], Awaitable[None]]] = None
+
+    async def get_session(self) -> AsyncSession:
+        if self.session is None and self.helper.update_session_source is not None:
+            self.session = await self.helper.update_session_source(self)
+        if self.session is None:
+            self.connection = await self.helper.engine.connect()
+            self.transaction = await self.connection.begin()
+            # commit()/rollback() внутри CRUD работают с SAVEPOINT, а не со всей транзакцией
+            self.session = self.helper.session_factory(bind=self.connection, join_transaction_mode="create_savepoint")
+        return self.session
+
+    async def finish(self, success: bool) -> None:
+        if self.session is None:
+            return
+        hooks, self.after_commit = self.after_commit, []
+        if not success:
+            hooks = []
+        try:
+            if self.release is not None:
+                await self.release(success)
+            elif success:
+                await self.session.commit()
+                await self.transaction.commit()
+            else:
+                await self.transaction.rollback()
+        except BaseException:
+            hooks = []
+            raise
+        finally:
+            if self.release is None:  # сессию задания очереди закрывает писатель
+                await self.session.close()
+                await self.connection.close()
+        run_commit_hooks(hooks)
+
+
+# Единица работы текущего апдейта (открывает UnitOfWorkMiddleware)
+current_uow: ContextVar[Optional[UnitOfWork]] = ContextVar("current_uow", default=None)
+
+
+class RecentWriters:
+    """
+    Кто из пользователей писал в основную базу за последние `window` сек: их чтения идут мимо
+    реплик, пока те могут отставать. Состояние — в памяти процесса.
+    """
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self._until: dict[int, float] = {}
+        self._next_prune = 0.0
+
+    def mark(self, actor: int) -> None:
+        now = time.monotonic()
+        self._until[actor] = now + self.window
+        if now >= self._next_prune:  # истёкшие записи вычищаются не чаще раза в окно
+            self._until = {key: until for key, until in self._until.items() if until > now}
+            self._next_prune = now + self.window
+
+    def __contains__(self, actor: int) -> bool:
+        return self._until.get(actor, 0.0) > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._until)
+
 
 class DatabaseHelper:
     def __init__(
@@ -17,36 +133,218 @@ class DatabaseHelper:
         url: str,
         echo: bool = False,
         echo_pool: bool = False,
-        pool_size: int = 5,
-        max_overflow: int = 10,
+        profile: Optional[EngineProfile] = None,
+        slow_query_ms: float = 200.0,
+        explain_interval: float = 600.0,
+        replica_urls: Sequence[str] = (),
+        sticky_sec: float = 5.0,
     ) -> None:
-        self.engine: AsyncEngine = create_async_engine(
-            url=url,
-            echo=echo,
-            echo_pool=echo_pool,
-            pool_size=pool_size,
-            max_overflow=max_overflow,
-        )
+        # Пул, PRAGMA и BEGIN зависят от диалекта — см. app/models/engine_profiles.py
+        self.profile = profile or build_profile(url, settings.db)
+        self.engine: AsyncEngine = create_engine_from(url, self.profile.writer, echo=echo, echo_pool=echo_pool)
         self.session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
             bind=self.engine,
             autoflush=False,
             autocommit=False,
             expire_on_commit=False,
         )
+        # Движок для чтения вне апдейтов; если профиль его не выделяет — тот же, что для записи
+        self.read_engine: AsyncEngine = self.engine
+        self.read_session_factory = self.session_factory
+        if self.profile.reader is not None:
+            self.read_engine = create_engine_from(url, self.profile.reader, echo=echo, echo_pool=echo_pool)
+            self.read_session_factory = async_sessionmaker(
+                bind=self.read_engine,
+                autoflush=False,
+                autocommit=False,
+                expire_on_commit=False,
+            )
+
+        # Реплики: чтения вне апдейта и чистые чтения сервисов расходятся по ним по кругу
+        self.replica_engines: list[AsyncEngine] = [
+            create_engine_from(replica_url, replica_options(replica_url, settings.db), echo=echo, echo_pool=echo_pool)
+            for replica_url in replica_urls
+        ]
+        self._replica_factories = itertools.cycle([
+            async_sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+            for engine in self.replica_engines
+        ])
+        self.recent_writers = RecentWriters(sticky_sec)
+        # Откуда единица работы берёт пишущую сессию; None — своё соединение пишущего движка.
+        # Очередь записи (SQLite) подставляет сюда WriteQueue.open_update
+        self.update_session_source: Optional[Callable[[UnitOfWork], Awaitable[AsyncSession]]] = None
+
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._record_query)
+        if self.replica_engines:
+            event.listen(self.engine.sync_engine, "before_cursor_execute", self._track_write)
+        # Время/отпечатки запросов, медленные запросы с EXPLAIN, ожидание пула
+        # EXPLAIN медленных запросов — не на пишущем движке: на SQLite это единственное соединение с BEGIN IMMEDIATE
+        self.instrumentation = SQLInstrumentation(self.engine, slow_query_ms, explain_interval, explain_engine=self.read_engine)
+        if self.read_engine is not self.engine:
+            self.instrumentation.attach(self.read_engine, pool_name="read")
+        for number, engine in enumerate(self.replica_engines, start=1):
+            self.instrumentation.attach(engine, pool_name=f"replica{number}")
+
+    @property
+    def engines(self) -> tuple[AsyncEngine, ...]:
+        primary = (self.engine,) if self.read_engine is self.engine else (self.engine, self.read_engine)
+        return (*primary, *self.replica_engines)
 
     async def dispose(self) -> None:
-        await self.engine.dispose()
+        for engine in self.engines:
+            await engine.dispose()
 
     @asynccontextmanager
     async def session_getter(self) -> AsyncGenerator[AsyncSession, None]:
-        async with self.session_factory() as session:
+        """
+        Сессия для сервиса/CRUD. Внутри апдейта (UnitOfWorkMiddleware) — общая сессия апдейта,
+        при ошибке откатывается только её текущий SAVEPOINT; вне апдейта — новая сессия.
+        """
+        uow = current_uow.get()
+        if uow is None:
+            async with self.session_factory() as session:
+                yield session
+            return
+
+        session = await uow.get_session()
+        registered = len(uow.after_commit)
+        try:
+            yield session
+        except BaseException:
+            await session.rollback()
+            del uow.after_commit[registered:]  # изменения откачены — их хуки тоже
+            raise
+
+    @asynccontextmanager
+    async def read_session_getter(self, replica: bool = True) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Сессия только для чтения:
+
+        • внутри апдейта, уже начавшего транзакцию, — общая сессия апдейта, чтобы видеть
+          его незафиксированные изменения;
+        • если заданы реплики — сессия очередной реплики; но пользователь, писавший в основную
+          базу последние `sticky_sec` сек, читает с основной (read-your-writes), как и вызовы
+          с `replica=False` — для данных, которые читаются сразу после своей же записи (FSM);
+        • иначе — движок читателей основной базы (SQLite — пул query_only, не ждёт писателя).
+        """
+        uow = current_uow.get()
+        if uow is not None and uow.session is not None:
+            async with self.session_getter() as session:
+                yield session
+            return
+
+        factory = self.read_session_factory
+        if replica and self.replica_engines and (uow is None or uow.actor not in self.recent_writers):
+            factory = next(self._replica_factories)
+        async with factory() as session:
             yield session
 
+    @asynccontextmanager
+    async def unit_of_work(self, actor: Optional[int] = None) -> AsyncGenerator[UnitOfWork, None]:
+        """Открывает единицу работы; коммит при успешном выходе, откат — при исключении."""
+        if (uow := current_uow.get()) is not None:  # вложенный вызов — работаем во внешней
+            yield uow
+            return
+
+        uow = UnitOfWork(self, actor=actor)
+        token = current_uow.set(uow)
+        try:
+            yield uow
+        except BaseException:
+            current_uow.reset(token)
+            await uow.finish(success=False)
+            raise
+        current_uow.reset(token)
+        await uow.finish(success=True)
+
+    @staticmethod
+    def on_commit(hook: CommitHook) -> None:
+        """
+        Выполняет `hook` после фиксации транзакции, в которой идёт текущая запись:
+
+        • задание очереди записи — после COMMIT его пачки (если SAVEPOINT задания не откатился);
+        • единица работы апдейта — после её COMMIT; при откате хук отбрасывается;
+        • отдельная сессия вне апдейта — сразу: CRUD уже выполнил настоящий session.commit().
+
+        Для структур в памяти, отражающих базу (TaskMatcher, known_users): внутри единицы
+        работы и пачки очереди `session.commit()` в CRUD фиксирует только SAVEPOINT.
+        """
+        hooks = pending_commit_hooks.get()
+        if hooks is None:
+            uow = current_uow.get()
+            if uow is not None and uow.session is not None:
+                hooks = uow.after_commit
+        if hooks is None:
+            run_commit_hooks((hook,))
+        else:
+            hooks.append(hook)
+
+    def note_write(self) -> None:
+        """Отмечает, что пользователь текущего апдейта записал в основную базу."""
+        uow = current_uow.get()
+        if uow is not None and uow.actor is not None and self.replica_engines:
+            self.recent_writers.mark(uow.actor)
+
+    @staticmethod
+    def _record_query(conn, cursor, statement, parameters, context, executemany) -> None:
+        uow = current_uow.get()
+        queries = uow.queries if uow is not None else query_log.get()
+        if queries is not None:
+            queries.append(statement)
+
+    def _track_write(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+            self.note_write()
+
+
+def dialect_insert(session: AsyncSession, table: Any):
+    """
+    INSERT текущего диалекта — с поддержкой `on_conflict_do_update / do_nothing`.
+    Обычный `sqlalchemy.insert` конструкции ON CONFLICT не знает.
+    """
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"ON CONFLICT не поддерживается для диалекта {dialect}")
+
+
+def supports_copy(session: AsyncSession) -> bool:
+    """COPY … FROM STDIN доступен только на Postgres через asyncpg."""
+    dialect = session.bind.dialect
+    return dialect.name == "postgresql" and dialect.driver == "asyncpg"
+
+
+async def copy_records(
+        session: AsyncSession,
+        table_name: str,
+        columns: Sequence[str],
+        records: Iterable[tuple],
+) -> int:
+    """
+    Загружает строки через COPY в текущей транзакции сессии (asyncpg `copy_records_to_table`).
+
+    Значения по умолчанию SQLAlchemy (created_at, state, …) при COPY не подставляются —
+    их нужно передать в `records`; колонки без значения получают DEFAULT сервера (id).
+    :return: Число загруженных строк
+    """
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    try:
+        status = await raw.driver_connection.copy_records_to_table(table_name, records=records, columns=list(columns))
+    except Exception as e:
+        # ошибки asyncpg приходят мимо SQLAlchemy — приводим к DBAPIError, как у обычных запросов
+        raise DBAPIError(f"COPY {table_name} ({', '.join(columns)}) FROM STDIN", None, e) from e
+    return int(status.rsplit(" ", 1)[-1])  # "COPY 1234"
+
 
 db_helper = DatabaseHelper(
     url=str(settings.db.url),
     echo=settings.db.echo,
     echo_pool=settings.db.echo_pool,
-    pool_size=settings.db.pool_size,
-    max_overflow=settings.db.max_overflow,
+    slow_query_ms=settings.db.slow_query_ms,
+    explain_interval=settings.db.explain_interval,
+    replica_urls=settings.db.replicas.urls,
+    sticky_sec=settings.db.replicas.sticky_sec,
 )
\ No newline at end of file
@@ -1,7 +1,7 @@
 from datetime import datetime, date
 from typing import Optional
 
-from sqlalchemy import Integer, DateTime
+from sqlalchemy import Integer, DateTime, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base  # Base уже содержит id, created_at, updated_at
@@ -9,6 +9,10 @@ from .base import Base  # Base уже содержит id, created_at, updated_a
 
 class Coefficient(Base):
     __tablename__ = "coefficients"
+    __table_args__ = (
+        # ключ снимка: по нему идёт upsert при загрузке коэффициентов
+        UniqueConstraint("warehouse_id", "box_type_id", "date"),
+    )
 
     warehouse_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True, comment="ID склада, к которому относится коэффициент")
     box_type_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, comment="ID типа коробки")
@@ -37,6 +37,21 @@ async def get_all_bots(
     return result.all()
 
 
+async def get_active_bot_tokens(
+        session: AsyncSession,
+        user_ids: Sequence[int]
+) -> dict[int, str]:
+    """
+    Токены активных ботов уведомлений для списка пользователей: {user_id: api_token}.
+    Пользователи без активного бота в результат не попадают.
+    """
+    if not user_ids:
+        return {}
+    stmt = select(Bot.user_id, Bot.api_token).where(Bot.user_id.in_(user_ids), Bot.status == 1)
+    result = await session.execute(stmt)
+    return {user_id: api_token for user_id, api_token in result.all()}
+
+
 async def get_bot_field(
         session: AsyncSession,
         bot_id: int,
@@ -1,10 +1,12 @@
 # Users
+from datetime import datetime, timezone
 from typing import Sequence, Any, Coroutine, Optional
 
 from sqlalchemy import update, exists, select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models.alchemy_helper import dialect_insert
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
@@ -86,6 +88,36 @@ async def create_user(
         await session.rollback()
         return None
 
+
+async def insert_user_if_absent(
+    session: AsyncSession,
+    user_create: UserCreate,
+) -> Optional[bool]:
+    """
+    Создать пользователя, если его ещё нет: INSERT ... ON CONFLICT(user_id) DO NOTHING RETURNING.
+
+    Один запрос без предварительной проверки; одновременные /start одного пользователя
+    создают ровно одну строку.
+
+    :return: True — строка создана, False — пользователь уже был, None — ошибка
+    """
+    table = User.__table__
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    stmt = (
+        dialect_insert(session, table)
+        .values(**user_create.model_dump(), created_at=now, updated_at=now)
+        .on_conflict_do_nothing(index_elements=[table.c.user_id])
+        .returning(table.c.id)
+    )
+    try:
+        result = await session.execute(stmt)
+        created = result.scalar_one_or_none() is not None
+        await session.commit()
+        return created
+    except SQLAlchemyError:
+        await session.rollback()
+        return None
+
 #----------------------------------------#----------------------------------------
 # Методы `update`
 # Обновление пользователей
@@ -140,7 +172,8 @@ async def assign_bot_to_user(
     Устанавливает связь между пользователем и ботом, обновляя поле bot_id
     """
     try:
-        stmt = update(User).where(User.user_id == user_id).values(bot_id=bot_id)
+        # users.bot_id — TEXT: asyncpg, в отличие от SQLite, не приводит int к строке сам
+        stmt = update(User).where(User.user_id == user_id).values(bot_id=str(bot_id))
         result = await session.execute(stmt)
         await session.commit()
         return result.rowcount > 0
@@ -1,11 +1,20 @@
-from typing import Sequence, Optional, Any
+import logging
+from datetime import datetime, timezone
+from itertools import batched
+from typing import Sequence, Optional, Any, Iterable
 
-from sqlalchemy import select, update, exists
+from sqlalchemy import select, update, exists, or_, text, literal, table, column
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models.alchemy_helper import dialect_insert, supports_copy, copy_records
 from app.models.coefficient import Coefficient
-from app.schemas.coefficient import CoefficientCreate, CoefficientUpdate
+from app.schemas.coefficient import CoefficientCreate, CoefficientUpdate, CoefficientRead
+from config.config import settings
+
+# Postgres: снимок сначала заливается COPY во временную таблицу, затем одним INSERT … SELECT … ON CONFLICT
+STAGE_TABLE = "coefficients_stage"
+STAGE_COLUMNS = ("warehouse_id", "box_type_id", "coefficient", "date", "modified")
 
 
 # ---------------------------------------------------------------------------
@@ -47,6 +56,81 @@ async def get_coefficient_field(
     return res.scalar_one_or_none()
 
 
+# ---------------------------------------------------------------------------
+# UPSERT
+# ---------------------------------------------------------------------------
+def _on_conflict_update(stmt):
+    """ON CONFLICT по ключу снимка: обновлять только изменившиеся ячейки, возвращать изменённые строки."""
+    target = Coefficient.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=[target.c.warehouse_id, target.c.box_type_id, target.c.date],
+        set_={
+            "coefficient": stmt.excluded.coefficient,
+            "modified": stmt.excluded.modified,
+            "updated_at": stmt.excluded.updated_at,
+        },
+        where=or_(
+            target.c.coefficient != stmt.excluded.coefficient,
+            target.c.modified.is_distinct_from(stmt.excluded.modified),
+        ),
+    ).returning(*target.c)
+
+
+async def _upsert_via_copy(session: AsyncSession, rows: Sequence[CoefficientCreate], now: datetime):
+    """Postgres + asyncpg: COPY во временную таблицу и один INSERT … SELECT из неё."""
+    await session.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} ("
+        "warehouse_id integer, box_type_id integer, coefficient integer, date timestamp, modified timestamp"
+        ") ON COMMIT DELETE ROWS"
+    ))
+    await copy_records(session, STAGE_TABLE, STAGE_COLUMNS, (
+        (r.warehouse_id, r.box_type_id, r.coefficient, r.date, r.modified) for r in rows
+    ))
+    columns = Coefficient.__table__.c
+    stage = table(STAGE_TABLE, *(column(name, columns[name].type) for name in STAGE_COLUMNS))
+    source = select(*stage.c, literal(now, columns.created_at.type), literal(now, columns.updated_at.type))
+    stmt = dialect_insert(session, Coefficient.__table__).from_select([*STAGE_COLUMNS, "created_at", "updated_at"], source)
+    return await session.execute(_on_conflict_update(stmt))
+
+
+async def upsert_coefficients(
+    session: AsyncSession,
+    rows: Iterable[CoefficientCreate],
+    chunk_size: int = 500,
+    copy_threshold: int = settings.db.postgres.copy_threshold,
+) -> list[CoefficientRead] | None:
+    """
+    Загружает снимок коэффициентов одной транзакцией, ключ — (warehouse_id, box_type_id, date).
+
+    • новые ячейки вставляются;
+    • существующие обновляются, только если изменился `coefficient` или `modified`;
+    • неизменённые строки не перезаписываются (ON CONFLICT … DO UPDATE … WHERE);
+    • на Postgres (asyncpg) снимок от `copy_threshold` строк идёт через COPY во временную таблицу;
+    • возвращает только реально вставленные/изменённые строки (RETURNING), None при ошибке.
+    """
+    # В одном INSERT … ON CONFLICT ключ не может встречаться дважды — последняя строка снимка побеждает
+    unique = {(r.warehouse_id, r.box_type_id, r.date): r for r in rows}
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    changed: list[CoefficientRead] = []
+    try:
+        if supports_copy(session) and len(unique) >= copy_threshold:
+            res = await _upsert_via_copy(session, list(unique.values()), now)
+            changed.extend(CoefficientRead.model_validate(dict(row._mapping)) for row in res)
+        else:
+            stmt = _on_conflict_update(dialect_insert(session, Coefficient.__table__))
+            for chunk in batched(unique.values(), chunk_size):
+                params = [{**row.model_dump(), "created_at": now, "updated_at": now} for row in chunk]
+                res = await session.execute(stmt.values(params))
+                changed.extend(CoefficientRead.model_validate(dict(row._mapping)) for row in res)
+        await session.commit()
+        return changed
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logging.error(f"Ошибка при загрузке коэффициентов: {e}", exc_info=True)
+        return None
+
+
 #----------------------------------------#----------------------------------------
 # Проверки и методы помощники
 #----------------------------------------#----------------------------------------
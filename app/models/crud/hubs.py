@@ -61,6 +61,13 @@ async def get_warehouses_name_map(
     ]
 
 
+async def get_warehouse_directory(session: AsyncSession) -> Sequence[tuple[int, str | None]]:
+    """Все склады парами (warehouse_id, warehouse_name) в порядке `id` — для WarehouseDirectory."""
+    stmt = select(Warehouse.warehouse_id, Warehouse.warehouse_name).order_by(Warehouse.id)
+    res = await session.execute(stmt)
+    return res.tuples().all()
+
+
 async def count_warehouses(session: AsyncSession) -> int:
     """Возвращает общее количество складов."""
     stmt = select(func.count()).select_from(Warehouse)
@@ -1,52 +1,60 @@
 # Tasks
 import logging
-from typing import Sequence, Any, Optional
+from datetime import date, datetime, timezone
+from itertools import batched, chain
+from typing import Sequence, Any, Optional, Iterable
 
-from sqlalchemy import select, update, delete, exists, func, distinct, text
+from sqlalchemy import select, update, delete, exists, func, case, text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.task import Task
-from app.schemas.task import TaskCreate, TaskUpdate, TaskRead
+from app.models.alchemy_helper import copy_records, dialect_insert, supports_copy
+from app.models.task_range import TaskRange
+from app.models.warehouse import Warehouse
+from app.schemas.task import TaskRangeCreate, TaskRangeUpdate, TaskRangeRead
+from config.config import settings
+
+# Колонки task_ranges для COPY: значения по умолчанию ORM там не подставляются
+COPY_COLUMNS = ("user_id", "warehouse_id", "box_types", "coefficient", "date_from", "date_to",
+                "state", "alarm", "created_at", "updated_at")
+# Колонки, которые перезаписывает повторное создание задачи по тому же складу (UniqueConstraint user_id + warehouse_id)
+UPSERT_COLUMNS = ("box_types", "coefficient", "date_from", "date_to", "state", "alarm", "updated_at")
+
+
+def _utcnow() -> datetime:
+    """Текущее время UTC без tzinfo — как created_at/updated_at в Base (не зависит от часового пояса БД)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 # ---------------------------------------------------------------------------
 # GET
 # ---------------------------------------------------------------------------
-async def get_task(session: AsyncSession, task_id: int) -> Optional[Task]:
+async def get_task(session: AsyncSession, task_id: int) -> Optional[TaskRange]:
     """Вернуть задачу по её первичному `id`."""
-    stmt = select(Task).where(Task.id == task_id)
+    stmt = select(TaskRange).where(TaskRange.id == task_id)
     result = await session.scalars(stmt)
     return result.first()
 
 
-async def get_tasks_by_user(session: AsyncSession, user_id: int) -> Sequence[Task]:
+async def get_tasks_by_user(session: AsyncSession, user_id: int) -> Sequence[TaskRange]:
     """Все задачи, принадлежащие пользователю."""
-    stmt = select(Task).where(Task.user_id == user_id)
+    stmt = select(TaskRange).where(TaskRange.user_id == user_id)
     result = await session.scalars(stmt)
     return result.all()
 
 
-async def get_tasks_by_user_max_coef(
+async def get_tasks_by_user_with_limit(
     session: AsyncSession,
     user_id: int,
     limit: int | None = None,
     offset: int | None = None,
-) -> Sequence[Task]:
-    """Задачи с максимальным `coefficient` для каждой пары (warehouse, box_type)."""
-    subq = (
-        select(
-            Task.id,
-            func.rank().over(
-                partition_by=(Task.warehouse_id, Task.box_type_id),
-                order_by=Task.coefficient.desc(),
-            ).label("rnk"),
-        )
-        .where(Task.user_id == user_id)
-        .subquery()
+) -> Sequence[TaskRange]:
+    """Возвращает задачи пользователя постранично (одна задача = один склад)."""
+    stmt = (
+        select(TaskRange)
+        .where(TaskRange.user_id == user_id)
+        .order_by(TaskRange.created_at, TaskRange.id)
     )
-
-    stmt = select(Task).join(subq, Task.id == subq.c.id).where(subq.c.rnk == 1)
     if limit is not None:
         stmt = stmt.limit(limit)
     if offset is not None:
@@ -55,190 +63,125 @@ async def get_tasks_by_user_max_coef(
     result = await session.scalars(stmt)
     return result.all()
 
-async def get_tasks_by_user_with_limit(
-    session: AsyncSession,
-    user_id: int,
-    limit: int | None = None,
-    offset: int | None = None,
-) -> Sequence[Task]:
-    """Возвращает задачи только по 10 (или другим лимитом) уникальным складам,
-    и для каждой пары (warehouse_id, box_type_id) берёт запись с максимальным коэффициентом."""
-
-    # Шаг 1: Получаем уникальные warehouse_id с лимитом
-    wh_stmt = (
-        select(distinct(Task.warehouse_id))
-        .where(Task.user_id == user_id)
-        .order_by(Task.created_at)
-    )
-
-    if limit is not None:
-        wh_stmt = wh_stmt.limit(limit)
-    if offset is not None:
-        wh_stmt = wh_stmt.offset(offset)
-
-    result = await session.execute(wh_stmt)
-    warehouse_ids = [row[0] for row in result.all()]
-
-    if not warehouse_ids:
-        return []
-
-    # Шаг 2: Получаем задачи с максимальным коэффициентом для каждой (warehouse, box_type) из выбранных складов
-    subq = (
-        select(
-            Task.id,
-            func.rank().over(
-                partition_by=(Task.warehouse_id, Task.box_type_id),
-                order_by=Task.coefficient.desc()
-            ).label("rnk")
-        )
-        .where(
-            Task.user_id == user_id,
-            Task.warehouse_id.in_(warehouse_ids)
-        )
-        .subquery()
-    )
-
-    stmt = (
-        select(Task)
-        .join(subq, Task.id == subq.c.id)
-        .where(subq.c.rnk == 1)
-    )
 
+async def get_actual_tasks(session: AsyncSession, today: date) -> Sequence[TaskRange]:
+    """Все задачи, период которых ещё не закончился (для индекса TaskMatcher)."""
+    stmt = select(TaskRange).where(TaskRange.date_to >= today)
     result = await session.scalars(stmt)
     return result.all()
 
 
 async def get_unique_warehouses(session: AsyncSession, user_id: int) -> list[int]:
     """ID уникальных складов пользователя."""
-    stmt = select(distinct(Task.warehouse_id)).where(Task.user_id == user_id)
+    stmt = select(TaskRange.warehouse_id).where(TaskRange.user_id == user_id)
     rows = await session.execute(stmt)
     return [row[0] for row in rows.fetchall()]
 
-# ── Экспериментальные функции  ───────────────────────────────────────────
+
 async def get_tasks_unique_by_warehouse(
         session: AsyncSession,
         user_id: int,
         warehouse_ids: list[int] | None = None
-) -> Sequence[TaskRead]:
+) -> Sequence[TaskRangeRead]:
     """
-    Возвращает по одной задаче на каждый уникальный warehouse_id (или паре warehouse_id + user_id),
-    с максимальным коэффициентом. При наличии фильтра warehouse_ids — применяется он тоже.
+    Возвращает по одной задаче на каждый склад пользователя.
+    При наличии фильтра warehouse_ids — применяется он тоже.
 
     :param session: Асинхронная сессия базы данных.
     :param user_id: ID пользователя.
     :param warehouse_ids: Список ID складов (опционально).
-    :return: Список TaskRead.
+    :return: Список TaskRangeRead.
     """
-    filters = [Task.user_id == user_id]
+    filters = [TaskRange.user_id == user_id]
     if warehouse_ids:
-        filters.append(Task.warehouse_id.in_(warehouse_ids))
-
-    subq = (
-        select(
-            Task.id,
-            func.row_number().over(
-                partition_by=Task.warehouse_id,
-                order_by=Task.coefficient.desc()
-            ).label("rn")
-        )
-        .where(*filters)
-        .subquery()
-    )
-
-    stmt = (
-        select(Task)
-        .join(subq, Task.id == subq.c.id)
-        .where(subq.c.rn == 1)
-    )
+        filters.append(TaskRange.warehouse_id.in_(warehouse_ids))
 
+    stmt = select(TaskRange).where(*filters).order_by(TaskRange.id)
     result = await session.scalars(stmt)
-    tasks: Sequence[Task] = result.all() # Объявляем ORM модель объекта Task
-    return [TaskRead.model_validate(task) for task in tasks] # Превращаем из ORM в TaskRead
+    tasks: Sequence[TaskRange] = result.all() # Объявляем ORM модель объекта TaskRange
+    return [TaskRangeRead.model_validate(task) for task in tasks] # Превращаем из ORM в TaskRangeRead
 
 
-async def get_tasks_unique_by_warehouse_and_box_type(
-    session: AsyncSession,
-    user_id: int,
-    warehouse_ids: list[int] | None = None
-) -> Sequence[TaskRead]:
+async def get_tasks_by_user_and_wh(session: AsyncSession, user_id: int, warehouse_ids: list[int]) -> Sequence[TaskRangeRead]:
+    """Задачи пользователя по указанным складам."""
+    return await get_tasks_unique_by_warehouse(session, user_id, warehouse_ids)
+
+
+async def get_task_overview(
+        session: AsyncSession,
+        user_id: int,
+        limit: int | None = None,
+        offset: int = 0,
+        warehouse_ids: list[int] | None = None,
+) -> tuple[list[TaskRangeRead], list[dict[str, int | str]], int]:
     """
-    Возвращает по одной задаче на каждую уникальную пару (warehouse_id, box_type_id)
-    у заданного пользователя, с наибольшим коэффициентом.
-    При наличии фильтра warehouse_ids — выводятся задачи только для этого склада.
+    Экран обзора задач одним запросом: задачи пользователя (по одной на склад),
+    имена их складов (JOIN `warehouses`) и общее количество (count(*) OVER ()).
+
+    :return: (задачи страницы, [{'id': …, 'name': …}], всего задач пользователя)
     """
-    filters = [Task.user_id == user_id]
+    filters = [TaskRange.user_id == user_id]
     if warehouse_ids:
-        filters.append(Task.warehouse_id.in_(warehouse_ids))
-
-    subq = (
-        select(
-            Task.id,
-            func.row_number().over(
-                partition_by=(Task.warehouse_id, Task.box_type_id),
-                order_by=Task.coefficient.desc()
-            ).label("rn")
-        )
-        .where(*filters)
-        .subquery()
-    )
+        filters.append(TaskRange.warehouse_id.in_(warehouse_ids))
 
     stmt = (
-        select(Task)
-        .join(subq, Task.id == subq.c.id)
-        .where(subq.c.rn == 1)
+        select(TaskRange, Warehouse.warehouse_name, func.count().over().label("total"))
+        .outerjoin(Warehouse, Warehouse.warehouse_id == TaskRange.warehouse_id)
+        .where(*filters)
+        .order_by(TaskRange.id)
+        .offset(offset)
     )
+    if limit:
+        stmt = stmt.limit(limit)
+    rows = (await session.execute(stmt)).all()
 
-    result = await session.scalars(stmt)
-    tasks: Sequence[Task] = result.all() # Объявляем ORM модель объекта Task
-    return [TaskRead.model_validate(task) for task in tasks] # Превращаем из ORM в TaskRead
-
-async def get_tasks_by_user_and_wh(session: AsyncSession, user_id: int, warehouse_ids: list[int]) -> Sequence[TaskRead]:
-    """Все задачи, принадлежащие пользователю."""
-    filters = [Task.user_id == user_id]
-    if warehouse_ids:
-        filters.append(Task.warehouse_id.in_(warehouse_ids))
+    if not rows:
+        # страница за пределами списка (устаревшая кнопка) — окно не вернуло ни одной строки
+        total = await count_uniq_tasks_by_whs(session, user_id) if offset else 0
+        return [], [], total
 
-    stmt = select(Task).where(*filters)
-    result = await session.scalars(stmt)
-    tasks: Sequence[Task] = result.all()  # Объявляем ORM модель объекта Task
-    return [TaskRead.model_validate(task) for task in tasks]  # Превращаем из ORM в TaskRead
-# ────────────────────────────────────────────────────────────────────────────
+    tasks = [TaskRangeRead.model_validate(task) for task, _, _ in rows]
+    names = [{"id": task.warehouse_id, "name": name} for task, name, _ in rows if name is not None]
+    return tasks, names, rows[0].total
 
 
 async def get_warehouses_with_alarm(session: AsyncSession, user_id: int) -> list[dict[str, int | bool]]:
     """
     Возвращает список складов пользователя с их флагом alarm.
-    Пример: [{'warehouse_id': 123, 'alarm': True}, ...]
+    Пример: [{'id': 123, 'alarm': 1}, ...]
     """
-    stmt = (
-        select(Task.warehouse_id, Task.alarm)
-        .where(Task.user_id == user_id)
-        .group_by(Task.warehouse_id, Task.alarm)  # группируем, если есть дубли
-    )
+    stmt = select(TaskRange.warehouse_id, TaskRange.alarm).where(TaskRange.user_id == user_id)
     rows = await session.execute(stmt)
     return [{"id": wid, "alarm": alarm} for wid, alarm in rows.fetchall()]
 
 async def count_uniq_tasks_by_whs(session: AsyncSession, user_id: int) -> int:
     """Количество уникальных складов у пользователя."""
-    stmt = select(func.count(distinct(Task.warehouse_id))).where(Task.user_id == user_id)
+    stmt = select(func.count()).select_from(TaskRange).where(TaskRange.user_id == user_id)
     result = await session.execute(stmt)
     return result.scalar_one()
 
 
 async def get_task_field(session: AsyncSession, task_id: int, field_name: str) -> Any | None:
     """Получить произвольное поле задачи. Возвращает `None`, если поля нет."""
-    if not hasattr(Task, field_name):
+    if not hasattr(TaskRange, field_name):
         return None
-    stmt = select(getattr(Task, field_name)).where(Task.id == task_id)
+    stmt = select(getattr(TaskRange, field_name)).where(TaskRange.id == task_id)
     row = await session.execute(stmt)
     return row.scalar_one_or_none()
 
 # ---------------------------------------------------------------------------
 # CREATE
 # ---------------------------------------------------------------------------
-async def create_task(session: AsyncSession, data: TaskCreate) -> Optional[Task]:
+def _task_row(data: TaskRangeCreate) -> dict[str, Any]:
+    """TaskRangeCreate → словарь колонок `task_ranges` (типы упаковки → маска)."""
+    row = data.model_dump(exclude={"box_type_ids"})
+    row["box_types"] = TaskRange.pack_box_types(data.box_type_ids)
+    return row
+
+
+async def create_task(session: AsyncSession, data: TaskRangeCreate) -> Optional[TaskRange]:
     """Создать новую задачу и вернуть её."""
-    task = Task(**data.model_dump())
+    task = TaskRange(**_task_row(data))
     session.add(task)
     try:
         await session.commit()
@@ -249,16 +192,89 @@ async def create_task(session: AsyncSession, data: TaskCreate) -> Optional[Task]
         logging.error(f"Ошибка при создании задачи: {e}", exc_info=True)
         return None
 
+
+async def create_tasks_bulk(
+        session: AsyncSession,
+        tasks: Iterable[TaskRangeCreate],
+        chunk_size: int = 1000,
+        copy_threshold: int = settings.db.postgres.copy_threshold,
+) -> int:
+    """
+    Массовая вставка задач одной транзакцией.
+
+    • `tasks` читается потоково (можно передать генератор) и режется на пачки
+      по `chunk_size` строк; каждая пачка уходит одним executemany-запросом;
+    • задача по складу, который у пользователя уже есть, не падает на UniqueConstraint,
+      а перезаписывает его строку (INSERT … ON CONFLICT DO UPDATE, см. UPSERT_COLUMNS);
+    • на Postgres (asyncpg), если строк не меньше `copy_threshold`, — COPY во временную
+      таблицу и оттуда тот же upsert одним запросом;
+    • commit выполняется один раз в конце — при любой ошибке откатывается всё;
+    • возвращает количество сохранённых строк на входе (созданных или перезаписанных), 0 при ошибке.
+    """
+    saved = 0
+    chunks = batched((_task_row(task) for task in tasks), chunk_size)
+    try:
+        # по первой пачке видно, наберётся ли строк на COPY, — остальное читается дальше потоком
+        first = next(chunks, ())
+        rows = (row for chunk in chain((first,), chunks) for row in chunk)
+        if supports_copy(session) and len(first) >= min(copy_threshold, chunk_size):
+            saved = await _copy_upsert_tasks(session, rows)
+        else:
+            stmt = dialect_insert(session, TaskRange)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[TaskRange.user_id, TaskRange.warehouse_id],
+                set_={c: stmt.excluded[c] for c in UPSERT_COLUMNS},
+            )
+            for chunk in batched(rows, chunk_size):
+                await session.execute(stmt, list(chunk))
+                saved += len(chunk)
+        await session.commit()
+        return saved
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logging.error(f"Ошибка при массовом создании задач (сохранено до ошибки: {saved}): {e}", exc_info=True)
+        return 0
+
+
+async def _copy_upsert_tasks(session: AsyncSession, rows: Iterable[dict[str, Any]]) -> int:
+    """
+    COPY не умеет ON CONFLICT: строки грузятся во временную таблицу, а в `task_ranges`
+    переносятся одним INSERT … SELECT … ON CONFLICT DO UPDATE; таблица удаляется сразу —
+    внутри единицы работы commit() CRUD фиксирует лишь SAVEPOINT, и ON COMMIT DROP
+    оставил бы её строки следующему вызову в той же транзакции.
+    Дубликаты (user_id, warehouse_id) схлопываются DISTINCT ON по порядку загрузки (`seq`):
+    как и в executemany, побеждает последняя строка.
+    """
+    table, tmp = TaskRange.__tablename__, f"tmp_{TaskRange.__tablename__}"
+    columns = ", ".join(COPY_COLUMNS)
+    now = _utcnow()
+    records = (
+        (*({**row, "created_at": now, "updated_at": now}[c] for c in COPY_COLUMNS), seq)
+        for seq, row in enumerate(rows)
+    )
+
+    await session.execute(text(f"CREATE TEMP TABLE {tmp} (LIKE {table} INCLUDING DEFAULTS, seq bigint)"))
+    loaded = await copy_records(session, tmp, (*COPY_COLUMNS, "seq"), records)
+    await session.execute(text(
+        f"INSERT INTO {table} ({columns}) "
+        f"SELECT DISTINCT ON (user_id, warehouse_id) {columns} FROM {tmp} "
+        f"ORDER BY user_id, warehouse_id, seq DESC "
+        f"ON CONFLICT (user_id, warehouse_id) DO UPDATE SET "
+        + ", ".join(f"{c} = EXCLUDED.{c}" for c in UPSERT_COLUMNS)
+    ))
+    await session.execute(text(f"DROP TABLE {tmp}"))
+    return loaded  # как executemany: строк на входе, включая дубликаты
+
 # ---------------------------------------------------------------------------
 # UPDATE
 # ---------------------------------------------------------------------------
-async def update_task(session: AsyncSession, task_id: int, data: TaskUpdate) -> Optional[Task]:
+async def update_task(session: AsyncSession, task_id: int, data: TaskRangeUpdate) -> Optional[TaskRange]:
     """Частичное обновление задачи."""
     stmt = (
-        update(Task)
-        .where(Task.id == task_id)
+        update(TaskRange)
+        .where(TaskRange.id == task_id)
         .values(data.model_dump(exclude_none=True))
-        .returning(Task)
+        .returning(TaskRange)
     )
     try:
         res = await session.execute(stmt)
@@ -276,12 +292,12 @@ async def update_task_field(
         value: Any
 ) -> bool:
     """Обновить одно поле задачи. Возвращает `True`, если запись затронута."""
-    if not hasattr(Task, field_name):
+    if not hasattr(TaskRange, field_name):
         return False
     stmt = (
-        update(Task)
-        .where(Task.id == task_id)
-        .values({field_name: value, "updated_at": func.current_timestamp()})
+        update(TaskRange)
+        .where(TaskRange.id == task_id)
+        .values({field_name: value, "updated_at": _utcnow()})
     )
     try:
         res = await session.execute(stmt)
@@ -292,31 +308,33 @@ async def update_task_field(
         return False
 
 
-async def toggle_alarm_state(session: AsyncSession, user_id: int, warehouse_id: int) -> int:
-    """Инвертировать `alarm` для всех задач пользователя на складе. Возвращает кол-во строк."""
-    stmt = text(
-        """
-        UPDATE tasks
-        SET alarm = CASE WHEN alarm = 1 THEN 0 ELSE 1 END,
-            updated_at = CURRENT_TIMESTAMP
-        WHERE user_id = :user_id AND warehouse_id = :warehouse_id
-        """
+async def toggle_alarm_state(session: AsyncSession, user_id: int, warehouse_id: int) -> Optional[int]:
+    """Инвертировать `alarm` задачи пользователя на складе. Возвращает новое значение (None — задачи нет)."""
+    stmt = (
+        update(TaskRange)
+        .where(TaskRange.user_id == user_id, TaskRange.warehouse_id == warehouse_id)
+        .values(
+            alarm=case((TaskRange.alarm == 1, 0), else_=1),
+            updated_at=_utcnow()
+        )
+        .returning(TaskRange.alarm)
     )
     try:
-        res = await session.execute(stmt, {"user_id": user_id, "warehouse_id": warehouse_id})
+        res = await session.execute(stmt)
+        alarm = res.scalar_one_or_none()
         await session.commit()
-        return res.rowcount
+        return alarm
     except SQLAlchemyError:
         await session.rollback()
-        return 0
+        return None
 
 
 async def set_alarm_state_all(session: AsyncSession, user_id: int, state: int) -> int:
     """Массовое обновление `alarm` для всех задач пользователя."""
     stmt = (
-        update(Task)
-        .where(Task.user_id == user_id)
-        .values(alarm=state, updated_at=func.current_timestamp())
+        update(TaskRange)
+        .where(TaskRange.user_id == user_id)
+        .values(alarm=state, updated_at=_utcnow())
     )
     try:
         res = await session.execute(stmt)
@@ -331,7 +349,7 @@ async def set_alarm_state_all(session: AsyncSession, user_id: int, state: int) -
 # ---------------------------------------------------------------------------
 async def delete_tasks_by_user(session: AsyncSession, user_id: int) -> int:
     """Удалить все задачи пользователя. Возвращает кол-во удалённых строк."""
-    stmt = delete(Task).where(Task.user_id == user_id)
+    stmt = delete(TaskRange).where(TaskRange.user_id == user_id)
     try:
         res = await session.execute(stmt)
         await session.commit()
@@ -343,7 +361,7 @@ async def delete_tasks_by_user(session: AsyncSession, user_id: int) -> int:
 
 async def delete_tasks_by_user_and_warehouse(session: AsyncSession, user_id: int, warehouse_id: int) -> int:
     """Удалить задачи пользователя по конкретному складу."""
-    stmt = delete(Task).where(Task.user_id == user_id, Task.warehouse_id == warehouse_id)
+    stmt = delete(TaskRange).where(TaskRange.user_id == user_id, TaskRange.warehouse_id == warehouse_id)
     try:
         res = await session.execute(stmt)
         await session.commit()
@@ -357,6 +375,6 @@ async def delete_tasks_by_user_and_warehouse(session: AsyncSession, user_id: int
 # ---------------------------------------------------------------------------
 async def task_exists(session: AsyncSession, task_id: int) -> bool:
     """Проверить, существует ли задача."""
-    stmt = select(exists().where(Task.id == task_id))
+    stmt = select(exists().where(TaskRange.id == task_id))
     res = await session.execute(stmt)
     return res.scalar()
@@ -0,0 +1,94 @@
+# FSM states
+import logging
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import select, delete, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.alchemy_helper import dialect_insert
+from app.models.fsm_state import FsmState
+
+
+#----------------------------------------#----------------------------------------
+# Методы `get`
+#----------------------------------------#----------------------------------------
+async def get_state_record(
+        session: AsyncSession,
+        key: str,
+        now: datetime,
+) -> Optional[FsmState]:
+    """Запись состояния по ключу; устаревшие (expires_at <= now) считаются отсутствующими."""
+    stmt = select(FsmState).where(
+        FsmState.key == key,
+        or_(FsmState.expires_at.is_(None), FsmState.expires_at > now),
+    )
+    result = await session.scalars(stmt)
+    return result.first()
+
+
+#----------------------------------------#----------------------------------------
+# Методы `save` / `delete`
+#----------------------------------------#----------------------------------------
+async def save_state_records(
+        session: AsyncSession,
+        upserts: dict[str, dict[str, Any]],
+        deletes: Iterable[str],
+        now: datetime,
+        expires_at: Optional[datetime],
+) -> bool:
+    """
+    Сохраняет накопленные изменения состояний одной транзакцией.
+
+    :param upserts: {key: {"state": …, "data": …}} — обновляются только переданные поля;
+                    если строки нет, недостающие поля вставляются пустыми
+    :param deletes: Ключи, состояние и данные которых очищены
+    :return: True при успехе, False при ошибке
+    """
+    table = FsmState.__table__
+    try:
+        for key, fields in upserts.items():
+            stmt = dialect_insert(session, table).values(
+                key=key,
+                state=fields.get("state"),
+                data=fields.get("data", {}),
+                expires_at=expires_at,
+                created_at=now,
+                updated_at=now,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={
+                    **{name: stmt.excluded[name] for name in fields},
+                    "expires_at": stmt.excluded.expires_at,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            await session.execute(stmt)
+
+        keys = list(deletes)
+        if keys:
+            await session.execute(delete(FsmState).where(FsmState.key.in_(keys)))
+
+        await session.commit()
+        return True
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logging.error(f"Ошибка при сохранении состояний FSM: {e}", exc_info=True)
+        return False
+
+
+async def delete_expired_states(
+        session: AsyncSession,
+        now: datetime,
+) -> int:
+    """Удаляет устаревшие записи состояний, возвращает их количество (0 при ошибке)."""
+    try:
+        result = await session.execute(delete(FsmState).where(FsmState.expires_at <= now))
+        await session.commit()
+        return result.rowcount
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logging.error(f"Ошибка при удалении устаревших состояний FSM: {e}", exc_info=True)
+        return 0
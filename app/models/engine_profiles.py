@@ -0,0 +1,171 @@
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.models.sql_instrumentation import InstrumentedQueuePool
+from config.config import DatabaseSettings
+
+
+@dataclass(slots=True)
+class EngineOptions:
+    """Настройки одного движка: аргументы create_async_engine и (для SQLite) что делать на соединении."""
+    kwargs: dict[str, Any]
+    pragmas: dict[str, Any] = field(default_factory=dict)  # SQLite: PRAGMA на каждое новое соединение
+    begin: str = "BEGIN"                                    # SQLite: чем открывается транзакция
+
+
+@dataclass(slots=True)
+class EngineProfile:
+    """
+    Профиль подключения, выбранный по диалекту URL.
+
+    `reader` — отдельный движок для чтения вне апдейтов; None — читатели работают через `writer`.
+    """
+    name: str
+    writer: EngineOptions
+    reader: Optional[EngineOptions] = None
+
+
+#----------------------------------------#----------------------------------------#
+def sqlite_profile(url: str, config: DatabaseSettings) -> EngineProfile:
+    """
+    SQLite пишет в файл одним писателем — держать 60 соединений, спорящих за блокировку, бессмысленно:
+
+    • writer — пул из одного соединения: записи процесса выстраиваются в очередь пула, а не
+      крутятся в busy-ожидании; транзакции BEGIN IMMEDIATE берут блокировку записи сразу,
+      поэтому чтение-потом-запись не падает с «database is locked» (SQLITE_BUSY_SNAPSHOT);
+    • reader — пул соединений с query_only: в WAL читатели не ждут писателя;
+    • WAL, synchronous, кэш, mmap, busy_timeout и temp_store — на каждом соединении.
+
+    Для базы в памяти читатели не выделяются: у каждого соединения была бы своя база.
+    """
+    sqlite = config.sqlite
+    pragmas = {
+        "busy_timeout": sqlite.busy_timeout_ms,
+        "synchronous": sqlite.synchronous,
+        "cache_size": -sqlite.cache_size_kib,  # отрицательное значение — в КиБ, а не в страницах
+        "mmap_size": sqlite.mmap_size,
+        "temp_store": sqlite.temp_store,
+    }
+    database = make_url(url).database or ""
+    if database in ("", ":memory:") or "mode=memory" in url:
+        return EngineProfile(
+            name="sqlite-memory",
+            writer=EngineOptions(kwargs=dict(poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0,
+                                             pool_timeout=sqlite.writer_timeout), pragmas=pragmas),
+        )
+
+    return EngineProfile(
+        name="sqlite-wal",
+        writer=EngineOptions(
+            kwargs=dict(poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=sqlite.writer_timeout),
+            pragmas={"journal_mode": "WAL", **pragmas},
+            begin="BEGIN IMMEDIATE",
+        ),
+        reader=EngineOptions(
+            kwargs=dict(poolclass=InstrumentedQueuePool, pool_size=sqlite.readers, max_overflow=0,
+                        pool_timeout=config.pool_timeout),
+            # journal_mode — и здесь: читатель может открыть новый файл раньше писателя
+            pragmas={"journal_mode": "WAL", **pragmas, "query_only": "ON"},
+        ),
+    )
+
+
+def postgres_profile(url: str, config: DatabaseSettings) -> EngineProfile:
+    """
+    Postgres: один пул (10 + 10 по умолчанию — на процесс бота; с несколькими воркерами следите
+    за max_connections), pre-ping и пересоздание старых соединений, серверные prepared statements.
+    """
+    postgres = config.postgres
+    driver = make_url(url).get_driver_name()
+    connect_args: dict[str, Any] = {}
+    server_settings = {"application_name": postgres.application_name, "jit": "on" if postgres.jit else "off"}
+    if driver == "asyncpg":
+        connect_args["prepared_statement_cache_size"] = postgres.statement_cache_size
+        if not postgres.statement_cache_size:  # PgBouncer: ещё и без кэша описаний типов
+            connect_args["statement_cache_size"] = 0
+        connect_args["command_timeout"] = postgres.command_timeout
+        connect_args["server_settings"] = server_settings
+    elif driver == "psycopg":
+        connect_args["prepare_threshold"] = postgres.prepare_threshold
+        connect_args["application_name"] = postgres.application_name
+        connect_args["options"] = f"-c jit={server_settings['jit']}"
+
+    return EngineProfile(
+        name=f"postgresql+{driver}",
+        writer=EngineOptions(kwargs=dict(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config.pool_size if config.pool_size is not None else 10,
+            max_overflow=config.max_overflow if config.max_overflow is not None else 10,
+            pool_timeout=config.pool_timeout,
+            pool_pre_ping=postgres.pool_pre_ping,
+            pool_recycle=postgres.pool_recycle,
+            connect_args=connect_args,
+        )),
+    )
+
+
+def default_profile(url: str, config: DatabaseSettings) -> EngineProfile:
+    return EngineProfile(
+        name=make_url(url).get_backend_name(),
+        writer=EngineOptions(kwargs=dict(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config.pool_size if config.pool_size is not None else 5,
+            max_overflow=config.max_overflow if config.max_overflow is not None else 10,
+            pool_timeout=config.pool_timeout,
+        )),
+    )
+
+
+def build_profile(url: str, config: DatabaseSettings) -> EngineProfile:
+    """Профиль по диалекту URL: sqlite+aiosqlite://… → sqlite_profile, postgresql+asyncpg://… → postgres_profile."""
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return sqlite_profile(url, config)
+    if backend == "postgresql":
+        return postgres_profile(url, config)
+    return default_profile(url, config)
+
+
+def replica_options(url: str, config: DatabaseSettings) -> EngineOptions:
+    """
+    Движок реплики — только чтение: SQLite — как пул читателей (query_only), Postgres — пул основного
+    профиля с транзакциями READ ONLY (случайная запись упадёт и на реплике, которая сейчас primary).
+    """
+    profile = build_profile(url, config)
+    if profile.reader is not None:
+        return profile.reader
+    if make_url(url).get_backend_name() == "postgresql":
+        kwargs = {**profile.writer.kwargs, "execution_options": {"postgresql_readonly": True}}
+        return EngineOptions(kwargs=kwargs)
+    return EngineOptions(kwargs=profile.writer.kwargs, pragmas={**profile.writer.pragmas, "query_only": "ON"})
+
+
+def create_engine_from(url: str, options: EngineOptions, **kwargs: Any) -> AsyncEngine:
+    """create_async_engine с параметрами профиля; для SQLite — PRAGMA и явный BEGIN на соединениях."""
+    engine = create_async_engine(url=url, **options.kwargs, **kwargs)
+    if engine.dialect.name != "sqlite":
+        return engine
+
+    statements = [f"PRAGMA {name}={value}" for name, value in options.pragmas.items()]
+
+    def on_connect(dbapi_connection, connection_record) -> None:
+        # pysqlite сам открывает транзакцию только перед DML и не видит SAVEPOINT:
+        # RELEASE тогда фиксирует всё сразу. Управляем BEGIN явно, как в документации SQLAlchemy
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    def on_begin(conn) -> None:
+        conn.exec_driver_sql(options.begin)
+
+    event.listen(engine.sync_engine, "connect", on_connect)
+    event.listen(engine.sync_engine, "begin", on_begin)
+    return engine
@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import String, DateTime, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base  # Base уже содержит id, created_at, updated_at
+
+
+class FsmState(Base):
+    """
+    Состояние FSM одного ключа (бот, чат, пользователь, …) — общее для всех процессов бота.
+    Строка с пустым состоянием и пустыми данными не хранится — она удаляется.
+    """
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(String(255), unique=True, comment="Ключ StorageKey: fsm:bot:chat:user:destiny")
+    state: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, comment="Текущее состояние")
+    data: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict, comment="Данные состояния (JSON)")
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True, comment="Когда запись устаревает (TTL)")
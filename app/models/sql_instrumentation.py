@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import re
+import sys
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+import greenlet
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.commons.utils.metrics import Histogram, metrics
+
+# Корзины для SQL и ожидания пула мельче, чем у обработчиков: от 0.1 мс
+SQL_BUCKETS: tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+# Сколько разных отпечатков запросов держать; остальные копятся в OTHER_FINGERPRINT
+MAX_FINGERPRINTS = 500
+OTHER_FINGERPRINT = "<other>"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):\w+")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+_SPACES = re.compile(r"\s+")
+
+# Запросы EXPLAIN самого инструментария не учитываются
+_explaining: ContextVar[bool] = ContextVar("sql_explaining", default=False)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    Нормализованный вид запроса: литералы и параметры → ?, списки IN (?, ?, …) и
+    многострочные VALUES → (...), пробелы схлопнуты.
+
+    SELECT … WHERE id IN (?, ?, ?)  и  … IN (?, ?)  дают один отпечаток.
+    """
+    text = _STRING.sub("?", statement)
+    text = _PARAM.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _LIST.sub("(...)", text)
+    text = _ROWS.sub(r"\1", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def find_caller() -> str:
+    """
+    Ближайшая функция приложения, из которой пришёл запрос (предпочтительно CRUD).
+
+    Асинхронный SQLAlchemy выполняет курсор в дочернем greenlet, поэтому стек
+    обработчика ищется и в родительском greenlet.
+    """
+    fallback = "?"
+    frames = [sys._getframe(1)]
+    parent = greenlet.getcurrent().parent
+    if parent is not None and parent.gr_frame is not None:
+        frames.append(parent.gr_frame)
+    for frame in frames:
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith("app.models.crud."):
+                return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+            if fallback == "?" and module.startswith("app.") and not module.startswith("app.models."):
+                fallback = f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+            frame = frame.f_back
+    return fallback
+
+
+@dataclass(slots=True)
+class StatementStats:
+    """Накопленные данные по одному отпечатку запроса."""
+    latency: Histogram = field(default_factory=lambda: Histogram(SQL_BUCKETS))
+    rows: int = 0
+    slow: int = 0
+    max: float = 0.0
+    caller: str = "?"          # функция, где отпечаток встретился впервые
+    explained_at: Optional[float] = None  # когда последний раз снимали EXPLAIN
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который замеряет ожидание выдачи соединения (checkout wait)."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait = Histogram(SQL_BUCKETS)
+        self.timeouts = 0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait.observe(time.perf_counter() - started)
+
+    def saturation(self) -> float:
+        """Доля занятых соединений от предела pool_size + max_overflow."""
+        limit = self.size() + max(self._max_overflow, 0)
+        return self.checkedout() / limit if limit else 0.0
+
+
+#----------------------------------------#----------------------------------------#
+class SQLInstrumentation:
+    """
+    Инструментирование движка через before/after_cursor_execute:
+
+    • время, число строк и вызывающая CRUD-функция по каждому отпечатку запроса;
+    • медленные запросы (дольше `slow_query_ms`) — WARNING в лог и, не чаще раза в
+      `explain_interval` сек на отпечаток, EXPLAIN плана отдельным соединением того движка,
+      где шёл запрос; для основного движка — `explain_engine`, если задан (SQLite: пул
+      читателей — EXPLAIN не занимает единственное пишущее соединение и блокировку записи);
+    • ожидание выдачи соединения из пула и насыщение пула (если пул — InstrumentedQueuePool).
+    • время запроса засчитывается текущему обработчику (metrics.observe_db, bot_handler_db_seconds).
+
+    Дополнительные движки (например, пул читателей SQLite) подключаются через `attach`.
+
+    Данные отдаются текстом Prometheus (`prometheus_lines`) и таблицей (`top`).
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        slow_query_ms: float = 200.0,
+        explain_interval: float = 600.0,
+        explain_engine: Optional[AsyncEngine] = None,
+    ) -> None:
+        self.engine = engine
+        self.slow_query = slow_query_ms / 1000
+        self.explain_interval = explain_interval
+        self.statements: dict[str, StatementStats] = {}
+        self.pools: dict[str, InstrumentedQueuePool] = {}
+        # движок запроса (sync Engine из conn.engine) → движок, на котором снимать его EXPLAIN
+        self._explain_engines: dict[Engine, AsyncEngine] = {}
+        self._explain_tasks: set[asyncio.Task] = set()
+        self.attach(engine, pool_name="main", explain_engine=explain_engine)
+
+    def attach(self, engine: AsyncEngine, pool_name: str, explain_engine: Optional[AsyncEngine] = None) -> None:
+        """
+        Учитывает запросы ещё одного движка; его пул попадает в метрики с меткой pool=`pool_name`.
+        EXPLAIN его медленных запросов — на `explain_engine` (по умолчанию на нём же).
+        """
+        sync_engine = engine.sync_engine
+        self._explain_engines[sync_engine] = explain_engine or engine
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            self.pools[pool_name] = engine.pool
+
+    # ── события ──────────────────────────────────────────────────────────────
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("sql_started", []).append((context, time.perf_counter()))
+
+    @staticmethod
+    def _handle_error(error) -> None:
+        # упавший запрос не дойдёт до after_cursor_execute — снимаем его отметку сами
+        # (только если она есть: ошибка могла случиться и до before_cursor_execute)
+        started = error.connection.info.get("sql_started") if error.connection is not None else None
+        if started and started[-1][0] is error.execution_context:
+            started.pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.get("sql_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()[1]
+        if _explaining.get():
+            return
+        # время в БД текущего обработчика (MetricsMiddleware) — из того же замера
+        metrics.observe_db(elapsed)
+
+        key = fingerprint(statement)
+        stats = self.statements.get(key)
+        if stats is None:
+            if len(self.statements) >= MAX_FINGERPRINTS:
+                key = OTHER_FINGERPRINT
+                stats = self.statements.setdefault(key, StatementStats())
+            else:
+                stats = self.statements[key] = StatementStats(caller=find_caller())
+
+        # асинхронные адаптеры выбирают строки сразу после execute и держат их в _rows
+        rows = getattr(cursor, "_rows", None)
+        count = len(rows) if rows is not None else max(cursor.rowcount, 0)
+        stats.latency.observe(elapsed)
+        stats.rows += count
+        stats.max = max(stats.max, elapsed)
+
+        if elapsed >= self.slow_query:
+            stats.slow += 1
+            logging.warning(
+                f"Медленный запрос {elapsed * 1000:.0f} мс ({find_caller()}, строк: {count}): {key[:300]}"
+            )
+            self._maybe_explain(stats, conn.engine, statement, parameters)
+
+    def _maybe_explain(self, stats: StatementStats, engine: Engine, statement: str, parameters: Any) -> None:
+        now = time.monotonic()
+        if not self.explain_interval:
+            return
+        if stats.explained_at is not None and now - stats.explained_at < self.explain_interval:
+            return
+        if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        stats.explained_at = now
+        task = loop.create_task(self._explain(self._explain_engines.get(engine, self.engine), statement, parameters))
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    @staticmethod
+    async def _explain(engine: AsyncEngine, statement: str, parameters: Any) -> None:
+        prefix = "EXPLAIN QUERY PLAN" if engine.dialect.name == "sqlite" else "EXPLAIN"
+        _explaining.set(True)  # контекст задачи — свой, на запросы апдейтов не влияет
+        try:
+            async with engine.connect() as conn:
+                result = await conn.exec_driver_sql(f"{prefix} {statement}", parameters)
+                plan = "\n".join(" | ".join(str(value) for value in row) for row in result)
+            logging.warning(f"План медленного запроса {fingerprint(statement)[:200]}:\n{plan}")
+        except Exception as e:
+            logging.error(f"Не удалось получить EXPLAIN: {e}")
+
+    # ── вывод ────────────────────────────────────────────────────────────────
+    @property
+    def pool(self) -> Optional[InstrumentedQueuePool]:
+        return self.pools.get("main")
+
+    def pool_status(self, name: str = "main") -> dict[str, float]:
+        pool = self.pools.get(name)
+        if pool is None:
+            return {}
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "saturation": round(pool.saturation(), 3),
+            "wait_p50_ms": round(pool.wait.quantile(0.5) * 1000, 2),
+            "wait_p99_ms": round(pool.wait.quantile(0.99) * 1000, 2),
+            "timeouts": pool.timeouts,
+        }
+
+    def top(self, limit: int = 10) -> list[tuple[str, str, int, float, float, int]]:
+        """Самые «дорогие» отпечатки по суммарному времени: (запрос, вызов, раз, сумма мс, p95 мс, строк)."""
+        ranked = sorted(self.statements.items(), key=lambda item: -item[1].latency.sum)[:limit]
+        return [
+            (key, stats.caller, stats.latency.count, stats.latency.sum * 1000,
+             stats.latency.quantile(0.95) * 1000, stats.rows)
+            for key, stats in ranked
+        ]
+
+    def prometheus_lines(self) -> Iterable[str]:
+        name = "db_statement_duration_seconds"
+        yield f"# HELP {name} Время SQL-запросов по отпечаткам"
+        yield f"# TYPE {name} histogram"
+        labels: dict[str, str] = {}
+        for key, stats in self.statements.items():
+            query = key[:120].replace("\\", "\\\\").replace('"', '\\"')
+            labels[key] = f'query="{query}",caller="{stats.caller}"'
+            yield from stats.latency.prometheus(name, labels[key])
+        yield "# HELP db_statement_rows_total Строк возвращено/изменено"
+        yield "# TYPE db_statement_rows_total counter"
+        for key, stats in self.statements.items():
+            yield f"db_statement_rows_total{{{labels[key]}}} {stats.rows}"
+        yield "# HELP db_slow_statements_total Медленные запросы"
+        yield "# TYPE db_slow_statements_total counter"
+        for key, stats in self.statements.items():
+            yield f"db_slow_statements_total{{{labels[key]}}} {stats.slow}"
+
+        if not self.pools:
+            return
+        yield "# TYPE db_pool_checkout_wait_seconds histogram"
+        for name, pool in self.pools.items():
+            yield from pool.wait.prometheus("db_pool_checkout_wait_seconds", f'pool="{name}"')
+        yield "# TYPE db_pool_checked_out gauge"
+        yield from (f'db_pool_checked_out{{pool="{name}"}} {pool.checkedout()}' for name, pool in self.pools.items())
+        yield "# TYPE db_pool_saturation gauge"
+        yield from (f'db_pool_saturation{{pool="{name}"}} {pool.saturation():.3f}' for name, pool in self.pools.items())
+        yield "# TYPE db_pool_timeouts_total counter"
+        yield from (f'db_pool_timeouts_total{{pool="{name}"}} {pool.timeouts}' for name, pool in self.pools.items())
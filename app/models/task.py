@@ -1,7 +1,7 @@
 from typing import Optional
 from datetime import datetime
 
-from sqlalchemy import String, Integer, DateTime, ForeignKey
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -9,6 +9,12 @@ from .base import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # фильтр по пользователю (+ склад, тип упаковки), ранжирование по коэффициенту
+        Index("ix_tasks_user_wh_box_coef", "user_id", "warehouse_id", "box_type_id", "coefficient"),
+        # поиск задач под пришедший коэффициент: склад + тип упаковки + дата
+        Index("ix_tasks_wh_box_date", "warehouse_id", "box_type_id", "date"),
+    )
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), comment="ID пользователя")
     warehouse_id: Mapped[Optional[int]] = mapped_column(ForeignKey("warehouses.warehouse_id"), nullable=True, comment="ID склада")
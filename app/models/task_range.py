@@ -0,0 +1,49 @@
+from typing import Optional, Iterable
+from datetime import date
+
+from sqlalchemy import String, Integer, Date, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class TaskRange(Base):
+    """
+    Компактная задача: одна строка на пару (пользователь, склад).
+
+    Заменяет «развёрнутые» строки `tasks` (по строке на каждый коэффициент 0..max,
+    тип упаковки и день периода) — хранит только то, что реально выбрал пользователь.
+    """
+    __tablename__ = "task_ranges"
+    __table_args__ = (
+        UniqueConstraint("user_id", "warehouse_id"),  # он же индекс по user_id (+ warehouse_id)
+        # загрузка TaskMatcher и подбор задач под коэффициенты склада за дату
+        Index("ix_task_ranges_wh_dates", "warehouse_id", "date_from", "date_to"),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), comment="ID пользователя")
+    warehouse_id: Mapped[int] = mapped_column(ForeignKey("warehouses.warehouse_id"), comment="ID склада")
+    box_types: Mapped[int] = mapped_column(Integer, comment="Битовая маска типов упаковки (бит = ID типа)")
+    coefficient: Mapped[int] = mapped_column(Integer, comment="Максимальный допустимый коэффициент")
+    date_from: Mapped[date] = mapped_column(Date, comment="Начало периода поиска")
+    date_to: Mapped[date] = mapped_column(Date, comment="Конец периода поиска (включительно)")
+    state: Mapped[str] = mapped_column(String(50), default="new", comment="Состояние задачи")
+    alarm: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, default=1, comment="Флаг оповещения")
+
+    @property
+    def box_type_ids(self) -> list[int]:
+        """ID типов упаковки, распакованные из маски: 0b1100100 → [2, 5, 6]."""
+        return self.unpack_box_types(self.box_types)
+
+    @staticmethod
+    def pack_box_types(box_type_ids: Iterable[int]) -> int:
+        """[2, 5, 6] → 0b1100100"""
+        mask = 0
+        for box_type_id in box_type_ids:
+            mask |= 1 << box_type_id
+        return mask
+
+    @staticmethod
+    def unpack_box_types(mask: int) -> list[int]:
+        """0b1100100 → [2, 5, 6]"""
+        return [i for i in range(mask.bit_length()) if mask >> i & 1]
@@ -15,4 +15,4 @@ class User(Base):
     phone: Mapped[Optional[str]] = mapped_column(String(20), nullable=True, comment="Телефон")
     activity: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, default="start", comment="Последняя активность")
     bot_id: Mapped[Optional[str]] = mapped_column(Text, nullable=True, comment="ID cозданного пользователем бота")
-    bot_status: Mapped[int] = mapped_column(Integer, default="0", comment="Статус взаимодействия с ботом")
+    bot_status: Mapped[int] = mapped_column(Integer, default=0, comment="Статус взаимодействия с ботом")
@@ -0,0 +1,264 @@
+import asyncio
+import contextvars
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.commons.utils.metrics import Histogram, metrics
+from app.models.alchemy_helper import (
+    CommitHook, DatabaseHelper, UnitOfWork, current_uow, db_helper, pending_commit_hooks, query_log, run_commit_hooks
+)
+from app.models.sql_instrumentation import SQL_BUCKETS
+from config.config import settings, WriteQueueSettings
+
+T = TypeVar("T")
+
+# Задание записи: получает сессию (внутри SAVEPOINT общей транзакции пачки) и возвращает результат
+WriteJob = Callable[[AsyncSession], Awaitable[T]]
+
+BATCH_BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Сессия задания, которое сейчас выполняет писатель (вложенный submit идёт в неё же)
+_job_session: ContextVar[Optional[AsyncSession]] = ContextVar("write_job_session", default=None)
+
+
+@dataclass(slots=True)
+class _Job:
+    func: WriteJob
+    future: asyncio.Future
+    queued: float = field(default_factory=time.perf_counter)
+    hooks: list[CommitHook] = field(default_factory=list)  # db_helper.on_commit внутри задания
+    exclusive: bool = False  # транзакция апдейта: идёт отдельной пачкой, пока апдейт не завершится
+    queries: Optional[list[str]] = None  # SQL писателя засчитывается сюда (uow.queries апдейта)
+
+
+class _UpdateRolledBack(Exception):
+    """Апдейт завершился с ошибкой — задание его транзакции откатывается."""
+
+
+#----------------------------------------#----------------------------------------#
+class WriteQueue:
+    """
+    Очередь записи для SQLite: один писатель на процесс, групповой коммит.
+
+    Обработчики отдают задания через `submit(job)`; корутина-писатель забирает всё, что
+    накопилось (до `max_batch`), и выполняет пачку одной транзакцией на пишущем соединении.
+    Каждое задание — в своём SAVEPOINT: ошибка одного откатывает только его. После COMMIT
+    каждый вызывающий получает свой результат (например, rowcount) или своё исключение;
+    если не удался сам COMMIT — исключение получают все задания пачки.
+    Хуки `db_helper.on_commit` задания выполняются после COMMIT пачки и до того, как
+    вызывающий получит результат; при откате задания или пачки — отбрасываются.
+
+    Чтения через очередь не идут и остаются конкурентными (read_session_getter).
+
+    Если очередь выключена (Postgres — несколько писателей сервер выдерживает сам), `submit`
+    выполняет задание сразу в `db_helper.session_getter()` — вызывающему коду всё равно.
+
+    Внутри апдейта (UnitOfWork) вся его запись — одно задание (`open_update`): оно встаёт в
+    очередь при первой записи апдейта, отдаёт ему свою сессию (SAVEPOINT на пишущем соединении)
+    и завершается из UnitOfWork.finish — RELEASE и COMMIT, либо откат, если обработчик упал.
+    Последующие записи и чтения апдейта идут в этой сессии и видят его изменения, сервисы сразу
+    получают свои результаты. Цена: пока апдейт не завершился (включая его вызовы Bot API),
+    писатель занят только им — такое задание идёт отдельной пачкой, без группового коммита.
+    """
+
+    def __init__(self, helper: DatabaseHelper, config: WriteQueueSettings) -> None:
+        self.helper = helper
+        self.enabled = config.enabled if config.enabled is not None else helper.engine.dialect.name == "sqlite"
+        self.max_batch = config.max_batch
+        self.linger = config.linger_ms / 1000
+        self.batch_size = Histogram(BATCH_BUCKETS)
+        self.wait = Histogram(SQL_BUCKETS)  # от submit до результата
+        self.failed_commits = 0
+        self._queue: Optional[asyncio.Queue[Optional[_Job]]] = None
+        self._writer: Optional[asyncio.Task] = None
+        if self.enabled:
+            helper.update_session_source = self.open_update
+
+    async def submit(self, job: WriteJob[T]) -> T:
+        """
+        Выполняет задание записи и возвращает его результат после фиксации транзакции.
+        Внутри апдейта — в его транзакции (результат сразу, фиксация — в конце апдейта).
+        """
+        if (session := _job_session.get()) is not None:
+            return await job(session)
+        if not self.enabled or current_uow.get() is not None:
+            async with self.helper.session_getter() as session:
+                return await job(session)
+
+        self._ensure_writer()
+        queued = _Job(job, asyncio.get_running_loop().create_future())
+        self._queue.put_nowait(queued)
+        try:
+            return await queued.future
+        finally:
+            # SQL писателя идёт в его контексте — обработчику засчитываем ожидание результата
+            metrics.observe_db(time.perf_counter() - queued.queued)
+
+    async def open_update(self, uow: UnitOfWork) -> AsyncSession:
+        """
+        Транзакция апдейта — одно задание очереди. Возвращает сессию задания, как только писатель
+        до него дойдёт; `uow.release(success)` завершает задание и ждёт COMMIT (или отката).
+        """
+        self._ensure_writer()
+        loop = asyncio.get_running_loop()
+        opened: asyncio.Future[AsyncSession] = loop.create_future()
+        outcome: asyncio.Future[bool] = loop.create_future()
+
+        async def hold(session: AsyncSession) -> None:
+            if outcome.done():  # апдейт отменён, не дождавшись писателя
+                raise _UpdateRolledBack()
+            # CRUD апдейта коммитит SAVEPOINT своей сессии — поэтому у апдейта отдельная сессия,
+            # вложенная в SAVEPOINT задания: откат задания откатывает апдейт целиком
+            conn = await session.connection()
+            update_session = self.helper.session_factory(bind=conn, join_transaction_mode="create_savepoint")
+            try:
+                opened.set_result(update_session)
+                if not await outcome:
+                    raise _UpdateRolledBack()
+                await update_session.commit()
+            finally:
+                await update_session.close()
+
+        queued = _Job(hold, loop.create_future(), exclusive=True, queries=uow.queries)
+        self._queue.put_nowait(queued)
+
+        async def release(success: bool) -> None:
+            started = time.perf_counter()
+            if not outcome.done():
+                outcome.set_result(success)
+            try:
+                await queued.future
+            except _UpdateRolledBack:
+                pass
+            finally:
+                metrics.observe_db(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait((opened, queued.future), return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            outcome.set_result(False)  # апдейт отменён, не дождавшись писателя
+            raise
+        finally:
+            metrics.observe_db(time.perf_counter() - started)
+        if not opened.done():
+            outcome.set_result(False)
+            queued.future.result()  # писатель не смог начать транзакцию — ошибка апдейту
+        uow.release = release
+        return opened.result()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def stop(self) -> None:
+        """Дописывает принятые задания и останавливает писателя."""
+        if self._writer is None:
+            return
+        self._queue.put_nowait(None)
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+        self._queue = None
+
+    # ── писатель ─────────────────────────────────────────────────────────────
+    def _ensure_writer(self) -> None:
+        if self._writer is None or self._writer.done():
+            self._queue = self._queue or asyncio.Queue()
+            # Пустой контекст: задача не должна унаследовать UnitOfWork апдейта, который её создал
+            self._writer = asyncio.create_task(self._run(), name="write-queue", context=contextvars.Context())
+
+    async def _run(self) -> None:
+        stopping = False
+        carry: Optional[_Job] = None  # транзакция апдейта, встреченная при сборе пачки, — следующей пачкой
+        while not stopping:
+            first, carry = carry or await self._queue.get(), None
+            if first is None:
+                break
+            batch = [first]
+            if not first.exclusive:
+                if self.linger:
+                    await asyncio.sleep(self.linger)
+                # всё, что пришло, пока шёл прошлый коммит, — в ту же транзакцию
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    job = self._queue.get_nowait()
+                    if job is None:
+                        stopping = True
+                        break
+                    if job.exclusive:
+                        carry = job
+                        break
+                    batch.append(job)
+            await self._commit(batch)
+
+    async def _commit(self, batch: list[_Job]) -> None:
+        batch = [job for job in batch if not job.future.done()]  # вызывающий мог отменить ожидание
+        if not batch:
+            return
+        outcomes: list[tuple[_Job, Any, Optional[BaseException]]] = []
+        # BEGIN/COMMIT пачки из одного задания — апдейту-заказчику
+        log_token = query_log.set(batch[0].queries if len(batch) == 1 else None)
+        try:
+            async with self.helper.engine.connect() as conn:
+                async with conn.begin():
+                    for job in batch:
+                        outcomes.append((job, *await self._execute(conn, job)))
+        except Exception as e:
+            self.failed_commits += 1
+            logging.error(f"Очередь записи: не удалось зафиксировать пачку из {len(batch)}: {e}", exc_info=True)
+            outcomes = [(job, None, e) for job in batch]
+        finally:
+            query_log.reset(log_token)
+
+        self.batch_size.observe(len(batch))
+        now = time.perf_counter()
+        for job, result, error in outcomes:
+            if not job.exclusive:  # транзакция апдейта длится, сколько длится обработчик
+                self.wait.observe(now - job.queued)
+            if error is None:
+                run_commit_hooks(job.hooks)
+            if job.future.done():
+                continue
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+    async def _execute(self, conn, job: _Job) -> tuple[Any, Optional[BaseException]]:
+        session = self.helper.session_factory(bind=conn, join_transaction_mode="create_savepoint")
+        token = _job_session.set(session)
+        hooks_token = pending_commit_hooks.set(job.hooks)
+        log_token = query_log.set(job.queries)
+        try:
+            result = await job.func(session)
+            await session.commit()
+            return result, None
+        except Exception as e:
+            await session.rollback()
+            job.hooks.clear()
+            return None, e
+        finally:
+            query_log.reset(log_token)
+            pending_commit_hooks.reset(hooks_token)
+            _job_session.reset(token)
+            await session.close()
+
+    # ── вывод ────────────────────────────────────────────────────────────────
+    def prometheus_lines(self) -> Iterable[str]:
+        yield "# HELP db_write_queue_batch_size Заданий в одной транзакции очереди записи"
+        yield "# TYPE db_write_queue_batch_size histogram"
+        yield from self.batch_size.prometheus("db_write_queue_batch_size", 'queue="main"')
+        yield "# HELP db_write_queue_wait_seconds От submit до результата"
+        yield "# TYPE db_write_queue_wait_seconds histogram"
+        yield from self.wait.prometheus("db_write_queue_wait_seconds", 'queue="main"')
+        yield "# TYPE db_write_queue_depth gauge"
+        yield f'db_write_queue_depth{{queue="main"}} {self.depth}'
+        yield "# TYPE db_write_queue_failed_commits_total counter"
+        yield f'db_write_queue_failed_commits_total{{queue="main"}} {self.failed_commits}'
+
+
+write_queue = WriteQueue(db_helper, settings.db.write_queue)
@@ -1,11 +1,13 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 import logging
 
 from app.commons.responses.alarm import TaskAlarmResponse
-from app.commons.utils.template_callback import parse_cq, template_callback
+from app.commons.utils.template_callback import template_callback
+from app.keyboards.inline.callbacks import AlarmAll, AlarmSettings, AlarmToggle, AlarmWarehouses
 from app.keyboards.inline.general import InlineKeyboardHandler
+from app.schemas.typed_dict import LangType
 
 router = Router()
 inline = InlineKeyboardHandler()
@@ -15,10 +17,9 @@ controller = TaskAlarmResponse(inline_handler=inline)
 #----------------------------------------#----------------------------------------
 # Обработчик кнопки "Настройка уведомлений".
 #----------------------------------------#----------------------------------------
-@router.callback_query(F.data.startswith('alarm_setting'))
-async def alarm_setting(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
-    response = await controller.setup_notifications(callback_query, user_lang, data)
+@router.callback_query(AlarmSettings.filter())
+async def alarm_setting(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: AlarmSettings):
+    response = await controller.setup_notifications(callback_query, lang, callback_data)
 
     await template_callback(callback_query, state, inline,
         responses=response
@@ -27,39 +28,36 @@ async def alarm_setting(callback_query: CallbackQuery, state: FSMContext):
 #----------------------------------------#----------------------------------------
 # Обработчик кнопки "Уведомление по складам" и вкл/откл уведомления о складе.
 #----------------------------------------#----------------------------------------
-@router.callback_query(F.data.startswith('alarm_edit'))
-async def alarm_edit(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
+@router.callback_query(AlarmWarehouses.filter())
+async def alarm_edit(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: AlarmWarehouses):
     response = await controller.view_all_warehouses(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(callback_query, state, inline,
         responses=response
     )
 
-@router.callback_query(F.data.startswith('toggle_alarm_'))
-async def toggle_alarm(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
+@router.callback_query(AlarmToggle.filter())
+async def toggle_alarm(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: AlarmToggle):
     response = await controller.toggle_alarm_for_wh(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(callback_query, state, inline,
         responses=response
     )
 
-@router.callback_query(F.data.startswith('alarm_all_'))
-async def alarm_all(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
+@router.callback_query(AlarmAll.filter())
+async def alarm_all(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: AlarmAll):
     response = await controller.toggle_alarm_for_wh(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(callback_query, state, inline,
@@ -1,18 +1,20 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 import logging
 
 from app.commons.responses.general import GeneralResponse
-from app.keyboards.inline.general import InlineKeyboardHandler
+from app.keyboards.inline.callback_codec import StaleCallback
+from app.keyboards.inline.callbacks import MainMenu, Noop
+from app.keyboards.inline.general import keyboard_registry
+from app.schemas.typed_dict import LangType
 
 router = Router()
 controller = GeneralResponse()
-inline = InlineKeyboardHandler()
 
 #----------------------------------------#----------------------------------------
-@router.callback_query(F.data == 'main')
-async def main(callback_query: CallbackQuery, state: FSMContext): #  -> None | dict - убрал, нет вызова return, который что-то бы возвращал
+@router.callback_query(MainMenu.filter())
+async def main(callback_query: CallbackQuery, state: FSMContext, lang: LangType): #  -> None | dict - убрал, нет вызова return, который что-то бы возвращал
     """
     Обработчик кнопки "Главное меню".
 
@@ -47,10 +49,24 @@ async def main(callback_query: CallbackQuery, state: FSMContext): #  -> None | d
     """
     await state.clear()
     try:
-        user_lang = callback_query.from_user.language_code or "unknown"
-        response = await controller.start_command_response(callback_query.from_user.id, callback_query.from_user.username, user_lang)
+        response = await controller.start_command_response(callback_query.from_user.id, callback_query.from_user.username, lang)
 
-        await callback_query.message.edit_text(response.text, reply_markup=inline.get_keyboard(response.kb))
+        await callback_query.message.edit_text(response.text, reply_markup=keyboard_registry.resolve(response.kb))
     except Exception as e:
         logging.error("message:" + str(e), exc_info=True)
-#----------------------------------------#----------------------------------------
\ No newline at end of file
+#----------------------------------------#----------------------------------------
+
+#----------------------------------------#----------------------------------------
+# Кнопка-надпись (заголовок календаря, пустая ячейка): только снимаем «часики»
+#----------------------------------------#----------------------------------------
+@router.callback_query(Noop.filter())
+async def noop(callback_query: CallbackQuery):
+    await callback_query.answer()
+
+
+#----------------------------------------#----------------------------------------
+# Кнопка из сообщения, отправленного до смены формата callback_data
+#----------------------------------------#----------------------------------------
+@router.callback_query(StaleCallback())
+async def stale_callback(callback_query: CallbackQuery, lang: LangType):
+    await callback_query.answer(lang['callback_outdated'], show_alert=True)
@@ -1,11 +1,14 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 import logging
 
 from app.commons.responses.task import TaskResponse
-from app.commons.utils.template_callback import parse_cq, template_callback
+from app.commons.utils.template_callback import template_callback
+from app.enums.general import TaskFlow
+from app.keyboards.inline.callbacks import BoxPick, CoefPick, CreateTask, DatePick, TaskSave, WarehousePick
 from app.keyboards.inline.general import InlineKeyboardHandler
+from app.schemas.typed_dict import LangType
 
 router = Router()
 inline = InlineKeyboardHandler()
@@ -16,15 +19,14 @@ controller = TaskResponse(inline_handler=inline)
 # Обработчик кнопки "Создать задачу".
 # Перенести всю логику создания задачи в отдельный модуль
 #----------------------------------------#----------------------------------------
-@router.callback_query(F.data.startswith('create_task'))
-async def create_task_handler(callback_query: CallbackQuery, state: FSMContext):
+@router.callback_query(CreateTask.filter())
+async def create_task_handler(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: CreateTask):
     await state.clear()
-    data, user_lang = await parse_cq(callback_query)
 
     response = await controller.handle_create_task(
         callback_query,
-        user_lang,
-        data
+        lang,
+        callback_data
     )
 
     await template_callback(
@@ -33,8 +35,8 @@ async def create_task_handler(callback_query: CallbackQuery, state: FSMContext):
     )
 
 
-@router.callback_query(F.data.startswith('task_mode_'))
-async def task_mode(callback_query: CallbackQuery, state: FSMContext):
+@router.callback_query(WarehousePick.filter())
+async def task_mode(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: WarehousePick):
     """
     Обрабатывает выбор массовой или гибкой настройки задач.
 
@@ -49,12 +51,10 @@ async def task_mode(callback_query: CallbackQuery, state: FSMContext):
     Возвращаемые данные:
     - Обновляет текст сообщения с кнопками для выбора складов.
     """
-    data, user_lang = await parse_cq(callback_query)
-
     response = await controller.handle_task_mode(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(
@@ -63,14 +63,12 @@ async def task_mode(callback_query: CallbackQuery, state: FSMContext):
     )
 
 
-@router.callback_query(F.data.startswith('box_type_'))
-async def box_type(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
-
+@router.callback_query(BoxPick.filter(flow=TaskFlow.CREATE))
+async def box_type(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: BoxPick):
     response = await controller.handle_box_type(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(
@@ -79,14 +77,12 @@ async def box_type(callback_query: CallbackQuery, state: FSMContext):
     )
 
 
-@router.callback_query(F.data.startswith('coefs_'))
-async def coefs(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
-
+@router.callback_query(CoefPick.filter(flow=TaskFlow.CREATE))
+async def coefs(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: CoefPick):
     response = await controller.handle_coefs(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(
@@ -95,37 +91,15 @@ async def coefs(callback_query: CallbackQuery, state: FSMContext):
     )
 
 
-@router.callback_query(F.data.startswith('select_date_'))
-async def select_date(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
-
-    response = await controller.handle_date(
-        callback_query,
-        user_lang,
-        data,
-        state
-    )
-    await template_callback(
-        callback_query, state, inline,
-        responses=response
-    )
-
 #----------------------------------------#----------------------------------------
-# Обрабатывает нажатие на кнопку установки диапазона дат
+# Период поставки: готовый период, календарь, листание месяца, выбор дня, подтверждение
 #----------------------------------------#----------------------------------------
-@router.callback_query(
-    F.data.startswith(('select_diapason',
-                       'change_month_',
-                       'select_day_',
-                       'date_confirm'))
-)
-async def multi_handler(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
-
+@router.callback_query(DatePick.filter(flow=TaskFlow.CREATE))
+async def multi_handler(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: DatePick):
     response = await controller.handle_date(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(
@@ -133,14 +107,12 @@ async def multi_handler(callback_query: CallbackQuery, state: FSMContext):
         responses=response
     )
 
-@router.callback_query(F.data.startswith('task_save'))
-async def select_date(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
-
+@router.callback_query(TaskSave.filter())
+async def select_date(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: TaskSave):
     response = await controller.create_tasks_from_range(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(
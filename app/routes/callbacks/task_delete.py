@@ -1,11 +1,14 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 import logging
 
 from app.commons.responses.task import TaskResponse
-from app.commons.utils.template_callback import parse_cq, template_callback
+from app.commons.utils.template_callback import template_callback
+from app.enums.general import DeleteAction
+from app.keyboards.inline.callbacks import TaskDelete
 from app.keyboards.inline.general import InlineKeyboardHandler
+from app.schemas.typed_dict import LangType
 
 router = Router()
 inline = InlineKeyboardHandler()
@@ -14,8 +17,8 @@ controller = TaskResponse(inline_handler=inline)
 #----------------------------------------#----------------------------------------
 # Логика обновления типа короба
 #----------------------------------------#----------------------------------------
-@router.callback_query(F.data == "task_delete_confirm")
-async def delete_confirm_yes(callback_query: CallbackQuery, state: FSMContext):
+@router.callback_query(TaskDelete.filter(action=DeleteAction.ASK))
+async def delete_confirm_yes(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: TaskDelete):
     """
     Обработчик подтверждения удаления всех задач.
 
@@ -37,11 +40,10 @@ async def delete_confirm_yes(callback_query: CallbackQuery, state: FSMContext):
         - 'confirm_delete_tasks': текст сообщения с подтверждением.
         - 'update_warning': текст всплывающего уведомления.
     """
-    data, user_lang = await parse_cq(callback_query)
     response = await controller.delete_task(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(callback_query, state, inline,
@@ -50,13 +52,12 @@ async def delete_confirm_yes(callback_query: CallbackQuery, state: FSMContext):
 #----------------------------------------#----------------------------------------
 # Логика удаления задачи в списке "Редактирования задач"
 #----------------------------------------#----------------------------------------
-@router.callback_query(F.data.startswith('task_delete_'))
-async def edit_task_box(callback_query: CallbackQuery, state: FSMContext):
-    data, user_lang = await parse_cq(callback_query)
+@router.callback_query(TaskDelete.filter())
+async def edit_task_box(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: TaskDelete):
     response = await controller.delete_task(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(callback_query, state, inline,
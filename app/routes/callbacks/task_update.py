@@ -1,11 +1,15 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 import logging
 
 from app.commons.responses.edit import TaskEditResponse
-from app.commons.utils.template_callback import parse_cq, template_callback
+from app.commons.utils.template_callback import template_callback
+from app.enums.general import TaskFlow
+from app.keyboards.inline.callback_codec import CallbackFilter
+from app.keyboards.inline.callbacks import BoxPick, CoefPick, DatePick, TaskUpdate
 from app.keyboards.inline.general import InlineKeyboardHandler
+from app.schemas.typed_dict import LangType
 
 router = Router()
 inline = InlineKeyboardHandler()
@@ -14,13 +18,16 @@ controller = TaskEditResponse(inline_handler=inline)
 #----------------------------------------#----------------------------------------
 # Обработчик кнопки "✏️ Редактировать задачи".
 #----------------------------------------#----------------------------------------
-@router.callback_query(F.data.startswith('task_update'))
-async def task_update(callback_query: CallbackQuery, state: FSMContext): #  -> None | dict - убрал, нет вызова return, который что-то бы возвращал
-    data, user_lang = await parse_cq(callback_query)
+@router.callback_query(TaskUpdate.filter())
+@router.callback_query(CallbackFilter(BoxPick, CoefPick, DatePick, flow=TaskFlow.EDIT))
+async def task_update(
+    callback_query: CallbackQuery, state: FSMContext, lang: LangType,
+    callback_data: TaskUpdate | BoxPick | CoefPick | DatePick
+): #  -> None | dict - убрал, нет вызова return, который что-то бы возвращал
     response = await controller.handle_task_update(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
     await template_callback(callback_query, state, inline,
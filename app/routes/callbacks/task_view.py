@@ -1,11 +1,13 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 import logging
 
 from app.commons.responses.task import TaskResponse
-from app.commons.utils.template_callback import parse_cq, template_callback
+from app.commons.utils.template_callback import template_callback
+from app.keyboards.inline.callbacks import MyTasks
 from app.keyboards.inline.general import InlineKeyboardHandler
+from app.schemas.typed_dict import LangType
 
 router = Router()
 inline = InlineKeyboardHandler()
@@ -14,14 +16,13 @@ controller = TaskResponse(inline_handler=inline)
 #----------------------------------------#----------------------------------------
 # Обработчик кнопки "Настройка уведомлений".
 #----------------------------------------#----------------------------------------
-@router.callback_query(F.data.startswith('my_tasks'))
-async def my_tasks(callback_query: CallbackQuery, state: FSMContext):
+@router.callback_query(MyTasks.filter())
+async def my_tasks(callback_query: CallbackQuery, state: FSMContext, lang: LangType, callback_data: MyTasks):
     await state.clear()
-    data, user_lang = await parse_cq(callback_query)
     response = await controller.overview_task(
         callback_query,
-        user_lang,
-        data,
+        lang,
+        callback_data,
         state
     )
 
@@ -4,15 +4,15 @@ from aiogram.types import Message
 import logging
 
 from app.commons.responses.general import GeneralResponse
-from app.keyboards.inline.general import InlineKeyboardHandler
+from app.keyboards.inline.general import keyboard_registry
+from app.schemas.typed_dict import LangType
 
 router = Router()
 controller = GeneralResponse()
-inline = InlineKeyboardHandler()
 
 #----------------------------------------#----------------------------------------
 @router.message(Command('start'))
-async def start_command_handler(message: Message, command: CommandObject): #  -> None | dict - убрал, нет вызова return, который что-то бы возвращал
+async def start_command_handler(message: Message, command: CommandObject, lang: LangType): #  -> None | dict - убрал, нет вызова return, который что-то бы возвращал
     """
     Обработка команды /start с параметром и без.
 
@@ -20,10 +20,9 @@ async def start_command_handler(message: Message, command: CommandObject): #  ->
     :param command: Объект команды, содержащий дополнительные параметры.
     """
     try:
-        user_lang = message.from_user.language_code or "unknown"
-        response = await controller.start_command_response(message.from_user.id, message.from_user.username, user_lang)
+        response = await controller.start_command_response(message.from_user.id, message.from_user.username, lang)
 
-        await message.answer(response.text, reply_markup=inline.get_keyboard(response.kb))
+        await message.answer(response.text, reply_markup=keyboard_registry.resolve(response.kb))
     except Exception as e:
         logging.error("message:" + str(e), exc_info=True)
 #----------------------------------------#----------------------------------------
\ No newline at end of file
@@ -4,16 +4,13 @@ from typing import Optional
 from pydantic import BaseModel, Field
 
 
-# Схема для создания строки в таблице `coefficients`.
+# Схема для создания строки в таблице `coefficients` (снимок при загрузке коэффициентов).
 class CoefficientCreate(BaseModel):
-    # Неактивно, так как нельзя создать коэффициенты через бота
-
-    # warehouse_id: Optional[int] = None
-    # box_type_id: Optional[int] = None
-    # coefficient: int
-    # date: Optional[datetime] = None          # дата, к которой относится коэффициент
-    # modified: Optional[datetime] = None      # когда коэффициент был пересчитан / изменён
-    pass
+    warehouse_id: int
+    box_type_id: int
+    coefficient: int
+    date: datetime                           # дата, к которой относится коэффициент
+    modified: Optional[datetime] = None      # когда коэффициент был пересчитан / изменён
 
 # Схема для частичного обновления строки `coefficients`.
 class CoefficientUpdate(BaseModel):
@@ -5,7 +5,7 @@ from sqlalchemy import Sequence
 
 from app.enums.general import TaskMode
 from app.schemas.mixins.pagination import PaginationMixin
-from app.schemas.task import TaskRead
+from app.schemas.task import TaskRangeRead
 from app.schemas.warehouse import WarehouseRead
 
 
@@ -40,7 +40,7 @@ class ResponseWarehouses(PaginationMixin):
 
 
 class ResponseTasks(PaginationMixin):
-    tasks: list[TaskRead]
+    tasks: list[TaskRangeRead]
     warehouses_names_list: Optional[Union[list[dict[str, int | str]], list[WarehouseRead]]] = None
 
 class ResponseBoxTypes(BaseModel):
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, date
 
 from app.schemas.base_schema import BaseSchema
 
@@ -38,4 +38,47 @@ class TaskRead(BaseSchema):
     date: Optional[datetime] = None
     coef_modified: Optional[int] = None
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+
+#----------------------------------------#----------------------------------------
+# TaskRange – компактная задача (одна строка на склад)
+#----------------------------------------#----------------------------------------
+
+# Схема для создания задачи-диапазона
+class TaskRangeCreate(BaseModel):
+    user_id: int
+    warehouse_id: int
+    box_type_ids: list[int] = Field(min_length=1)
+    coefficient: int = Field(ge=0, le=20)
+    date_from: date
+    date_to: date
+    state: str = "new"
+    alarm: int = 1
+
+# Схема для частичного обновления задачи-диапазона
+class TaskRangeUpdate(BaseModel):
+    box_types: Optional[int] = None     # уже упакованная маска, см. TaskRange.pack_box_types
+    coefficient: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    state: Optional[str] = None
+    alarm: Optional[int] = None
+
+# Схема для возвращения задачи-диапазона
+class TaskRangeRead(BaseSchema):
+    id: int
+    user_id: int
+    warehouse_id: int
+    box_type_ids: list[int]
+    coefficient: int
+    date_from: date
+    date_to: date
+    state: str
+    alarm: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+    @property
+    def is_active(self) -> bool:
+        """Активна ли задача на сегодняшний день."""
+        return self.date_from <= date.today() <= self.date_to
@@ -1 +1,4 @@
-LangType = dict[str, str | dict[str, str] | dict[str, dict[str, str]]]
\ No newline at end of file
+from typing import Mapping
+
+# Языковой пакет: неизменяемый словарь из реестра локализации (см. language_loader)
+LangType = Mapping[str, str | Mapping[str, str] | Mapping[str, Mapping[str, str]]]
\ No newline at end of file
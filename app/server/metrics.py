@@ -0,0 +1,40 @@
+import logging
+from typing import Any, Optional
+
+from aiohttp import web
+
+from app.commons.utils.metrics import MetricsRegistry, metrics
+from config.config import settings, MetricsSettings
+
+
+class MetricsServer:
+    """
+    Локальный HTTP-эндпоинт метрик: GET /metrics — текст Prometheus.
+
+    По умолчанию слушает только 127.0.0.1 — наружу метрики не публикуются.
+        curl localhost:9100/metrics
+    """
+
+    def __init__(self, registry: MetricsRegistry = metrics, config: MetricsSettings = settings.metrics) -> None:
+        self.registry = registry
+        self.config = config
+        self._runner: Optional[web.AppRunner] = None
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        return app
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.config.host, self.config.port).start()
+        logging.info(f"📊 Метрики: http://{self.config.host}:{self.config.port}/metrics")
+
+    async def shutdown(self, *_: Any) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render_prometheus(), content_type="text/plain", charset="utf-8")
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from typing import Any, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+from config.config import settings, WebhookSettings
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик webhook: сразу отвечает 200 и обрабатывает апдейт в фоне.
+
+    Одновременно в обработке не больше `max_in_flight` апдейтов: когда лимит исчерпан,
+    ответ на новый запрос ждёт свободного слота — Telegram сам придержит следующие апдейты,
+    а процесс не накопит неограниченную очередь задач.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_in_flight: int, **kwargs: Any) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+        self.max_in_flight = max_in_flight
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._background_feed_update_tasks)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        await self._slots.acquire()
+        try:
+            update = await request.json(loads=bot.session.json_loads)
+        except Exception:
+            self._slots.release()
+            raise
+
+        task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._on_update_done)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    def _on_update_done(self, task: asyncio.Task) -> None:
+        self._background_feed_update_tasks.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception():
+            logging.error(f"Ошибка обработки апдейта из webhook: {task.exception()}", exc_info=task.exception())
+
+    async def drain(self, timeout: float) -> None:
+        """Ждёт завершения апдейтов в обработке; по таймауту отменяет оставшиеся."""
+        pending = set(self._background_feed_update_tasks)
+        if not pending:
+            return
+        logging.info(f"Webhook: ожидаем завершения {len(pending)} апдейтов…")
+        done, pending = await asyncio.wait(pending, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        # дожидаемся отмены: после drain() апдейты уже не пишут в очередь записи
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pending:
+            logging.warning(f"Webhook: отменено незавершённых апдейтов — {len(pending)}")
+
+    async def close(self) -> None:
+        # сессию бота закрывает shutdown() в main.py — последней: она нужна и после остановки сервера
+        pass
+
+
+#----------------------------------------#----------------------------------------#
+class WebhookServer:
+    """
+    aiohttp-сервер для режима webhook (BOT__USE_WEBHOOK=true).
+
+    • POST {path} — апдейты Telegram (проверяется X-Telegram-Bot-Api-Secret-Token, если задан);
+    • GET  {path}/health — проверка живости для балансировщика: {"in_flight": …};
+    • на старте регистрирует webhook на BOT__WEBHOOK_URL, если он задан (полный публичный URL);
+    • shutdown(): перестаёт принимать запросы, дожидается апдейтов в обработке
+      (не дольше `drain_timeout`) и останавливает сервер — подходит как shutdown_callback aiorun.
+
+    Локально можно проверить без Telegram — отправить записанный апдейт:
+        curl -X POST localhost:8080/webhook -H 'Content-Type: application/json' -d @update.json
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, config: WebhookSettings = settings.webhook) -> None:
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.config = config
+        secret = config.secret_token.get_secret_value() if config.secret_token else None
+        self.handler = BoundedRequestHandler(dispatcher, bot, config.max_in_flight, secret_token=secret)
+
+        self._runner: Optional[web.AppRunner] = None
+        self._stopped = asyncio.Event()
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        self.handler.register(app, path=self.config.path)
+        app.router.add_get(f"{self.config.path.rstrip('/')}/health", self._health)
+        return app
+
+    async def serve(self) -> None:
+        """Запускает сервер и ждёт вызова shutdown()."""
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.config.host, self.config.port).start()
+        logging.info(f"🌐 Webhook-сервер слушает {self.config.host}:{self.config.port}{self.config.path}")
+
+        if settings.bot.webhook_url:
+            await self.bot.set_webhook(
+                url=settings.bot.webhook_url,
+                secret_token=self.handler.secret_token,
+                allowed_updates=self.dispatcher.resolve_used_update_types(),
+                max_connections=self.config.max_in_flight,
+            )
+        await self._stopped.wait()
+
+    async def shutdown(self, *_: Any) -> None:
+        if self._runner is None or self._stopped.is_set():
+            return
+        logging.info("🛑 Остановка webhook-сервера…")
+        # сначала перестаём принимать соединения, потом дожидаемся уже принятых апдейтов
+        for site in list(self._runner.sites):
+            await site.stop()
+        await self.handler.drain(self.config.drain_timeout)
+        await self._runner.cleanup()
+        self._stopped.set()
+
+    async def _health(self, request: web.Request) -> web.Response:
+        return web.json_response({"in_flight": self.handler.in_flight, "max_in_flight": self.handler.max_in_flight})
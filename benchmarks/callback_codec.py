@@ -0,0 +1,124 @@
+"""
+Разбор callback_data: прежний путь (`split("_")` + safe_get / get_or_default / _parse_raw / int()
+в каждом обработчике) против кодека `unpack` (CallbackDataMiddleware, один раз на нажатие).
+
+Старые разборщики повторяют код обработчиков до перехода на типизированные кнопки.
+`unpack` замеряется дважды: первое нажатие кнопки (разбор строки, без кэша) и повторное
+(строка уже в lru_cache). В отчёте — ещё размер callback_data в байтах (лимит Telegram — 64).
+
+Запуск (из корня проекта, нужен .env с настройками):
+    python -m benchmarks.callback_codec --number 200000
+"""
+import argparse
+import timeit
+from datetime import date
+from typing import Any, Callable, Optional
+
+from tabulate import tabulate
+
+from app.commons.responses.extensions import BaseHandlerExtensions
+from app.enums.general import BoxType, DateAction, DeleteAction, TaskFlow, TaskMode, UpdateAction
+from app.keyboards.inline.callback_codec import Callback, unpack
+from app.keyboards.inline.callbacks import (
+    AlarmToggle, BoxPick, DatePick, MainMenu, TaskDelete, TaskUpdate, WarehousePick
+)
+
+safe_get = BaseHandlerExtensions.safe_get
+get_or_default = BaseHandlerExtensions.get_or_default
+
+
+#----------------------------------------#----------------------------------------#
+# Прежний путь: токены split("_") и разбор полей в обработчике
+def _parse_raw(raw: str | int) -> tuple[int, Optional[int], bool, bool]:
+    if isinstance(raw, str):
+        if raw.startswith("id"):
+            return 0, int(raw[2:]), True, False
+        if raw.startswith("confirm"):
+            return 0, None, False, True
+        return int(raw), None, False, False
+    return int(raw), None, False, False
+
+
+def legacy_main(data: str) -> Any:
+    return data == "main"
+
+
+def legacy_task_mode(data: str) -> Any:
+    tokens = data.split("_")
+    raw_mode = safe_get(tokens, 2)
+    mode = TaskMode(raw_mode) if raw_mode in TaskMode._value2member_map_ else TaskMode.MASS
+    return mode, *_parse_raw(safe_get(tokens, 3) or 0)
+
+
+def legacy_box_type(data: str) -> Any:
+    tokens = data.split("_")
+    action = safe_get(tokens, 2)
+    return action == "confirm", BoxType(action) if action in BoxType._value2member_map_ else None
+
+
+def legacy_select_day(data: str) -> Any:
+    tokens = data.split("_")
+    year, month, day = safe_get(tokens, 2), safe_get(tokens, 3), safe_get(tokens, 4)
+    return date(int(year), int(month), int(day))
+
+
+def legacy_task_update(data: str) -> Any:
+    tokens = data.split("_")
+    action = get_or_default(safe_get(tokens, 2), str, None)
+    wh_id = get_or_default(safe_get(tokens, 3), int, 0)
+    page = get_or_default(safe_get(tokens, 4), int, 0)
+    return action, wh_id, page
+
+
+def legacy_task_delete(data: str) -> Any:
+    tokens = data.split("_")
+    return safe_get(tokens, 2), get_or_default(safe_get(tokens, 3), int, 0), get_or_default(safe_get(tokens, 4), int, 0)
+
+
+def legacy_toggle_alarm(data: str) -> Any:
+    tokens = data.split("_")
+    return get_or_default(safe_get(tokens, 2), int, 0), get_or_default(safe_get(tokens, 3), int, 0)
+
+
+# (кнопка, прежняя callback_data, прежний разбор, новая кнопка)
+CASES: list[tuple[str, str, Callable[[str], Any], Callback]] = [
+    ("главное меню", "main", legacy_main, MainMenu()),
+    ("выбор склада", "task_mode_mass_id117986", legacy_task_mode,
+     WarehousePick(TaskMode.MASS, warehouse_id=117986)),
+    ("тип упаковки", "box_type_safe", legacy_box_type, BoxPick(box=BoxType.SAFE)),
+    ("день в календаре", "select_day_2026_10_18", legacy_select_day,
+     DatePick(TaskFlow.CREATE, DateAction.DAY, day=date(2026, 10, 18))),
+    ("склад в редактировании", "task_update_select_117986_2", legacy_task_update,
+     TaskUpdate(UpdateAction.SELECT, 117986, 2)),
+    ("удаление склада", "task_delete_one_117986_2", legacy_task_delete,
+     TaskDelete(DeleteAction.ONE, 117986, 2)),
+    ("уведомление по складу", "toggle_alarm_117986_2", legacy_toggle_alarm, AlarmToggle(117986, 2)),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200_000, help="Разборов в одном замере")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for name, legacy_data, legacy, button in CASES:
+        packed = button.pack()
+        assert unpack(packed) == button, packed
+        # лучший из повторов, в микросекундах на разбор
+        old = min(timeit.repeat(lambda: legacy(legacy_data), number=args.number, repeat=args.repeat)) / args.number * 1e6
+        cold = min(timeit.repeat(lambda: unpack.__wrapped__(packed), number=args.number, repeat=args.repeat)) / args.number * 1e6
+        warm = min(timeit.repeat(lambda: unpack(packed), number=args.number, repeat=args.repeat)) / args.number * 1e6
+        rows.append((
+            name, f"{old:.2f}", f"{cold:.2f}", f"{warm:.2f}", f"x{old / warm:.1f}",
+            f"{len(legacy_data.encode())} → {len(packed.encode())}", packed,
+        ))
+
+    print(tabulate(rows, headers=[
+        "кнопка", "split('_'), мкс", "unpack без кэша, мкс", "unpack из кэша, мкс", "ускорение", "байт", "callback_data"
+    ]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Бенчмарк CRUD-функций (`app/models/crud/slots.py`, `hubs.py`, `clients.py`) на засеянной базе.
+
+Засевает временную SQLite-базу — пользователи, склады, task_ranges и коэффициенты — в одном из
+масштабов, замеряет каждую функцию через AsyncSession (как в боте) и сохраняет результат
+JSON-базой. Команда compare сравнивает два JSON и отмечает регрессии больше порога.
+
+Запуск (из корня проекта, нужен .env с настройками):
+    python -m benchmarks.crud_suite run --scale 100k --out benchmarks/baselines/100k.json
+    python -m benchmarks.crud_suite run --scale 100k --out /tmp/current.json
+    python -m benchmarks.crud_suite compare benchmarks/baselines/100k.json /tmp/current.json --threshold 0.2
+
+compare завершается с кодом 1, если есть регрессии, — можно ставить в CI.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from itertools import batched
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import sqlalchemy
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from tabulate import tabulate
+
+from app.models.base import Base
+from app.models import coefficient, user, warehouse
+from app.models.crud import clients, hubs, slots
+from app.models.task_range import TaskRange
+from app.schemas.task import TaskRangeCreate, TaskRangeUpdate
+from app.schemas.user import UserCreate
+
+BOX_TYPES = (2, 5, 6)
+TODAY = date(2025, 7, 1)
+COEFFICIENT_DAYS = 14
+
+
+@dataclass(frozen=True)
+class Scale:
+    tasks: int
+    tasks_per_user: int
+    warehouses: int
+
+    @property
+    def users(self) -> int:
+        return self.tasks // self.tasks_per_user
+
+
+SCALES: dict[str, Scale] = {
+    "1k": Scale(tasks=1_000, tasks_per_user=5, warehouses=300),
+    "100k": Scale(tasks=100_000, tasks_per_user=5, warehouses=300),
+    "10m": Scale(tasks=10_000_000, tasks_per_user=5, warehouses=1_000),
+}
+
+
+#----------------------------------------#----------------------------------------#
+# Засев
+#----------------------------------------#----------------------------------------#
+def user_warehouses(user_id: int, scale: Scale) -> list[int]:
+    """Склады пользователя: детерминированно и без повторов (unique(user_id, warehouse_id))."""
+    return [(user_id * 7 + k * 13) % scale.warehouses + 1 for k in range(scale.tasks_per_user)]
+
+
+def seed_tables(conn: sqlalchemy.Connection, scale: Scale) -> None:
+    """Засевает таблицы на открытом соединении (для async-движков — через `conn.run_sync`)."""
+    rnd = random.Random(42)
+    now = datetime.now().replace(microsecond=0)
+    Base.metadata.create_all(conn, tables=[
+        user.User.__table__, warehouse.Warehouse.__table__,
+        TaskRange.__table__, coefficient.Coefficient.__table__,
+    ])
+
+    def task_rows():
+        for user_id in range(1, scale.users + 1):
+            for warehouse_id in user_warehouses(user_id, scale):
+                start = TODAY + timedelta(days=rnd.randrange(30))
+                yield dict(
+                    user_id=user_id, warehouse_id=warehouse_id,
+                    box_types=TaskRange.pack_box_types(rnd.sample(BOX_TYPES, 2)),
+                    coefficient=rnd.randrange(6), date_from=start, date_to=start + timedelta(days=rnd.randrange(1, 30)),
+                    state="new", alarm=rnd.randrange(2), created_at=now, updated_at=now,
+                )
+
+    conn.execute(warehouse.Warehouse.__table__.insert(), [
+        dict(warehouse_id=i, warehouse_name=f"Склад {i}", accepts_qr=0) for i in range(1, scale.warehouses + 1)
+    ])
+    for chunk in batched(range(1, scale.users + 1), 50_000):
+        conn.execute(user.User.__table__.insert(), [
+            dict(user_id=i, username=f"u{i}", bot_status=0, created_at=now, updated_at=now) for i in chunk
+        ])
+    for chunk in batched(task_rows(), 50_000):
+        conn.execute(TaskRange.__table__.insert(), list(chunk))
+    conn.execute(coefficient.Coefficient.__table__.insert(), [
+        dict(warehouse_id=wh, box_type_id=box, coefficient=rnd.randrange(-1, 20),
+             date=datetime.combine(TODAY + timedelta(days=day), datetime.min.time()), created_at=now, updated_at=now)
+        for wh in range(1, scale.warehouses + 1) for box in BOX_TYPES for day in range(COEFFICIENT_DAYS)
+    ])
+    conn.exec_driver_sql("ANALYZE")
+
+
+def seed(url: str, scale: Scale) -> None:
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        seed_tables(conn, scale)
+    engine.dispose()
+
+
+#----------------------------------------#----------------------------------------#
+# Сценарии замеров
+#----------------------------------------#----------------------------------------#
+Call = Callable[[AsyncSession, int], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    call: Call
+    repeat: int | None = None  # меньше повторов для тяжёлых выборок
+    in_uow: bool = False  # вызов — в единице работы: commit() в CRUD фиксирует лишь SAVEPOINT
+
+
+def build_cases(scale: Scale) -> list[Case]:
+    """
+    Аргумент `i` — номер повтора: читающие функции ходят по разным пользователям, пишущие
+    работают с отдельным диапазоном id (FRESH), чтобы не портить данные для остальных замеров.
+    """
+    rnd = random.Random(7)
+    users = scale.users
+    fresh = users + 1_000_000  # id пользователей, которых нет в засеве
+    uid = lambda i: rnd.randrange(1, users + 1)  # noqa: E731
+    tid = lambda i: rnd.randrange(1, scale.tasks + 1)  # noqa: E731
+    wid = lambda i: rnd.randrange(1, scale.warehouses + 1)  # noqa: E731
+
+    def new_task(i: int, user_id: int) -> TaskRangeCreate:
+        return TaskRangeCreate(user_id=user_id, warehouse_id=i % scale.warehouses + 1, box_type_ids=[2, 5],
+                               coefficient=3, date_from=TODAY, date_to=TODAY + timedelta(days=7))
+
+    def user_wh(i: int) -> tuple[int, int]:
+        user_id = uid(i)
+        return user_id, user_warehouses(user_id, scale)[0]
+
+    def user_whs(i: int) -> tuple[int, list[int]]:
+        user_id = uid(i)
+        return user_id, user_warehouses(user_id, scale)[:2]
+
+    return [
+        # ── slots ──
+        Case("slots.get_task", lambda s, i: slots.get_task(s, tid(i))),
+        Case("slots.get_tasks_by_user", lambda s, i: slots.get_tasks_by_user(s, uid(i))),
+        Case("slots.get_tasks_by_user_with_limit", lambda s, i: slots.get_tasks_by_user_with_limit(s, uid(i), 5, 0)),
+        Case("slots.get_actual_tasks", lambda s, i: slots.get_actual_tasks(s, TODAY + timedelta(days=25)), repeat=5),
+        Case("slots.get_unique_warehouses", lambda s, i: slots.get_unique_warehouses(s, uid(i))),
+        Case("slots.get_tasks_unique_by_warehouse", lambda s, i: slots.get_tasks_unique_by_warehouse(s, uid(i))),
+        Case("slots.get_tasks_by_user_and_wh", lambda s, i: slots.get_tasks_by_user_and_wh(s, *user_whs(i))),
+        Case("slots.get_task_overview", lambda s, i: slots.get_task_overview(s, uid(i), limit=5)),
+        Case("slots.get_warehouses_with_alarm", lambda s, i: slots.get_warehouses_with_alarm(s, uid(i))),
+        Case("slots.count_uniq_tasks_by_whs", lambda s, i: slots.count_uniq_tasks_by_whs(s, uid(i))),
+        Case("slots.get_task_field", lambda s, i: slots.get_task_field(s, tid(i), "coefficient")),
+        Case("slots.task_exists", lambda s, i: slots.task_exists(s, tid(i))),
+        Case("slots.create_task", lambda s, i: slots.create_task(s, new_task(i, fresh + i))),
+        Case("slots.create_tasks_bulk", lambda s, i: slots.create_tasks_bulk(
+            s, (new_task(k, fresh + 100_000 + i) for k in range(scale.tasks_per_user)))),
+        Case("slots.update_task", lambda s, i: slots.update_task(s, tid(i), TaskRangeUpdate(coefficient=i % 6))),
+        Case("slots.update_task_field", lambda s, i: slots.update_task_field(s, tid(i), "state", "new")),
+        Case("slots.toggle_alarm_state", lambda s, i: slots.toggle_alarm_state(s, *user_wh(i))),
+        Case("slots.set_alarm_state_all", lambda s, i: slots.set_alarm_state_all(s, uid(i), 1)),
+        Case("slots.delete_tasks_by_user_and_warehouse", lambda s, i: slots.delete_tasks_by_user_and_warehouse(
+            s, fresh + i, i % scale.warehouses + 1)),
+        Case("slots.delete_tasks_by_user", lambda s, i: slots.delete_tasks_by_user(s, fresh + 100_000 + i)),
+        # ── hubs ──
+        Case("hubs.get_warehouse", lambda s, i: hubs.get_warehouse(s, wid(i))),
+        Case("hubs.get_all_warehouses", lambda s, i: hubs.get_all_warehouses(s, 0, 100)),
+        Case("hubs.get_warehouses_by_ids", lambda s, i: hubs.get_warehouses_by_ids(s, [wid(i) for _ in range(10)])),
+        Case("hubs.get_warehouses_name_map", lambda s, i: hubs.get_warehouses_name_map(s, [wid(i) for _ in range(10)])),
+        Case("hubs.get_warehouse_directory", lambda s, i: hubs.get_warehouse_directory(s)),
+        Case("hubs.count_warehouses", lambda s, i: hubs.count_warehouses(s)),
+        Case("hubs.get_warehouse_field", lambda s, i: hubs.get_warehouse_field(s, wid(i), "warehouse_name")),
+        Case("hubs.warehouse_exists_by_id", lambda s, i: hubs.warehouse_exists_by_id(s, wid(i))),
+        # ── clients ──
+        Case("clients.get_user", lambda s, i: clients.get_user(s, uid(i))),
+        Case("clients.get_all_users", lambda s, i: clients.get_all_users(s, uid(i) % max(users - 100, 1), 100)),
+        Case("clients.get_user_by_id", lambda s, i: clients.get_user_by_id(s, uid(i))),
+        Case("clients.get_user_field_by_id", lambda s, i: clients.get_user_field_by_id(s, uid(i), "username")),
+        Case("clients.create_user", lambda s, i: clients.create_user(s, UserCreate(user_id=fresh + 200_000 + i))),
+        Case("clients.insert_user_if_absent", lambda s, i: clients.insert_user_if_absent(s, UserCreate(user_id=uid(i)))),
+        Case("clients.update_user_activity", lambda s, i: clients.update_user_activity(s, uid(i), "start")),
+        Case("clients.assign_bot_to_user", lambda s, i: clients.assign_bot_to_user(s, uid(i), 1)),
+        Case("clients.update_user_field", lambda s, i: clients.update_user_field(s, uid(i), "activity", "start")),
+        Case("clients.user_exists_by_id", lambda s, i: clients.user_exists_by_id(s, uid(i))),
+    ]
+
+
+# Функции, которые сознательно не замеряются
+SKIPPED: dict[str, str] = {
+    "clients.update_user": "UserUpdate не содержит user_id — вызов падает с AttributeError",
+}
+
+
+def check_coverage(cases: list[Case]) -> list[str]:
+    """Публичные async-функции CRUD-модулей без сценария (новая функция — допишите Case)."""
+    covered = {case.name for case in cases} | set(SKIPPED)
+    missing = []
+    for module in (slots, hubs, clients):
+        prefix = module.__name__.rsplit(".", 1)[-1]
+        for name, func in inspect.getmembers(module, inspect.iscoroutinefunction):
+            if func.__module__ == module.__name__ and not name.startswith("_") and f"{prefix}.{name}" not in covered:
+                missing.append(f"{prefix}.{name}")
+    return missing
+
+
+async def measure(url: str, cases: list[Case], repeat: int, warmup: int) -> dict[str, dict[str, float]]:
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    results: dict[str, dict[str, float]] = {}
+    try:
+        for case in cases:
+            runs = case.repeat or repeat
+            timings: list[float] = []
+            for i in range(warmup + runs):
+                async with session_factory() as session:
+                    started = time.perf_counter()
+                    await case.call(session, i)
+                    elapsed = (time.perf_counter() - started) * 1000
+                if i >= warmup:
+                    timings.append(elapsed)
+            timings.sort()
+            results[case.name] = {
+                "median_ms": round(statistics.median(timings), 4),
+                "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+                "min_ms": round(timings[0], 4),
+                "runs": runs,
+            }
+            print(f"  {case.name:<45} {results[case.name]['median_ms']:>10.3f} мс", file=sys.stderr)
+    finally:
+        await engine.dispose()
+    return results
+
+
+#----------------------------------------#----------------------------------------#
+# Команды
+#----------------------------------------#----------------------------------------#
+def cmd_run(args: argparse.Namespace) -> None:
+    scale = SCALES[args.scale]
+    cases = build_cases(scale)
+    if args.only:
+        cases = [case for case in cases if any(part in case.name for part in args.only)]
+    if missing := check_coverage(build_cases(scale)):
+        print(f"⚠️ Нет сценария для: {', '.join(missing)}", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "crud.db"
+        started = time.perf_counter()
+        seed(f"sqlite:///{path}", scale)
+        print(f"Засеяно {scale.tasks} задач, {scale.users} пользователей за {time.perf_counter() - started:.1f} с",
+              file=sys.stderr)
+        results = asyncio.run(measure(f"sqlite+aiosqlite:///{path}", cases, args.repeat, args.warmup))
+
+    report = {
+        "meta": {
+            "scale": args.scale,
+            **{f"rows_{name}": value for name, value in
+               (("tasks", scale.tasks), ("users", scale.users), ("warehouses", scale.warehouses))},
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.platform(),
+        },
+        "results": results,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(tabulate(
+        [(name, r["median_ms"], r["p95_ms"], r["runs"]) for name, r in results.items()],
+        headers=["функция", "медиана, мс", "p95, мс", "повторов"],
+    ))
+    print(f"\nСохранено: {args.out}")
+
+
+def cmd_compare(args: argparse.Namespace) -> None:
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    if baseline["meta"]["scale"] != current["meta"]["scale"]:
+        print(f"⚠️ Разные масштабы: {baseline['meta']['scale']} и {current['meta']['scale']}")
+
+    rows, regressions = [], 0
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if now is None:
+            rows.append((name, base["median_ms"], "-", "-", "нет в текущем"))
+            continue
+        # совсем быстрые запросы шумят — абсолютная разница меньше min_delta не считается
+        ratio = now["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+        delta = now["median_ms"] - base["median_ms"]
+        if ratio > 1 + args.threshold and delta > args.min_delta:
+            status, regressions = "❌ регрессия", regressions + 1
+        elif ratio < 1 - args.threshold and -delta > args.min_delta:
+            status = "✅ быстрее"
+        else:
+            status = ""
+        rows.append((name, base["median_ms"], now["median_ms"], f"x{ratio:.2f}", status))
+    rows += [(name, "-", r["median_ms"], "-", "новая") for name, r in current["results"].items()
+             if name not in baseline["results"]]
+
+    print(tabulate(rows, headers=["функция", "база, мс", "сейчас, мс", "отношение", ""]))
+    print(f"\nРегрессий (порог {args.threshold:.0%}): {regressions}")
+    sys.exit(1 if regressions else 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Засеять базу, замерить функции, сохранить JSON")
+    run.add_argument("--scale", choices=SCALES, default="100k")
+    run.add_argument("--out", type=Path, required=True)
+    run.add_argument("--repeat", type=int, default=50)
+    run.add_argument("--warmup", type=int, default=3)
+    run.add_argument("--only", nargs="*", help="Подстроки имён функций, например: overview limit")
+    run.set_defaults(func=cmd_run)
+
+    compare = commands.add_parser("compare", help="Сравнить два JSON и отметить регрессии")
+    compare.add_argument("baseline", type=Path)
+    compare.add_argument("current", type=Path)
+    compare.add_argument("--threshold", type=float, default=0.2, help="Допустимое замедление медианы (0.2 = 20%%)")
+    compare.add_argument("--min-delta", type=float, default=0.05, help="Игнорировать разницу меньше, мс")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
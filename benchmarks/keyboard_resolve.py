@@ -0,0 +1,77 @@
+"""
+Разрешение клавиатур: старый путь `resolve_kb` (строка → get_keyboard, regex + shlex + literal_eval)
+против реестра `keyboard_registry` (один поиск в словаре).
+
+Прежний разбор строк из приложения удалён; `legacy_get_keyboard` ниже — его копия как база сравнения.
+
+Запуск (из корня проекта, нужен .env с настройками):
+    python -m benchmarks.keyboard_resolve --number 100000
+"""
+import argparse
+import ast
+import re
+import shlex
+import timeit
+from typing import Any
+
+from tabulate import tabulate
+
+from app.keyboards.inline.general import InlineKeyboardHandler, keyboard_registry
+from app.keyboards.inline.registry import KeyboardCall
+
+_CALL_RE = re.compile(r"\s*(\w+)\s*\((.*)\)\s*")
+
+
+def legacy_get_keyboard(inline: InlineKeyboardHandler, call: str) -> Any:
+    """
+    Прежний InlineKeyboardHandler.get_keyboard: вызывает метод экземпляра по строке вида
+    ``"method_name(1, 'txt', True)"`` или возвращает атрибут ``"property_name"``.
+    """
+    match = _CALL_RE.fullmatch(call) if "(" in call and call.rstrip().endswith(")") else None
+    if match is None:
+        attr = getattr(inline, call)
+        return attr() if callable(attr) else attr
+
+    name, arg_str = match.groups()
+    args: list[Any] = []
+    if arg_str.strip():
+        lexer = shlex.shlex(arg_str, posix=True)
+        lexer.whitespace_split = True
+        lexer.whitespace = ","
+        args = [ast.literal_eval(token) for token in lexer]
+    return getattr(inline, name)(*args)
+
+
+# (название, старый путь, новый путь)
+CASES = [
+    ("готовая клавиатура",
+     lambda inline: legacy_get_keyboard(inline, "start_kb"),
+     lambda: keyboard_registry.resolve("start_kb")),
+    ("фабрика без аргументов",
+     lambda inline: legacy_get_keyboard(inline, "save_params"),
+     lambda: keyboard_registry.resolve("save_params")),
+    ("фабрика с аргументами",
+     lambda inline: legacy_get_keyboard(inline, "edit_task_warehouse(117986, 2)"),
+     lambda: keyboard_registry.resolve(KeyboardCall("edit_task_warehouse", (117986, 2)))),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000, help="Вызовов в одном замере")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    inline = InlineKeyboardHandler()
+    rows = []
+    for name, legacy, registry in CASES:
+        # лучший из повторов, в микросекундах на вызов
+        old = min(timeit.repeat(lambda: legacy(inline), number=args.number, repeat=args.repeat)) / args.number * 1e6
+        new = min(timeit.repeat(registry, number=args.number, repeat=args.repeat)) / args.number * 1e6
+        rows.append((name, f"{old:.2f}", f"{new:.2f}", f"x{old / new:.1f}"))
+
+    print(tabulate(rows, headers=["клавиатура", "get_keyboard, мкс", "реестр, мкс", "ускорение"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Нагрузочный стенд: полный сценарий создания задачи для тысяч виртуальных пользователей.
+
+Апдейты идут через `Dispatcher.feed_update` с теми же middleware и роутерами, что в бою
+(`main.build_dispatcher`). Bot API подменён сессией без сети, база — отдельный файл SQLite
+со складами (создаётся заново при каждом запуске).
+
+Сценарий одного пользователя:
+    /start → CreateTask → WarehousePick(mass) → WarehousePick(mass, склад) ×N → WarehousePick(mass, confirm)
+    → BoxPick(safe) → BoxPick(confirm) → CoefPick(3) → DatePick(calendar) → DatePick(day) ×2
+    → DatePick(confirm) → TaskSave
+
+Отчёт: апдейтов и сценариев в секунду, p50/p95/p99 латентности апдейта, SQL-запросов
+на апдейт, рост памяти процесса.
+
+Запуск (из корня проекта, нужен .env с BOT__TOKEN и YOOKASSA__*):
+    python -m benchmarks.load_flow --users 2000 --concurrency 200
+    python -m benchmarks.load_flow --users 500 --api-latency 30   # Bot API отвечает за 30 мс
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import logging
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncGenerator, Optional, get_args
+
+from tabulate import tabulate
+
+
+#----------------------------------------#----------------------------------------#
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="Виртуальных пользователей")
+    parser.add_argument("--concurrency", type=int, default=100, help="Пользователей одновременно в сценарии")
+    parser.add_argument("--warehouses", type=int, default=3, help="Складов в задаче одного пользователя")
+    parser.add_argument("--seed-warehouses", type=int, default=300, help="Складов в справочнике")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Задержка ответа Bot API, мс")
+    parser.add_argument("--db", type=Path, default=None, help="Файл SQLite (по умолчанию — временный)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Показать, где выросла память (медленнее)")
+    return parser.parse_args()
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса, МБ (Linux: /proc/self/statm)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+#----------------------------------------#----------------------------------------#
+def make_fake_session(api_latency: float):
+    from aiogram.client.session.base import BaseSession
+    from aiogram.types import Chat, Message
+
+    class FakeBotSession(BaseSession):
+        """Сессия Bot API без сети: считает вызовы и отвечает правдоподобным результатом."""
+
+        def __init__(self) -> None:
+            super().__init__()
+            self.calls: Counter[str] = Counter()
+            self.texts: Counter[str] = Counter()
+            self._message_ids = itertools.count(1)
+
+        async def make_request(self, bot, method, timeout: Optional[int] = None) -> Any:
+            self.calls[type(method).__name__] += 1
+            if text := getattr(method, "text", None):
+                self.texts[text] += 1
+            if api_latency:
+                await asyncio.sleep(api_latency / 1000)
+
+            returning = method.__returning__
+            if returning is bool or bool in get_args(returning):
+                return True
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=getattr(method, "chat_id", 0) or 0, type="private"),
+                text=getattr(method, "text", None),
+            )
+
+        async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+            yield b""
+
+        async def close(self) -> None:
+            pass
+
+    return FakeBotSession()
+
+
+class UpdateFactory:
+    """Апдейты Telegram от имени виртуальных пользователей."""
+
+    def __init__(self) -> None:
+        self._ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": "load", "username": f"load{user_id}", "language_code": "ru"}
+
+    def message(self, user_id: int, text: str):
+        from aiogram.types import Update
+        update_id = next(self._ids)
+        return Update.model_validate({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id, "date": 0, "text": text,
+                "chat": {"id": user_id, "type": "private"}, "from": self._user(user_id),
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+            },
+        })
+
+    def callback(self, user_id: int, data: str):
+        from aiogram.types import Update
+        update_id = next(self._ids)
+        return Update.model_validate({
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id), "chat_instance": "load", "data": data, "from": self._user(user_id),
+                "message": {
+                    "message_id": 1, "date": 0, "text": "…",
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": {"id": 1, "is_bot": True, "first_name": "bot"},
+                },
+            },
+        })
+
+
+def scenario(warehouse_ids: list[int]) -> list[str]:
+    """callback_data сценария создания задачи (после /start)."""
+    from app.enums.general import BoxType, DateAction, TaskFlow, TaskMode
+    from app.keyboards.inline.callbacks import BoxPick, CoefPick, CreateTask, DatePick, TaskSave, WarehousePick
+
+    first, last = date.today() + timedelta(days=1), date.today() + timedelta(days=3)
+    callbacks = [
+        CreateTask(),
+        WarehousePick(TaskMode.MASS),
+        *(WarehousePick(TaskMode.MASS, warehouse_id=wid) for wid in warehouse_ids),
+        WarehousePick(TaskMode.MASS, confirm=True),
+        BoxPick(box=BoxType.SAFE),
+        BoxPick(confirm=True),
+        CoefPick(coef=3),
+        DatePick(TaskFlow.CREATE, DateAction.CALENDAR),
+        DatePick(TaskFlow.CREATE, DateAction.DAY, day=first),
+        DatePick(TaskFlow.CREATE, DateAction.DAY, day=last),
+        DatePick(TaskFlow.CREATE, DateAction.CONFIRM),
+        TaskSave(),
+    ]
+    return [cb.pack() for cb in callbacks]
+
+
+#----------------------------------------#----------------------------------------#
+async def seed_database(warehouses: int) -> None:
+    from sqlalchemy import insert
+    from app.models.alchemy_helper import db_helper
+    from app.models.base import Base
+    from app.models import bot, coefficient, fsm_state, subscription, task, task_range, user, warehouse  # noqa
+
+    async with db_helper.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(warehouse.Warehouse), [
+            {"warehouse_id": 1000 + i, "warehouse_name": f"Склад {i}", "accepts_qr": 0} for i in range(warehouses)
+        ])
+
+
+async def run(args: argparse.Namespace) -> None:
+    from aiogram import Bot
+    from sqlalchemy import func, select
+    from app.commons.services.warehouses import warehouse_directory
+    from app.commons.utils.language_loader import localization_registry
+    from app.models.alchemy_helper import db_helper
+    from app.models.task_range import TaskRange
+    from main import build_dispatcher
+
+    await seed_database(args.seed_warehouses)
+    session = make_fake_session(args.api_latency)
+    bot = Bot(token="42:LOAD", session=session)
+    dp = await build_dispatcher(bot)
+    await warehouse_directory.load()
+
+    factory = UpdateFactory()
+    latencies: list[float] = []
+    failures = 0
+
+    async def feed(update) -> None:
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            failures += 1
+            logging.exception("Апдейт упал")
+        latencies.append(time.perf_counter() - started)
+
+    async def user_flow(user_id: int, slots: asyncio.Semaphore) -> None:
+        async with slots:
+            await feed(factory.message(user_id, "/start"))
+            picked = [1000 + (user_id * 7 + i) % args.seed_warehouses for i in range(args.warehouses)]
+            for data in scenario(picked):
+                await feed(factory.callback(user_id, data))
+
+    def statements_executed() -> int:
+        return sum(stats.latency.count for stats in db_helper.instrumentation.statements.values())
+
+    # прогрев: кэши клавиатур, компиляция запросов, пул соединений
+    warm = asyncio.Semaphore(args.concurrency)
+    await asyncio.gather(*(user_flow(10_000_000 + i, warm) for i in range(min(20, args.users))))
+    latencies.clear()
+
+    gc.collect()
+    if args.tracemalloc:
+        tracemalloc.start()
+        snapshot_before = tracemalloc.take_snapshot()
+    rss_before = rss_mb()
+    queries_before = statements_executed()
+
+    slots = asyncio.Semaphore(args.concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(user_flow(user_id, slots) for user_id in range(1, args.users + 1)))
+    elapsed = time.perf_counter() - started
+
+    queries = statements_executed() - queries_before
+    gc.collect()
+    rss_after = rss_mb()
+
+    async with db_helper.session_getter() as db:
+        created = await db.scalar(select(func.count()).select_from(TaskRange).where(TaskRange.user_id <= args.users))
+
+    lang = localization_registry.get("ru")
+    errors_shown = session.texts[lang["error_occurred"]]
+    updates = len(latencies)
+
+    print(tabulate([
+        ("пользователей / одновременно", f"{args.users} / {args.concurrency}"),
+        ("апдейтов", updates),
+        ("время, с", f"{elapsed:.2f}"),
+        ("апдейтов/с", f"{updates / elapsed:.0f}"),
+        ("сценариев/с", f"{args.users / elapsed:.1f}"),
+        ("латентность p50 / p95 / p99, мс",
+         " / ".join(f"{percentile(latencies, q) * 1000:.1f}" for q in (50, 95, 99))),
+        ("латентность max, мс", f"{max(latencies) * 1000:.1f}"),
+        ("SQL-запросов на апдейт", f"{queries / updates:.2f}"),
+        ("вызовов Bot API на апдейт", f"{sum(session.calls.values()) / updates:.2f}"),
+        ("RSS до / после, МБ", f"{rss_before:.1f} / {rss_after:.1f} (+{rss_after - rss_before:.1f})"),
+        ("задач создано / ожидалось", f"{created} / {args.users * args.warehouses}"),
+        ("исключений / ответов с ошибкой", f"{failures} / {errors_shown}"),
+    ], tablefmt="simple"))
+
+    if args.tracemalloc:
+        print("\nРост памяти по строкам кода:")
+        for stat in tracemalloc.take_snapshot().compare_to(snapshot_before, "lineno")[:10]:
+            print(f"  {stat}")
+
+    await db_helper.dispose()
+
+
+def main() -> None:
+    args = parse_args()
+    db_path = args.db or Path(tempfile.mkdtemp(prefix="wb-load-")) / "load.db"
+    # До импорта приложения: настройки читаются при импорте config.config
+    os.environ["DB__URL"] = f"sqlite+aiosqlite:///{db_path}"
+    # обработчики пока пишут отладочные WARNING на каждый шаг — в отчёт нужны только ошибки
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Планы и время горячих запросов задач до и после индексов миграции 0003.
+
+Запуск (из корня проекта, нужен .env с настройками):
+    python -m benchmarks.task_query_plans --rows 1000000
+
+Создаёт временную SQLite-базу, засевает `tasks` (legacy) и `task_ranges`, затем
+дважды прогоняет набор запросов: без индексов из 0003 и с ними — печатает
+EXPLAIN QUERY PLAN и медианное время выполнения.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from itertools import batched
+from pathlib import Path
+
+from sqlalchemy import create_engine, text, Engine
+from tabulate import tabulate
+
+from app.models.base import Base
+from app.models import task, task_range, user, warehouse  # noqa: F401 — регистрируем таблицы в metadata
+from app.models.task import Task
+from app.models.task_range import TaskRange
+
+BOX_TYPES = (2, 5, 6)
+TODAY = date(2025, 7, 1)
+
+# Запросы, которые slots.py выполнял по `tasks`, и их аналоги по `task_ranges`
+QUERIES: dict[str, str] = {
+    "tasks: get_tasks_unique_by_warehouse":
+        "SELECT warehouse_id, max(alarm) FROM tasks WHERE user_id = :user_id GROUP BY warehouse_id",
+    "tasks: count_uniq_tasks_by_whs":
+        "SELECT count(DISTINCT warehouse_id) FROM tasks WHERE user_id = :user_id",
+    "tasks: get_tasks_by_user_max_coef":
+        "SELECT warehouse_id, box_type_id, max(coefficient) FROM tasks "
+        "WHERE user_id = :user_id GROUP BY warehouse_id, box_type_id",
+    "tasks: toggle_alarm_state":
+        "UPDATE tasks SET alarm = CASE WHEN alarm = 1 THEN 0 ELSE 1 END "
+        "WHERE user_id = :user_id AND warehouse_id = :warehouse_id",
+    "tasks: задачи под коэффициент":
+        "SELECT user_id FROM tasks WHERE warehouse_id = :warehouse_id AND box_type_id = :box_type_id "
+        "AND date = :day AND coefficient >= :coefficient",
+    "task_ranges: TaskMatcher.load":
+        "SELECT * FROM task_ranges WHERE date_to >= :today",
+    "task_ranges: задачи склада на дату":
+        "SELECT user_id FROM task_ranges WHERE warehouse_id = :warehouse_id "
+        "AND date_from <= :today AND date_to >= :today",
+}
+NEW_INDEXES = [
+    index
+    for table in (Task.__table__, TaskRange.__table__)
+    for index in table.indexes
+    if index.name in ("ix_tasks_user_wh_box_coef", "ix_tasks_wh_box_date", "ix_task_ranges_wh_dates")
+]
+
+
+def seed(engine: Engine, rows: int, users: int, warehouses: int) -> None:
+    """tasks: пользователь × склад × тип упаковки × коэффициент 0..max × дни — как хранил старый код."""
+    rnd = random.Random(42)
+    now = datetime.now().replace(microsecond=0)
+
+    def task_rows():
+        produced = 0
+        while produced < rows:
+            user_id = rnd.randrange(users) + 1
+            warehouse_id = rnd.randrange(warehouses) + 1
+            max_coef = rnd.randrange(5)
+            start = TODAY + timedelta(days=rnd.randrange(30))
+            for box_type_id in rnd.sample(BOX_TYPES, 2):
+                for coefficient in range(max_coef + 1):
+                    for day in range(7):
+                        yield dict(
+                            user_id=user_id, warehouse_id=warehouse_id, box_type_id=box_type_id,
+                            coefficient=coefficient, state="new", alarm=1,
+                            date=datetime.combine(start + timedelta(days=day), datetime.min.time()),
+                            created_at=now, updated_at=now,
+                        )
+                        produced += 1
+
+    with engine.begin() as conn:
+        conn.execute(user.User.__table__.insert(), [dict(user_id=i + 1, bot_status=0, created_at=now, updated_at=now) for i in range(users)])
+        conn.execute(warehouse.Warehouse.__table__.insert(), [dict(warehouse_id=i + 1, warehouse_name=f"WH{i + 1}") for i in range(warehouses)])
+        for chunk in batched(task_rows(), 50_000):
+            conn.execute(Task.__table__.insert(), list(chunk))
+        conn.execute(text(
+            "INSERT INTO task_ranges (user_id, warehouse_id, box_types, coefficient, date_from, date_to, state, alarm, created_at, updated_at) "
+            "SELECT user_id, warehouse_id, 0, max(coefficient), min(date(date)), max(date(date)), 'new', 1, :now, :now "
+            "FROM tasks GROUP BY user_id, warehouse_id"
+        ), {"now": now})
+
+
+def run(engine: Engine, repeat: int, params: dict) -> list[tuple[str, str, float]]:
+    results = []
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        for name, sql in QUERIES.items():
+            plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql), params).all() if sql.startswith("SELECT") else conn.execute(text(sql), params)
+                timings.append((time.perf_counter() - started) * 1000)
+            conn.rollback()
+            results.append((name, "; ".join(row[-1] for row in plan), statistics.median(timings)))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Строк в legacy-таблице tasks")
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--warehouses", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(engine, tables=[user.User.__table__, warehouse.Warehouse.__table__, Task.__table__, TaskRange.__table__])
+        for index in NEW_INDEXES:
+            index.drop(engine)
+
+        started = time.perf_counter()
+        seed(engine, args.rows, args.users, args.warehouses)
+        print(f"Засеяно {args.rows} строк tasks за {time.perf_counter() - started:.1f} с\n")
+
+        params = {"user_id": 1, "warehouse_id": 1, "box_type_id": 2, "coefficient": 1,
+                  "day": datetime.combine(TODAY, datetime.min.time()), "today": TODAY}
+        before = run(engine, args.repeat, params)
+
+        started = time.perf_counter()
+        for index in NEW_INDEXES:
+            index.create(engine)
+        print(f"Индексы построены за {time.perf_counter() - started:.1f} с\n")
+        after = run(engine, args.repeat, params)
+
+        print(tabulate(
+            [(name, f"{b:.2f}", f"{a:.2f}", f"x{b / a:.0f}" if a else "-", plan_b, plan_a)
+             for (name, plan_b, b), (_, plan_a, a) in zip(before, after)],
+            headers=["запрос", "до, мс", "после, мс", "ускорение", "план до", "план после"],
+            maxcolwidths=[28, None, None, None, 40, 40],
+        ))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
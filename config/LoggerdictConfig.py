@@ -9,6 +9,15 @@ BASE_LOGGING_CONFIG: dict = {
             "fmt": "%(message)s",                 # сам текст формата не нужен — ColoredFormatter переопределит
             "datefmt": "%Y-%m-%d %H:%M:%S",
         },
+        # для файла: тот же порядок полей, что у colored, но без ANSI-кодов
+        "plain": {
+            "format": "%(asctime)s --- (%(levelname)s) [%(filename)s:%(lineno)d] == %(message)s",
+            "datefmt": "%Y-%m-%d %H:%M:%S",
+        },
+        # для файла: одна JSON-запись на строку
+        "json": {
+            "()": "app.commons.utils.custom_logger.JsonFormatter",
+        },
     },
 
     # ---------- HANDLERS ----------
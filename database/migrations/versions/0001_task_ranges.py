@@ -0,0 +1,100 @@
+"""task_ranges: компактные задачи вместо строк по каждому коэффициенту и дню
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-07-01 12:00:00.000000
+
+Переносит «развёрнутые» строки `tasks` (склад × тип упаковки × коэффициент 0..max × день)
+в `task_ranges` — одна строка на пару (user_id, warehouse_id) с маской типов упаковки,
+максимальным коэффициентом и периодом. Таблица `tasks` не удаляется, чтобы можно было
+откатиться.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    task_ranges = op.create_table(
+        "task_ranges",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False, comment="Event ID - PK"),
+        sa.Column("user_id", sa.BigInteger(), nullable=False, comment="ID пользователя"),
+        sa.Column("warehouse_id", sa.Integer(), nullable=False, comment="ID склада"),
+        sa.Column("box_types", sa.Integer(), nullable=False, comment="Битовая маска типов упаковки (бит = ID типа)"),
+        sa.Column("coefficient", sa.Integer(), nullable=False, comment="Максимальный допустимый коэффициент"),
+        sa.Column("date_from", sa.Date(), nullable=False, comment="Начало периода поиска"),
+        sa.Column("date_to", sa.Date(), nullable=False, comment="Конец периода поиска (включительно)"),
+        sa.Column("state", sa.String(length=50), nullable=False, comment="Состояние задачи"),
+        sa.Column("alarm", sa.Integer(), nullable=True, comment="Флаг оповещения"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="Post creation date"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, comment="Post update date"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.user_id"], name=op.f("fk_task_ranges_user_id_users")),
+        sa.ForeignKeyConstraint(["warehouse_id"], ["warehouses.warehouse_id"], name=op.f("fk_task_ranges_warehouse_id_warehouses")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_task_ranges")),
+        sa.UniqueConstraint("user_id", "warehouse_id", name=op.f("uq_task_ranges_user_id")),
+    )
+
+    # ── перенос данных из `tasks` ────────────────────────────────────────────
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("tasks"):
+        return
+
+    tasks = sa.table(
+        "tasks",
+        sa.column("user_id", sa.BigInteger),
+        sa.column("warehouse_id", sa.Integer),
+        sa.column("box_type_id", sa.Integer),
+        sa.column("coefficient", sa.Integer),
+        sa.column("state", sa.String),
+        sa.column("alarm", sa.Integer),
+        sa.column("date", sa.DateTime),
+    )
+    # агрегирует сама база: на выходе строка на (user, склад, тип упаковки)
+    grouped = bind.execute(
+        sa.select(
+            tasks.c.user_id,
+            tasks.c.warehouse_id,
+            tasks.c.box_type_id,
+            sa.func.max(tasks.c.coefficient),
+            sa.func.min(tasks.c.date),
+            sa.func.max(tasks.c.date),
+            sa.func.max(tasks.c.alarm),
+            sa.func.min(tasks.c.state),
+        )
+        .where(tasks.c.warehouse_id.is_not(None))
+        .group_by(tasks.c.user_id, tasks.c.warehouse_id, tasks.c.box_type_id)
+    )
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    ranges: dict[tuple[int, int], dict] = defaultdict(dict)
+    for user_id, warehouse_id, box_type_id, coef, date_min, date_max, alarm, state in grouped:
+        row = ranges[(user_id, warehouse_id)]
+        if not row:
+            row.update(
+                user_id=user_id, warehouse_id=warehouse_id, box_types=0, coefficient=coef,
+                date_from=date_min.date(), date_to=date_max.date(), state=state or "new",
+                alarm=alarm, created_at=now, updated_at=now,
+            )
+        row["box_types"] |= 1 << box_type_id
+        row["coefficient"] = max(row["coefficient"], coef)
+        row["date_from"] = min(row["date_from"], date_min.date())
+        row["date_to"] = max(row["date_to"], date_max.date())
+
+    if ranges:
+        op.bulk_insert(task_ranges, list(ranges.values()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("task_ranges")
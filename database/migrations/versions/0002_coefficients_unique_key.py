@@ -0,0 +1,47 @@
+"""coefficients: уникальный ключ снимка (warehouse_id, box_type_id, date)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-07-03 12:00:00.000000
+
+Ключ нужен для upsert при загрузке коэффициентов. Перед созданием ограничения
+дубликаты ключа схлопываются — остаётся строка с наибольшим id.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    coefficients = sa.table(
+        "coefficients",
+        sa.column("id", sa.Integer),
+        sa.column("warehouse_id", sa.Integer),
+        sa.column("box_type_id", sa.Integer),
+        sa.column("date", sa.DateTime),
+    )
+    keep = (
+        sa.select(sa.func.max(coefficients.c.id))
+        .group_by(coefficients.c.warehouse_id, coefficients.c.box_type_id, coefficients.c.date)
+    )
+    op.execute(sa.delete(coefficients).where(coefficients.c.id.not_in(keep)))
+
+    with op.batch_alter_table("coefficients") as batch_op:
+        batch_op.create_unique_constraint(
+            op.f("uq_coefficients_warehouse_id"), ["warehouse_id", "box_type_id", "date"]
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("coefficients") as batch_op:
+        batch_op.drop_constraint(op.f("uq_coefficients_warehouse_id"), type_="unique")
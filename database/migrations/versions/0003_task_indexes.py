@@ -0,0 +1,42 @@
+"""индексы под горячие запросы задач
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-07-05 12:00:00.000000
+
+tasks:       (user_id, warehouse_id, box_type_id, coefficient), (warehouse_id, box_type_id, date)
+task_ranges: (warehouse_id, date_from, date_to)
+
+Выборки по пользователю в task_ranges уже покрывает уникальный ключ (user_id, warehouse_id).
+Отдельный индекс по date_to для загрузки TaskMatcher не нужен: актуальны почти все
+задачи, и полный просмотр там дешевле поиска по индексу.
+Планы запросов до/после — benchmarks/task_query_plans.py.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # legacy-таблица `tasks` может отсутствовать на новых установках (см. 0001)
+    if sa.inspect(op.get_bind()).has_table("tasks"):
+        op.create_index("ix_tasks_user_wh_box_coef", "tasks", ["user_id", "warehouse_id", "box_type_id", "coefficient"])
+        op.create_index("ix_tasks_wh_box_date", "tasks", ["warehouse_id", "box_type_id", "date"])
+    op.create_index("ix_task_ranges_wh_dates", "task_ranges", ["warehouse_id", "date_from", "date_to"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_task_ranges_wh_dates", table_name="task_ranges")
+    if sa.inspect(op.get_bind()).has_table("tasks"):
+        op.drop_index("ix_tasks_wh_box_date", table_name="tasks", if_exists=True)
+        op.drop_index("ix_tasks_user_wh_box_coef", table_name="tasks", if_exists=True)
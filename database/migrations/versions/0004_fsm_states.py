@@ -0,0 +1,44 @@
+"""fsm_states: общее хранилище состояний FSM
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-07-08 12:00:00.000000
+
+Состояния и данные FSM переносятся из памяти процесса в базу: их видят все
+процессы бота, и они переживают рестарт. Устаревшие записи (expires_at)
+удаляются на старте бота.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "fsm_states",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False, comment="Event ID - PK"),
+        sa.Column("key", sa.String(length=255), nullable=False, comment="Ключ StorageKey: fsm:bot:chat:user:destiny"),
+        sa.Column("state", sa.String(length=255), nullable=True, comment="Текущее состояние"),
+        sa.Column("data", sa.JSON(), nullable=False, comment="Данные состояния (JSON)"),
+        sa.Column("expires_at", sa.DateTime(), nullable=True, comment="Когда запись устаревает (TTL)"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="Post creation date"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, comment="Post update date"),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_fsm_states")),
+        sa.UniqueConstraint("key", name=op.f("uq_fsm_states_key")),
+    )
+    op.create_index(op.f("ix_fsm_states_expires_at"), "fsm_states", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_fsm_states_expires_at"), table_name="fsm_states")
+    op.drop_table("fsm_states")
@@ -0,0 +1,32 @@
+"""bots.bot_id: BIGINT
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-07-14 12:00:00.000000
+
+ID ботов Telegram не помещаются в 32 бита: SQLite это прощал (INTEGER там
+всегда 64-битный), Postgres — нет.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("bots") as batch_op:
+        batch_op.alter_column("bot_id", existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("bots") as batch_op:
+        batch_op.alter_column("bot_id", existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=False)
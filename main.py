@@ -5,51 +5,156 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram import Bot, Dispatcher
 from aiorun import run  # Импортируем aiorun
 
+from app.commons.services.alerts import AlertDispatcher, make_bot_session
+from app.commons.services.coefficient import CoefficientService
+from app.commons.services.matcher import task_matcher
+from app.commons.services.warehouses import warehouse_directory
 from app.commons.utils.custom_logger import setup_logger
+from app.commons.utils.fsm_storage import SQLAlchemyStorage
+from app.commons.utils.language_loader import localization_registry
+from app.commons.utils.metrics import ApiTimingMiddleware, metrics
+from app.middlewares.callback_data import CallbackDataMiddleware
+from app.middlewares.fsm import FSMBatchMiddleware
+from app.middlewares.localization import LocalizationMiddleware
 from app.middlewares.logging import LoggingMiddleware
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.unit_of_work import UnitOfWorkMiddleware
 from app.routes.callbacks import main_router_callbacks
 from app.routes.handlers import main_router
+from app.models.alchemy_helper import db_helper
+from app.models.write_queue import write_queue
+from app.server.metrics import MetricsServer
+from app.server.webhook import WebhookServer
 from config.config import settings
 
 
+# Сервер режима webhook, бот и рассылка — нужны shutdown_callback для корректной остановки
+webhook_server: WebhookServer | None = None
+metrics_server: MetricsServer | None = None
+bot: Bot | None = None
+alert_dispatcher: AlertDispatcher | None = None
+fsm_storage: SQLAlchemyStorage | None = None
+
+
+async def build_dispatcher(bot: Bot) -> Dispatcher:
+    """
+    Диспетчер со всеми middleware и роутерами — как в бою.
+    Используется и main(), и нагрузочным стендом (benchmarks/load_flow.py).
+    """
+    # Состояния FSM в базе — общие для всех процессов бота и переживают рестарт
+    storage = SQLAlchemyStorage() if settings.fsm.storage == "sql" else None
+    dp = Dispatcher(storage=storage) if storage else Dispatcher()
+    if storage:
+        await storage.purge_expired()
+        dp.update.outer_middleware(FSMBatchMiddleware(storage))
+
+    # Языковые пакеты загружаются один раз
+    localization_registry.load()
+
+    # Подключение Middleware
+    dp.update.middleware(LoggingMiddleware())
+    dp.update.middleware(LocalizationMiddleware())
+    dp.update.middleware(UnitOfWorkMiddleware())
+    # callback_data разбирается один раз — до фильтров роутеров
+    dp.callback_query.outer_middleware(CallbackDataMiddleware())
+
+    # Метрики обработчиков: латентность, время в БД и Bot API
+    if settings.metrics.enabled:
+        bot.session.middleware(ApiTimingMiddleware())
+        metrics.register_collector(db_helper.instrumentation.prometheus_lines)
+        if write_queue.enabled:
+            metrics.register_collector(write_queue.prometheus_lines)
+        dp.message.middleware(MetricsMiddleware())
+        dp.callback_query.middleware(MetricsMiddleware())
+
+    # Подключение обработчиков
+    dp.include_routers(
+        main_router,
+        main_router_callbacks
+    )
+    return dp
+
+
 async def main() -> None:
     """
     Основная функция для запуска бота.
     """
+    global webhook_server, metrics_server, bot, alert_dispatcher, fsm_storage
     try:
         # Будет еще писаться информация о боте, имя, url, описание
         logging.info("🟢 Программа работает.")
+        logging.info(f"🗄 База: профиль {db_helper.profile.name}, реплик для чтения — {len(db_helper.replica_engines)}")
 
         # Инициализация бота и диспетчера
         bot = Bot(
             token=settings.bot.token.get_secret_value(),
+            session=make_bot_session(),
             default=DefaultBotProperties(parse_mode=settings.bot.parse_mode)
         )
-        dp = Dispatcher()
+        dp = await build_dispatcher(bot)
 
-        # Подключение Middleware
-        dp.update.middleware(LoggingMiddleware())
+        # Устаревшие состояния FSM удаляются по таймеру (первый раз — в build_dispatcher)
+        if isinstance(dp.storage, SQLAlchemyStorage):
+            fsm_storage = dp.storage
+            fsm_storage.start_purge()
+
+        if settings.metrics.enabled:
+            metrics.start_log_summary(settings.metrics.log_interval)
+            if settings.metrics.port:
+                metrics_server = MetricsServer()
+                await metrics_server.start()
+
+        # Справочник складов в памяти, обновляется по таймеру
+        await warehouse_directory.load()
+        warehouse_directory.start_refresh()
+
+        # Индекс задач для сопоставления с коэффициентами (перечитывается по таймеру) и рассылка оповещений
+        await task_matcher.load()
+        task_matcher.start_reload()
+        alert_dispatcher = AlertDispatcher(bot, matcher=task_matcher)
+        CoefficientService.subscribe(alert_dispatcher.on_coefficients)
 
-        # Подключение обработчиков
-        dp.include_routers(
-            main_router,
-            main_router_callbacks
-        )
         # Запуск бота
         await asyncio.sleep(0.7)
-        logging.info("🔄 Запуск long polling...")
-        await dp.start_polling(bot)
+        if settings.bot.use_webhook:
+            logging.info("🔄 Запуск в режиме webhook...")
+            webhook_server = WebhookServer(dp, bot)
+            await webhook_server.serve()
+        else:
+            logging.info("🔄 Запуск long polling...")
+            await dp.start_polling(bot)
     except Exception as e:
         logging.error(f"📛 Ошибка в главной функции: {e}", exc_info=True)
 
 
+async def shutdown(loop) -> None:
+    """
+    Вызывается aiorun до отмены задач: webhook-сервер дорабатывает принятые апдейты,
+    затем останавливаются фоновые задачи, очередь записи и сессия бота.
+    """
+    if webhook_server:
+        await webhook_server.shutdown()
+    if alert_dispatcher:
+        await alert_dispatcher.close()
+    await task_matcher.stop_reload()
+    await warehouse_directory.stop_refresh()
+    await metrics.stop_log_summary()
+    if fsm_storage:
+        await fsm_storage.close()
+    if metrics_server:
+        await metrics_server.shutdown()
+    await write_queue.stop()
+    if bot:
+        await bot.session.close()
+
+
 if __name__ == "__main__":
     try:
-        setup_logger(settings.logging.level)
+        setup_logger(settings.logging.level, settings.logging)
         # logger = logging.getLogger(__name__)
         logging.info("🚀 Запуск бота через aiorun...")
 
-        run(main())
+        run(main(), shutdown_callback=shutdown)
     except KeyboardInterrupt:
         logging.warning("Программа была остановлена вручную.")
     except Exception as e:
@@ -0,0 +1,51 @@
+"""
+Общие настройки тестов.
+
+config.settings читается при импорте app, поэтому окружение задаётся здесь — до импорта
+приложения. База всегда временная (SQLite): DB__URL из окружения или .env не используется,
+чтобы тесты не пересоздали таблицы рабочей базы.
+
+pytest-asyncio не нужен: тест запускает сценарий через фикстуру `run` (asyncio.run).
+"""
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import pytest
+
+_tmp = Path(tempfile.mkdtemp(prefix="wb-tests-"))
+os.environ["DB__URL"] = f"sqlite+aiosqlite:///{_tmp / 'test.db'}"
+os.environ.setdefault("BOT__TOKEN", "123456789:" + "A" * 35)
+os.environ.setdefault("YOOKASSA__SHOP_ID", "test")
+os.environ.setdefault("YOOKASSA__SECRET", "test")
+
+from app.models.alchemy_helper import db_helper  # noqa: E402
+from app.models.base import Base  # noqa: E402
+from app.models.write_queue import write_queue  # noqa: E402
+from app.models import bot, coefficient, fsm_state, subscription, task, task_range, user, warehouse  # noqa: E402,F401
+
+
+async def reset_schema() -> None:
+    async with db_helper.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@pytest.fixture
+def run() -> Callable[[Callable[[], Awaitable[Any]]], Any]:
+    """
+    Выполняет асинхронный сценарий теста на чистой схеме.
+    Писатель очереди и движки закрываются в том же цикле событий: у каждого теста свой asyncio.run.
+    """
+    def runner(scenario: Callable[[], Awaitable[Any]]) -> Any:
+        async def main() -> Any:
+            await reset_schema()
+            try:
+                return await scenario()
+            finally:
+                await write_queue.stop()
+                await db_helper.dispose()
+        return asyncio.run(main())
+    return runner
@@ -0,0 +1,145 @@
+"""
+Рассылка оповещений (AlertDispatcher) против фейкового Bot API: sendMessage поднимается на
+aiohttp.test_utils.TestServer, бот ходит в него через BOT__API_SERVER (make_bot_session).
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Awaitable, Callable
+
+import pytest
+from aiogram import Bot
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.commons.services.alerts import AlertDispatcher, make_bot_session
+from config.config import AlertSettings, settings
+
+TOKEN = "123456789:" + "A" * 35
+DAY = date(2026, 10, 20)
+
+
+@dataclass(slots=True)
+class Coef:
+    warehouse_id: int
+    box_type_id: int
+    coefficient: int
+    date: date
+
+
+def hit(user_id: int, warehouse_id: int, coefficient: int = 1) -> dict[tuple[int, int], list[Coef]]:
+    return {(user_id, warehouse_id): [Coef(warehouse_id, 2, coefficient, DAY)]}
+
+
+class FakeBotAPI:
+    """sendMessage: запоминает (время, chat_id, текст); первые запросы отвечают по сценарию `failures`."""
+
+    def __init__(self, failures: tuple[str, ...] = ()) -> None:
+        self.failures = list(failures)  # "500" — ошибка сервера, "drop" — обрыв соединения
+        self.sent: list[tuple[float, int, str]] = []
+        self.requests = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/sendMessage", self.send_message)
+        return app
+
+    async def send_message(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        form = await request.post()
+        if self.failures:
+            failure = self.failures.pop(0)
+            if failure == "drop":
+                request.transport.close()
+                return web.Response()
+            return web.json_response({"ok": False, "error_code": 500, "description": "Internal Server Error"}, status=500)
+
+        chat_id = int(form["chat_id"])
+        self.sent.append((time.monotonic(), chat_id, form["text"]))
+        return web.json_response({"ok": True, "result": {
+            "message_id": len(self.sent), "date": 0, "chat": {"id": chat_id, "type": "private"}, "text": form["text"],
+        }})
+
+
+async def wait_for(condition: Callable[[], bool], timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "не дождались отправки"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def alerts(run, monkeypatch) -> Callable[..., Any]:
+    """Сценарий с фейковым Bot API: scenario(dispatcher, api); `config` — настройки рассылки."""
+    def runner(scenario: Callable[[AlertDispatcher, FakeBotAPI], Awaitable[Any]], config: AlertSettings,
+               failures: tuple[str, ...] = ()) -> Any:
+        async def main() -> Any:
+            api = FakeBotAPI(failures)
+            server = TestServer(api.app())
+            await server.start_server()
+            monkeypatch.setattr(settings.bot, "api_server", str(server.make_url("")).rstrip("/"))
+            bot = Bot(token=TOKEN, session=make_bot_session())
+            dispatcher = AlertDispatcher(bot, config=config)
+            try:
+                return await scenario(dispatcher, api)
+            finally:
+                await dispatcher.close()
+                await bot.session.close()
+                await server.close()
+        return run(main)
+    return runner
+
+
+def test_hits_for_one_chat_become_one_message(alerts):
+    async def scenario(dispatcher: AlertDispatcher, api: FakeBotAPI):
+        await dispatcher.submit(hit(1, 100))
+        await dispatcher.submit({**hit(1, 200), **hit(2, 100)})
+        await dispatcher.submit(hit(1, 100, coefficient=0))  # та же ячейка — свежее значение
+        await wait_for(lambda: dispatcher.sent == 2)
+        await asyncio.sleep(0.2)
+        expected = dispatcher.render({100: {(2, DAY): 0}, 200: {(2, DAY): 1}})
+        return api.sent, expected
+
+    sent, expected = alerts(scenario, AlertSettings(coalesce_delay=0.1))
+    assert sorted(chat_id for _, chat_id, _ in sent) == [1, 2]
+    assert next(text for _, chat_id, text in sent if chat_id == 1) == expected
+
+
+def test_per_chat_interval(alerts):
+    async def scenario(dispatcher: AlertDispatcher, api: FakeBotAPI):
+        await dispatcher.submit(hit(1, 100))
+        await wait_for(lambda: dispatcher.sent == 1)
+        await dispatcher.submit(hit(1, 200))
+        await wait_for(lambda: dispatcher.sent == 2)
+        return [at for at, _, _ in api.sent]
+
+    first, second = alerts(scenario, AlertSettings(coalesce_delay=0.01, per_chat_interval=0.5))
+    assert second - first >= 0.45
+
+
+def test_global_rate(alerts):
+    chats, rate = 12, 10.0  # запас bucket — `rate` сообщений, остальные — по 1/rate сек
+
+    async def scenario(dispatcher: AlertDispatcher, api: FakeBotAPI):
+        await dispatcher.submit({key: value for chat in range(1, chats + 1) for key, value in hit(chat, 100).items()})
+        await wait_for(lambda: dispatcher.sent == chats)
+        return [at for at, _, _ in api.sent]
+
+    times = alerts(scenario, AlertSettings(coalesce_delay=0.01, global_rate=rate))
+    assert times[-1] - times[0] >= (chats - rate) / rate - 0.02
+    # после исчерпания запаса — не чаще `rate` в секунду
+    assert all(later - earlier >= 1 / rate - 0.02 for earlier, later in zip(times[int(rate):], times[int(rate) + 1:]))
+
+
+@pytest.mark.parametrize("failure", ["500", "drop"])
+def test_retry_after_server_or_network_error(alerts, failure):
+    async def scenario(dispatcher: AlertDispatcher, api: FakeBotAPI):
+        await dispatcher.submit(hit(1, 100))
+        await wait_for(lambda: dispatcher.sent == 1)
+        return api.requests, dispatcher.stats(), api.sent
+
+    requests, stats, sent = alerts(scenario, AlertSettings(coalesce_delay=0.01), failures=(failure,))
+    assert requests == 2
+    assert (stats["sent"], stats["retried"], stats["failed"]) == (1, 1, 0)
+    assert [chat_id for _, chat_id, _ in sent] == [1]
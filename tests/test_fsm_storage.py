@@ -0,0 +1,53 @@
+"""
+FSM-хранилище в базе (SQLAlchemyStorage): устаревшие состояния удаляются не только на старте,
+но и по таймеру `purge_interval`.
+"""
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import insert, select
+
+from app.commons.utils.fsm_storage import SQLAlchemyStorage
+from app.models.alchemy_helper import db_helper
+from app.models.fsm_state import FsmState
+from config.config import FSMSettings
+
+
+async def add_state(storage: SQLAlchemyStorage, key: str, expires_in: timedelta) -> None:
+    async with db_helper.session_getter() as session:
+        await session.execute(insert(FsmState), [dict(key=key, state="S:s", data={}, expires_at=storage._now() + expires_in)])
+        await session.commit()
+
+
+async def keys() -> list[str]:
+    async with db_helper.session_getter() as session:
+        return list((await session.execute(select(FsmState.key).order_by(FsmState.key))).scalars())
+
+
+def test_expired_states_are_purged_on_timer(run):
+    async def scenario():
+        storage = SQLAlchemyStorage(FSMSettings(purge_interval=0.1))
+        storage.start_purge()
+        try:
+            # записи появились уже после старта — их удаляет только таймер
+            await add_state(storage, "expired", timedelta(seconds=-1))
+            await add_state(storage, "alive", timedelta(hours=1))
+            await asyncio.sleep(0.3)
+            return await keys()
+        finally:
+            await storage.close()
+
+    assert run(scenario) == ["alive"]
+
+
+def test_no_timer_without_interval_or_ttl(run):
+    async def scenario():
+        started = []
+        for config in (FSMSettings(purge_interval=0), FSMSettings(ttl=None)):
+            storage = SQLAlchemyStorage(config)
+            storage.start_purge()
+            started.append(storage._purger is not None)
+            await storage.close()
+        return started
+
+    assert run(scenario) == [False, False]
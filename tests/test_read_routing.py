@@ -0,0 +1,113 @@
+"""
+Чтения с реплик (DatabaseHelper.read_session_getter, RecentWriters): основная база и отстающая
+реплика — два файла SQLite, на реплике у пользователей ещё старый bot_status.
+Писавший пользователь `sticky_sec` сек читает с основной базы, остальные — с реплики.
+"""
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import pytest
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.models.alchemy_helper import DatabaseHelper
+from app.models.base import Base
+from app.models.user import User
+from app.models.write_queue import WriteQueue
+from config.config import WriteQueueSettings
+
+WRITER = 1
+OTHER = 2
+PRIMARY, STALE = 1, 0  # bot_status на основной базе и на реплике
+
+
+async def create_db(engine: AsyncEngine, bot_status: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [dict(user_id=uid, bot_status=bot_status) for uid in (WRITER, OTHER)])
+
+
+async def bot_status(helper: DatabaseHelper, actor: int) -> int:
+    """Чтение, как в сервисе: внутри апдейта `actor`, до его первой записи."""
+    async with helper.unit_of_work(actor=actor):
+        async with helper.read_session_getter() as session:
+            return (await session.execute(select(User.bot_status).where(User.user_id == actor))).scalar_one()
+
+
+async def write(helper: DatabaseHelper, queue: WriteQueue, actor: int) -> None:
+    """Апдейт `actor` пишет через очередь записи."""
+    async def job(session: AsyncSession) -> None:
+        await session.execute(update(User).where(User.user_id == actor).values(bot_status=PRIMARY))
+        await session.commit()
+
+    async with helper.unit_of_work(actor=actor):
+        await queue.submit(job)
+
+
+@pytest.fixture
+def routed(tmp_path: Path) -> Callable[..., Any]:
+    """Запускает сценарий на основной базе с одной отстающей репликой: scenario(helper, queue)."""
+    def runner(scenario: Callable[[DatabaseHelper, WriteQueue], Awaitable[Any]], sticky_sec: float = 60.0) -> Any:
+        async def main() -> Any:
+            helper = DatabaseHelper(
+                f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+                replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"],
+                sticky_sec=sticky_sec,
+            )
+            queue = WriteQueue(helper, WriteQueueSettings())
+            await create_db(helper.engine, PRIMARY)
+            # файл реплики заполняем отдельным движком: движок реплики только читает
+            replica_writer = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+            await create_db(replica_writer, STALE)
+            await replica_writer.dispose()
+            try:
+                return await scenario(helper, queue)
+            finally:
+                await queue.stop()
+                await helper.dispose()
+        return asyncio.run(main())
+    return runner
+
+
+def test_submit_marks_writer(routed):
+    async def scenario(helper: DatabaseHelper, queue: WriteQueue):
+        await write(helper, queue, WRITER)
+        return WRITER in helper.recent_writers, OTHER in helper.recent_writers
+
+    assert routed(scenario) == (True, False)
+
+
+def test_writer_reads_primary_others_read_replica(routed):
+    async def scenario(helper: DatabaseHelper, queue: WriteQueue):
+        before = await bot_status(helper, WRITER)
+        await write(helper, queue, WRITER)
+        return before, await bot_status(helper, WRITER), await bot_status(helper, OTHER)
+
+    before, writer, other = routed(scenario)
+    assert before == STALE   # до записи — с реплики
+    assert writer == PRIMARY  # read-your-writes
+    assert other == STALE     # не писал — читает реплику
+
+
+def test_stickiness_expires(routed):
+    async def scenario(helper: DatabaseHelper, queue: WriteQueue):
+        await write(helper, queue, WRITER)
+        sticky = await bot_status(helper, WRITER)
+        await asyncio.sleep(0.3)
+        return sticky, await bot_status(helper, WRITER)
+
+    sticky, expired = routed(scenario, sticky_sec=0.2)
+    assert sticky == PRIMARY
+    assert expired == STALE
+
+
+def test_replica_rejects_writes(routed):
+    async def scenario(helper: DatabaseHelper, queue: WriteQueue):
+        async with helper.read_session_getter() as session:
+            await session.execute(update(User).values(bot_status=PRIMARY))
+            await session.commit()
+
+    with pytest.raises(OperationalError, match="readonly"):
+        routed(scenario)
@@ -0,0 +1,61 @@
+"""
+Экран обзора задач (slots.get_task_overview) — один SQL-запрос на экран:
+задачи, имена складов и общее количество приходят одной выборкой.
+"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.alchemy_helper import db_helper
+from app.models.crud import slots
+from app.models.user import User
+from app.models.warehouse import Warehouse
+from app.schemas.task import TaskRangeCreate
+
+USER_ID = 1
+WAREHOUSES = list(range(100, 107))
+TODAY = date(2026, 10, 18)
+
+
+async def seed() -> None:
+    async with db_helper.session_getter() as session:
+        await session.execute(insert(Warehouse), [
+            dict(warehouse_id=wh, warehouse_name=f"Склад {wh}", accepts_qr=0) for wh in WAREHOUSES
+        ])
+        await session.execute(insert(User), [dict(user_id=uid, bot_status=0) for uid in (USER_ID, USER_ID + 1)])
+        await session.commit()
+        saved = await slots.create_tasks_bulk(session, [
+            TaskRangeCreate(user_id=uid, warehouse_id=wh, box_type_ids=[2, 5], coefficient=3,
+                            date_from=TODAY, date_to=TODAY + timedelta(days=7))
+            for uid in (USER_ID, USER_ID + 1) for wh in WAREHOUSES
+        ])
+        assert saved == 2 * len(WAREHOUSES)
+
+
+async def overview_statements(**kwargs) -> tuple[tuple, list[str]]:
+    """get_task_overview внутри единицы работы → (результат, SQL, выполненный за вызов)."""
+    async with db_helper.unit_of_work(actor=USER_ID) as uow:
+        async with db_helper.session_getter() as session:
+            await session.connection()  # соединение и BEGIN — до замера
+            before = len(uow.queries)
+            result = await slots.get_task_overview(session, USER_ID, **kwargs)
+            return result, uow.queries[before:]
+
+
+@pytest.mark.parametrize("kwargs, expected", [
+    (dict(limit=5), WAREHOUSES[:5]),                                  # первая страница «Мои задачи»
+    (dict(limit=5, offset=5), WAREHOUSES[5:]),                        # последняя страница
+    (dict(warehouse_ids=[WAREHOUSES[2]]), [WAREHOUSES[2]]),           # склад в редактировании
+])
+def test_overview_is_one_query(run, kwargs, expected):
+    async def scenario():
+        await seed()
+        return await overview_statements(**kwargs)
+
+    (tasks, names, total), statements = run(scenario)
+
+    assert len(statements) == 1, statements
+    assert [task.warehouse_id for task in tasks] == expected
+    assert names == [{"id": wh, "name": f"Склад {wh}"} for wh in expected]
+    assert total == (len(WAREHOUSES) if "warehouse_ids" not in kwargs else 1)
@@ -0,0 +1,73 @@
+"""
+Одна транзакция на апдейт (UnitOfWorkMiddleware) поверх очереди записи SQLite:
+запись сервиса фиксируется только вместе с апдейтом, а её SQL засчитывается апдейту.
+"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.commons.services.matcher import task_matcher
+from app.commons.services.task import TaskService
+from app.middlewares.unit_of_work import UnitOfWorkMiddleware
+from app.models.alchemy_helper import db_helper
+from app.models.task_range import TaskRange
+from app.models.user import User
+from app.models.warehouse import Warehouse
+from app.models.write_queue import write_queue
+
+USER_ID = 1
+WAREHOUSE_ID = 100
+TODAY = date(2026, 10, 18)
+
+
+async def seed() -> None:
+    async with db_helper.session_getter() as session:
+        await session.execute(insert(Warehouse), [dict(warehouse_id=WAREHOUSE_ID, warehouse_name="Склад", accepts_qr=0)])
+        await session.execute(insert(User), [dict(user_id=USER_ID, bot_status=0)])
+        await session.commit()
+
+
+async def task_rows() -> int:
+    async with db_helper.session_getter() as session:
+        return (await session.execute(select(func.count()).select_from(TaskRange))).scalar_one()
+
+
+async def handle(fail: bool) -> list[str]:
+    """Апдейт через UnitOfWorkMiddleware: обработчик создаёт задачу и, если `fail`, падает после записи."""
+    async def handler(event, data):
+        saved = await TaskService.create_bulk_tasks(USER_ID, [WAREHOUSE_ID], ["mono"], 3, TODAY, TODAY + timedelta(days=7))
+        assert saved == 1
+        if fail:
+            raise RuntimeError("ошибка после записи")
+        return data["uow"].queries
+
+    return await UnitOfWorkMiddleware()(handler, object(), {})
+
+
+def test_queue_is_on_for_sqlite():
+    assert write_queue.enabled
+
+
+def test_exception_after_write_leaves_no_row(run):
+    async def scenario():
+        await seed()
+        with pytest.raises(RuntimeError):
+            await handle(fail=True)
+        return await task_rows()
+
+    assert run(scenario) == 0
+    assert (USER_ID, WAREHOUSE_ID) not in task_matcher._tasks  # хуки отката не выполняются
+
+
+def test_write_commits_with_update_and_counts_its_sql(run):
+    async def scenario():
+        await seed()
+        queries = await handle(fail=False)
+        return queries, await task_rows()
+
+    queries, rows = run(scenario)
+    assert rows == 1
+    assert any(q.startswith("INSERT INTO task_ranges") for q in queries), queries
+    assert (USER_ID, WAREHOUSE_ID) in task_matcher._tasks
+    task_matcher.discard(USER_ID, WAREHOUSE_ID)
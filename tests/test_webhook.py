@@ -0,0 +1,123 @@
+"""
+Webhook-сервер (app/server/webhook.py) на aiohttp.test_utils: ответ 200 до обработки апдейта,
+лимит `max_in_flight` и дорабатывание принятых апдейтов при остановке (drain).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.server.webhook import WebhookServer
+from config.config import WebhookSettings
+
+PATH = "/webhook"
+
+
+def update(update_id: int) -> dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Тест"},
+            "text": "/start",
+        },
+    }
+
+
+class Scenario:
+    """Сервер с обработчиком, который ждёт `release`; `handled` — id обработанных апдейтов."""
+
+    def __init__(self, max_in_flight: int) -> None:
+        self.release = asyncio.Event()
+        self.started = asyncio.Event()
+        self.handled: list[int] = []
+
+        dp = Dispatcher()
+
+        @dp.message()
+        async def handler(message: Message) -> None:
+            self.started.set()
+            await self.release.wait()
+            self.handled.append(message.message_id)
+
+        self.bot = Bot(token="123456789:" + "A" * 35)
+        self.server = WebhookServer(dp, self.bot, WebhookSettings(path=PATH, max_in_flight=max_in_flight))
+
+    async def __call__(self, check: Callable[["Scenario", TestClient], Awaitable[Any]]) -> Any:
+        client = TestClient(TestServer(self.server.build_app()))
+        await client.start_server()
+        try:
+            return await check(self, client)
+        finally:
+            self.release.set()
+            await client.close()
+            await self.bot.session.close()
+
+
+def scenario(max_in_flight: int, check: Callable[[Scenario, TestClient], Awaitable[Any]]) -> Any:
+    async def main() -> Any:
+        return await Scenario(max_in_flight)(check)
+    return asyncio.run(main())
+
+
+def test_responds_200_before_update_is_handled():
+    async def check(s: Scenario, client: TestClient):
+        response = await client.post(PATH, json=update(1))
+        await s.started.wait()
+        health = await (await client.get(f"{PATH}/health")).json()
+        s.release.set()
+        await s.server.handler.drain(timeout=5)
+        return response.status, health, s.handled
+
+    status, health, handled = scenario(2, check)
+    assert status == 200
+    assert health == {"in_flight": 1, "max_in_flight": 2}
+    assert handled == [1]
+
+
+def test_max_in_flight_holds_next_response():
+    async def check(s: Scenario, client: TestClient):
+        first = await client.post(PATH, json=update(1))
+        second = asyncio.create_task(client.post(PATH, json=update(2)))
+        await asyncio.sleep(0.2)
+        held = not second.done()  # слот занят первым апдейтом — ответ на второй ждёт
+
+        s.release.set()
+        second_status = (await asyncio.wait_for(second, timeout=5)).status
+        await s.server.handler.drain(timeout=5)
+        return first.status, held, second_status, s.handled
+
+    first, held, second, handled = scenario(1, check)
+    assert first == 200
+    assert held
+    assert second == 200
+    assert handled == [1, 2]
+
+
+def test_drain_waits_for_accepted_updates():
+    async def check(s: Scenario, client: TestClient):
+        await client.post(PATH, json=update(1))
+        await s.started.wait()
+        asyncio.get_running_loop().call_later(0.1, s.release.set)
+        await s.server.handler.drain(timeout=5)
+        return s.handled, s.server.handler.in_flight
+
+    handled, in_flight = scenario(2, check)
+    assert handled == [1]
+    assert in_flight == 0
+
+
+def test_drain_cancels_updates_after_timeout():
+    async def check(s: Scenario, client: TestClient):
+        await client.post(PATH, json=update(1))
+        await s.started.wait()
+        await s.server.handler.drain(timeout=0.1)
+        return s.handled, s.server.handler.in_flight
+
+    handled, in_flight = scenario(2, check)
+    assert handled == []
+    assert in_flight == 0